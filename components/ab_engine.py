@@ -0,0 +1,113 @@
+"""A/B/n testing engine built on per-variant sufficient statistics.
+
+One pass over the data produces n, sum and sum of squares for every metric
+and variant. Every test below (chi-square, two-proportion z, Welch t and
+relative-lift CIs) is derived from that summary, so adding variants or
+metrics never re-scans the rows.
+"""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def summarize(df: pd.DataFrame, metrics: list[str], by: str | list[str] = "variant") -> pd.DataFrame:
+    """Return per-group sufficient statistics in one grouped pass.
+
+    Columns: n, then <metric>_sum and <metric>_sumsq for each metric.
+    Summaries with the same columns can be added together (see merge).
+    With no grouping keys the result is one overall row indexed "All".
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    values = df[metrics].astype("float64")
+    squares = values.pow(2).add_suffix("_sumsq")
+    frame = pd.concat([df[keys], values.add_suffix("_sum"), squares], axis=1)
+    frame["n"] = 1
+    if keys:
+        out = frame.groupby(keys, observed=True, sort=True).sum()
+    else:
+        out = frame.sum().to_frame("All").T.astype({"n": "int64"})
+    cols = ["n"] + [c for m in metrics for c in (f"{m}_sum", f"{m}_sumsq")]
+    return out[cols]
+
+
+def merge(*summaries: pd.DataFrame) -> pd.DataFrame:
+    """Add summaries (e.g. from separate chunks) group by group."""
+    out = pd.concat(summaries).groupby(level=list(range(summaries[0].index.nlevels))).sum()
+    return out.astype({"n": "int64"})
+
+
+def metric_moments(summary: pd.DataFrame, metric: str) -> pd.DataFrame:
+    """Return n, mean and sample variance of one metric per group."""
+    n = summary["n"].astype("float64")
+    s = summary[f"{metric}_sum"]
+    ss = summary[f"{metric}_sumsq"]
+    mean = s / n
+    var = ((ss - s * s / n) / (n - 1)).clip(lower=0.0)
+    return pd.DataFrame({"n": n, "sum": s, "mean": mean, "var": var})
+
+
+def chi_square(summary: pd.DataFrame, metric: str = "conversion", correction: bool = True) -> dict:
+    """Chi-square test of independence between group and a 0/1 metric."""
+    successes = summary[f"{metric}_sum"].to_numpy()
+    failures = summary["n"].to_numpy() - successes
+    chi2, p_value, dof, _ = stats.chi2_contingency(np.column_stack([failures, successes]), correction=correction)
+    return {"chi2": float(chi2), "p_value": float(p_value), "dof": int(dof)}
+
+
+def _lift_ci(m0, m1, se0, se1, z):
+    """Relative lift m1/m0 - 1 with a delta-method confidence interval."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = m1 / m0
+        se = np.abs(ratio) * np.sqrt((se1 / m1) ** 2 + (se0 / m0) ** 2)
+    lift = ratio - 1
+    return lift, lift - z * se, lift + z * se
+
+
+def compare(
+    summary: pd.DataFrame,
+    metrics: list[str],
+    control: str,
+    binary: tuple[str, ...] = ("conversion",),
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """Compare every variant against control for every metric.
+
+    Binary metrics use a pooled two-proportion z-test, continuous metrics a
+    Welch t-test. Each row also carries the relative lift and its CI.
+    """
+    z_crit = stats.norm.ppf(1 - alpha / 2)
+    rows = []
+    for metric in metrics:
+        mom = metric_moments(summary, metric)
+        c = mom.loc[control]
+        treat = mom.drop(index=control)
+        n0, m0, v0 = c["n"], c["mean"], c["var"]
+        n1, m1, v1 = treat["n"].to_numpy(), treat["mean"].to_numpy(), treat["var"].to_numpy()
+        if metric in binary:
+            pooled = (c["sum"] + treat["sum"].to_numpy()) / (n0 + n1)
+            se_diff = np.sqrt(pooled * (1 - pooled) * (1 / n0 + 1 / n1))
+            stat = (m1 - m0) / se_diff
+            p_value = 2 * stats.norm.sf(np.abs(stat))
+            test = "two-proportion z"
+            v0, v1 = m0 * (1 - m0), m1 * (1 - m1)
+        else:
+            se_diff = np.sqrt(v1 / n1 + v0 / n0)
+            stat = (m1 - m0) / se_diff
+            dof = se_diff**4 / ((v1 / n1) ** 2 / (n1 - 1) + (v0 / n0) ** 2 / (n0 - 1))
+            p_value = 2 * stats.t.sf(np.abs(stat), dof)
+            test = "Welch t"
+        lift, lo, hi = _lift_ci(m0, m1, np.sqrt(v0 / n0), np.sqrt(v1 / n1), z_crit)
+        for i, variant in enumerate(treat.index):
+            rows.append({
+                "metric": metric,
+                "variant": variant,
+                "control_mean": m0,
+                "variant_mean": m1[i],
+                "relative_lift": lift[i],
+                "lift_ci_low": lo[i],
+                "lift_ci_high": hi[i],
+                "test": test,
+                "statistic": stat[i],
+                "p_value": p_value[i],
+            })
+    return pd.DataFrame(rows)
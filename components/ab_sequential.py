@@ -0,0 +1,80 @@
+"""Always-valid sequential monitoring for conversion experiments.
+
+Implements the mixture sequential probability ratio test (mSPRT) with a
+normal mixing distribution on the difference in conversion rates. The
+always-valid p-value can be checked after every look without inflating the
+false-positive rate, so experiments can stop as soon as the evidence is in.
+Looks are built from the accumulator cells (ab_stream) in time order.
+"""
+import numpy as np
+import pandas as pd
+
+# Emergency brake from the MRM design: halt on strong evidence of >20% harm.
+HARM_ALPHA = 0.001
+HARM_LIFT = -0.20
+
+
+def cumulative_looks(
+    cells: pd.DataFrame,
+    control: str,
+    treatment: str,
+    look_key: str = "cohort",
+    metric: str = "conversion",
+) -> pd.DataFrame:
+    """Cumulative per-variant counts at each look, ordered by look_key.
+
+    Returns one row per look with n0, x0 (control) and n1, x1 (treatment).
+    """
+    per_look = cells.groupby(level=[look_key, "variant"], sort=True)[["n", f"{metric}_sum"]].sum()
+    n = per_look["n"].unstack("variant", fill_value=0).cumsum()
+    x = per_look[f"{metric}_sum"].unstack("variant", fill_value=0).cumsum()
+    return pd.DataFrame({
+        "n0": n[control], "x0": x[control], "n1": n[treatment], "x1": x[treatment],
+    })
+
+
+def msprt(looks: pd.DataFrame, tau: float = 0.05, alpha: float = 0.05) -> pd.DataFrame:
+    """Run the mSPRT over cumulative looks and report the decision at each.
+
+    tau is the standard deviation of the normal mixture over the true
+    difference in rates. Adds lift, z, always_valid_p and decision columns;
+    once a stop is reached, later looks report "stopped". Looks with an
+    empty arm or zero variance carry no evidence and keep the previous p.
+    """
+    n0, x0 = looks["n0"].to_numpy(float), looks["x0"].to_numpy(float)
+    n1, x1 = looks["n1"].to_numpy(float), looks["x1"].to_numpy(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p0, p1 = x0 / n0, x1 / n1
+        diff = p1 - p0
+        var = p0 * (1 - p0) / n0 + p1 * (1 - p1) / n1
+        tau2 = tau * tau
+        log_lr = 0.5 * np.log(var / (var + tau2)) + tau2 * diff**2 / (2 * var * (var + tau2))
+        informative = (n0 > 0) & (n1 > 0) & (var > 0) & np.isfinite(log_lr)
+        p_look = np.where(informative, np.minimum(1.0, np.exp(-np.where(informative, log_lr, 0.0))), 1.0)
+        lift = np.where(p0 > 0, diff / np.where(p0 > 0, p0, 1), np.nan)
+        z = np.where(informative, diff / np.sqrt(var), np.nan)
+    p_valid = np.minimum.accumulate(p_look)
+
+    decisions = []
+    stopped = False
+    for pv, lf in zip(p_valid, lift):
+        if stopped:
+            decisions.append("stopped")
+        elif pv < HARM_ALPHA and lf <= HARM_LIFT:
+            decisions.append("stop: harm")
+            stopped = True
+        elif pv < alpha and lf > 0:
+            decisions.append("stop: success")
+            stopped = True
+        elif pv < alpha:
+            decisions.append("stop: negative")
+            stopped = True
+        else:
+            decisions.append("continue")
+
+    out = looks.copy()
+    out["lift"] = lift
+    out["z"] = z
+    out["always_valid_p"] = p_valid
+    out["decision"] = decisions
+    return out
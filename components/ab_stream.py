@@ -0,0 +1,143 @@
+"""Incremental A/B statistics over an append-only event CSV.
+
+Per-(variant, segment, cohort) sufficient statistics are persisted to disk
+together with a byte-offset high-water mark. A refresh only parses bytes
+appended since the last run, chunk by chunk, and folds them into the stored
+cells; chi-square and fairness tables are then rolled up from the cells, so
+their cost depends on the number of cells, not on the history length.
+"""
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from components.ab_engine import merge, summarize
+
+DEFAULT_KEYS = ("variant", "segment", "cohort")
+DEFAULT_METRICS = ("conversion", "revenue")
+_PREFIX_BYTES = 4096
+
+
+def _prefix_digest(path: Path, size: int = _PREFIX_BYTES) -> str:
+    """Hash of the first `size` bytes; a change means the file was rewritten, not appended."""
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(size), digest_size=8).hexdigest()
+
+
+def _stamp_prefix(source: Path, state: dict) -> None:
+    # only bytes already folded are hashed, so appends to a short file keep the state valid
+    state["prefix_bytes"] = min(_PREFIX_BYTES, state["offset"])
+    state["prefix"] = _prefix_digest(source, state["prefix_bytes"])
+
+
+def load_state(state_path: Path) -> dict | None:
+    """Return the persisted accumulator state, or None if absent/unreadable."""
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(state_path: Path, state: dict) -> None:
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = state_path.with_suffix(f".tmp-{os.getpid()}")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, state_path)
+
+
+def _cells_to_frame(state: dict) -> pd.DataFrame:
+    keys = state["keys"]
+    if not state["cells"]:
+        cols = ["n"] + [c for m in state["metrics"] for c in (f"{m}_sum", f"{m}_sumsq")]
+        return pd.DataFrame(columns=keys + cols).set_index(keys)
+    return pd.DataFrame(state["cells"]).set_index(keys)
+
+
+def _new_state(source: Path, keys, metrics) -> dict:
+    with open(source, "rb") as f:
+        header_line = f.readline()
+    state = {
+        "source": source.name,
+        "header": header_line.decode().strip().split(","),
+        "offset": len(header_line),
+        "rows": 0,
+        "keys": list(keys),
+        "metrics": list(metrics),
+        "cells": [],
+    }
+    _stamp_prefix(source, state)
+    return state
+
+
+def _blocks(source: Path, offset: int, chunk_bytes: int):
+    """Yield (bytes, end_offset) blocks of complete lines starting at offset."""
+    with open(source, "rb") as f:
+        f.seek(offset)
+        carry = b""
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                return
+            data = carry + data
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                carry = data
+                continue
+            offset += cut
+            carry = data[cut:]
+            yield data[:cut], offset
+
+
+def refresh(
+    source: Path,
+    state_path: Path,
+    keys=DEFAULT_KEYS,
+    metrics=DEFAULT_METRICS,
+    chunk_bytes: int = 64 << 20,
+) -> pd.DataFrame:
+    """Fold rows appended to source since the last refresh; return all cells.
+
+    The state is rebuilt from scratch when the file head, key set or metric
+    set no longer matches. A trailing partial line is left for the next run.
+    Cells are persisted per key combination, so at least one key is needed.
+    """
+    if not keys:
+        raise ValueError("refresh needs at least one key column")
+    state = load_state(state_path)
+    if (
+        state is None
+        or state.get("prefix") != _prefix_digest(source, state.get("prefix_bytes", _PREFIX_BYTES))
+        or state.get("keys") != list(keys)
+        or state.get("metrics") != list(metrics)
+        or state.get("offset", 0) > source.stat().st_size
+    ):
+        state = _new_state(source, keys, metrics)
+    cells = _cells_to_frame(state)
+    dtypes = {k: str for k in keys}
+    for block, end in _blocks(source, state["offset"], chunk_bytes):
+        chunk = pd.read_csv(io.BytesIO(block), names=state["header"], header=None, dtype=dtypes)
+        part = summarize(chunk, list(metrics), by=list(keys))
+        cells = part if cells.empty else merge(cells, part)
+        state["offset"] = end
+        state["rows"] += len(chunk)
+        if state.get("prefix_bytes", _PREFIX_BYTES) < _PREFIX_BYTES:
+            _stamp_prefix(source, state)
+        state["cells"] = cells.reset_index().to_dict(orient="records")
+        try:
+            _save_state(state_path, state)
+        except OSError:
+            pass
+    return cells
+
+
+def rollup(cells: pd.DataFrame, by: str | list[str]) -> pd.DataFrame:
+    """Collapse accumulator cells to a coarser grouping (e.g. variant only; [] for the overall total)."""
+    by = [by] if isinstance(by, str) else list(by)
+    if not by:
+        return cells.sum().to_frame("All").T.astype({"n": "int64"})
+    return cells.groupby(level=by, sort=True).sum()
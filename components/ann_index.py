@@ -0,0 +1,229 @@
+"""Approximate nearest neighbours over standardized customer vectors (IVF-PQ).
+
+A coarse mini-batch K-means splits the rows into inverted lists. Each row is
+stored in its list as product-quantization codes of its residual from the
+list centroid: one uint8 per subspace, so the whole index is n * m bytes plus
+row ids. A query visits only the n_probe nearest lists. It builds one lookup
+table per (probed list, subspace) and scores every candidate with m table
+gathers and a sum (asymmetric distance); a block of queries shares those
+gathers. Optionally the best candidates are re-ranked with exact distances
+read from the memory-mapped matrix. All arrays are saved as .npy files and
+load memory-mapped.
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.kmeans import _open, _sq_distances, assign, fit_minibatch
+
+_ARRAYS = ("mean", "std", "coarse", "codebooks", "bounds", "ids", "codes", "offsets")
+_TABLE_BLOCK = 1 << 20
+
+
+def _standardize(index: dict, X) -> np.ndarray:
+    return (np.asarray(X, dtype=np.float64) - index["mean"]) / index["std"]
+
+
+def build_ivf_pq(
+    source,
+    mean: np.ndarray,
+    std: np.ndarray,
+    n_lists: int | None = None,
+    m: int | None = None,
+    n_codes: int = 256,
+    train_size: int = 65536,
+    chunk_rows: int = 65536,
+    seed: int = 0,
+) -> dict:
+    """Build the index over the rows of a matrix (or .npy path), standardized by mean/std.
+
+    n_lists defaults to sqrt(rows); m (subspaces) defaults to one per feature,
+    which suits low-dimensional behavioural features.
+    """
+    matrix = _open(source)
+    n, p = matrix.shape
+    n_lists = n_lists or max(1, int(np.sqrt(n)))
+    m = m or p
+    bounds = np.linspace(0, p, m + 1).round().astype(int)
+    rng = np.random.default_rng(seed)
+
+    coarse = fit_minibatch(source, n_lists, mean, std, seed=seed, init_size=min(n, train_size))["centers"]
+    lists, _ = assign(source, {"mean": mean, "std": std, "centers": coarse}, chunk_rows)
+
+    sample = np.sort(rng.choice(n, min(n, train_size), replace=False))
+    residual = (np.asarray(matrix[sample], dtype=np.float64) - mean) / std - coarse[lists[sample]]
+    codebooks = np.full((m, n_codes, bounds.max() if m else 0), 1e30)
+    for j in range(m):
+        sub = residual[:, bounds[j] : bounds[j + 1]]
+        book = fit_minibatch(sub, min(n_codes, len(sub)), np.zeros(sub.shape[1]), np.ones(sub.shape[1]), seed=seed)["centers"]
+        if sub.shape[1] == 1:
+            book = np.sort(book, axis=0)
+        codebooks[j, : len(book), : sub.shape[1]] = book
+
+    codes = np.empty((n, m), dtype=np.uint8)
+    for start in range(0, n, chunk_rows):
+        block = (np.asarray(matrix[start : start + chunk_rows], dtype=np.float64) - mean) / std
+        block -= coarse[lists[start : start + len(block)]]
+        for j in range(m):
+            width = bounds[j + 1] - bounds[j]
+            book = codebooks[j, :, :width]
+            if width == 1:
+                # scalar subspace: the nearest code is found between sorted codebook midpoints
+                used = book[book[:, 0] < 1e30, 0]
+                code = np.searchsorted((used[1:] + used[:-1]) / 2, block[:, bounds[j]])
+            else:
+                code = _sq_distances(block[:, bounds[j] : bounds[j + 1]], book).argmin(axis=1)
+            codes[start : start + len(block), j] = code
+
+    ids = np.argsort(lists, kind="stable").astype(np.int64)
+    return {
+        "mean": np.asarray(mean, dtype=np.float64),
+        "std": np.asarray(std, dtype=np.float64),
+        "coarse": coarse,
+        "codebooks": codebooks,
+        "bounds": bounds,
+        "ids": ids,
+        "codes": np.ascontiguousarray(codes[ids]),
+        "offsets": np.r_[0, np.cumsum(np.bincount(lists, minlength=n_lists))],
+    }
+
+
+def save_ann(index: dict, path: Path) -> None:
+    """Write into a temp directory renamed into place, so readers never see a partial index."""
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", index[name])
+        with open(tmp / "meta.json", "w") as f:
+            json.dump({"rows": len(index["ids"]), "lists": len(index["coarse"])}, f)
+        os.replace(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_ann(path: Path, mmap: bool = True) -> dict:
+    """Load saved arrays; memory-mapped by default so processes share pages."""
+    mode = "r" if mmap else None
+    return {name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS}
+
+
+def _adc_candidates(index: dict, z: np.ndarray, probes: np.ndarray, keep: int) -> tuple[np.ndarray, np.ndarray]:
+    """The `keep` best rows per query by asymmetric distance: (ids, distances), padded with -1 / inf.
+
+    Candidates of all queries are laid out flat (one run per probed list) and
+    scored with one gather per subspace into that subspace's (query, probe,
+    code) table, then scattered into a padded (queries, candidates) matrix.
+    """
+    coarse, books, bounds = index["coarse"], index["codebooks"], index["bounds"]
+    offsets, codes, ids = index["offsets"], index["codes"], index["ids"]
+    q, n_probe = probes.shape
+    m = len(bounds) - 1
+    sizes = (offsets[probes + 1] - offsets[probes]).ravel()
+    per_query = sizes.reshape(q, n_probe).sum(axis=1)
+    total = int(sizes.sum())
+    slot = np.repeat(np.arange(q * n_probe), sizes)
+    pos = np.arange(total) + np.repeat(offsets[probes.ravel()] - (np.cumsum(sizes) - sizes), sizes)
+    owner = slot // n_probe
+    col = np.arange(total) - np.repeat(np.cumsum(per_query) - per_query, per_query)
+
+    # one table per (query, probed list, subspace): distances from the query's residual to every code
+    residual = z[:, None, :] - coarse[probes]
+    cand_codes = codes[pos]
+    scores = np.zeros(total)
+    for j in range(m):
+        sub = books[j, :, : bounds[j + 1] - bounds[j]]
+        table = ((residual[:, :, None, bounds[j] : bounds[j + 1]] - sub) ** 2).sum(axis=3).reshape(-1)
+        scores += table.take(slot * sub.shape[0] + cand_codes[:, j])
+    width = int(per_query.max()) if q else 0
+    dist = np.full((q, width), np.inf)
+    dist[owner, col] = scores
+    rows = np.full((q, width), -1, dtype=np.int64)
+    rows[owner, col] = ids[pos]
+    keep = min(keep, width)
+    if keep == 0:
+        return rows[:, :0], dist[:, :0]
+    best = np.argpartition(dist, keep - 1, axis=1)[:, :keep]
+    return np.take_along_axis(rows, best, axis=1), np.take_along_axis(dist, best, axis=1)
+
+
+def search(index: dict, queries, k: int = 10, n_probe: int = 8, source=None, rerank: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """k nearest rows for each raw query row: (ids, squared distances), both (queries, k).
+
+    With source (the indexed matrix) the best `rerank` candidates (default
+    4 * k) are re-scored exactly. Missing neighbours are padded with -1 / inf.
+    Queries run in blocks whose lookup tables hold about _TABLE_BLOCK floats.
+    """
+    z = _standardize(index, np.atleast_2d(queries))
+    coarse, books = index["coarse"], index["codebooks"]
+    n_probe = min(n_probe, len(coarse))
+    probes = np.argsort(_sq_distances(z, coarse), axis=1)[:, :n_probe]
+    matrix = _open(source) if source is not None else None
+    keep = (rerank or 4 * k) if matrix is not None else k
+    block = max(1, _TABLE_BLOCK // max(1, n_probe * books.shape[0] * books.shape[1]))
+
+    out_ids = np.full((len(z), k), -1, dtype=np.int64)
+    out_d = np.full((len(z), k), np.inf)
+    for start in range(0, len(z), block):
+        zb = z[start : start + block]
+        cand, dist = _adc_candidates(index, zb, probes[start : start + block], keep)
+        if matrix is not None:
+            found = cand >= 0
+            # each distinct candidate row is read once, in sorted order for sequential mmap access
+            rows, inverse = np.unique(cand[found], return_inverse=True)
+            dist = np.full(cand.shape, np.inf)
+            dist[found] = ((_standardize(index, matrix[rows])[inverse] - zb[np.nonzero(found)[0]]) ** 2).sum(axis=1)
+        top = np.argsort(dist, axis=1, kind="stable")[:, :k]
+        out_ids[start : start + len(zb), : top.shape[1]] = np.take_along_axis(cand, top, axis=1)
+        out_d[start : start + len(zb), : top.shape[1]] = np.take_along_axis(dist, top, axis=1)
+    return out_ids, out_d
+
+
+def exact_search(index: dict, source, queries, k: int = 10, chunk_rows: int = 65536) -> tuple[np.ndarray, np.ndarray]:
+    """Brute-force k nearest rows in the same standardized space (the recall baseline)."""
+    z = _standardize(index, np.atleast_2d(queries))
+    matrix = _open(source)
+    best_ids = np.empty((len(z), 0), dtype=np.int64)
+    best_d = np.empty((len(z), 0))
+    for start in range(0, len(matrix), chunk_rows):
+        d = _sq_distances(z, _standardize(index, matrix[start : start + chunk_rows]))
+        all_d = np.concatenate([best_d, d], axis=1)
+        all_ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, start + d.shape[1]), d.shape)], axis=1)
+        top = np.argsort(all_d, axis=1, kind="stable")[:, :k]
+        best_d = np.take_along_axis(all_d, top, axis=1)
+        best_ids = np.take_along_axis(all_ids, top, axis=1)
+    return best_ids, best_d
+
+
+def recall_benchmark(index: dict, source, queries, k: int = 10, probes=(1, 2, 4, 8, 16), rerank: bool = True) -> pd.DataFrame:
+    """Recall@k against brute force and ms per query, for each n_probe."""
+    truth, _ = exact_search(index, source, queries, k)
+    rows = []
+    for n_probe in probes:
+        start = time.perf_counter()
+        found, _ = search(index, queries, k, n_probe, source if rerank else None)
+        elapsed = time.perf_counter() - start
+        hits = sum(len(np.intersect1d(a, b)) for a, b in zip(found, truth))
+        rows.append({"n_probe": n_probe, "recall": hits / truth.size, "ms_per_query": 1000 * elapsed / len(truth)})
+    return pd.DataFrame(rows).set_index("n_probe")
+
+
+def look_alikes(index: dict, seeds, size: int = 100, k: int = 20, n_probe: int = 8, source=None) -> pd.DataFrame:
+    """Rows most often among the seeds' nearest neighbours, seeds excluded.
+
+    seeds are raw feature rows of the seed audience plus their row ids as a
+    (rows, ids) pair. Returns row, votes and the closest distance to any seed,
+    best first.
+    """
+    rows, seed_ids = seeds
+    found, dist = search(index, rows, k + 1, n_probe, source)
+    hits = pd.DataFrame({"row": found.ravel(), "distance": dist.ravel()})
+    hits = hits[(hits["row"] >= 0) & ~hits["row"].isin(np.asarray(seed_ids))]
+    ranked = hits.groupby("row").agg(votes=("distance", "size"), distance=("distance", "min"))
+    return ranked.sort_values(["votes", "distance"], ascending=[False, True]).head(size).reset_index()
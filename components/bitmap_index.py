@@ -0,0 +1,181 @@
+"""Roaring-style compressed bitmaps over categorical columns.
+
+Row ids are split by their high 16 bits into chunks of 65,536 rows. A chunk
+is stored as a sorted uint16 array while it holds at most 4,096 rows, and as
+a 1,024-word uint64 bitset once it is denser (the size at which the two cost
+the same 8 KB). A bitmap is a dict {chunk: container}. AND, OR and AND-NOT
+work chunk by chunk: word-wise for two bitsets, merges for two arrays and bit
+probes for mixed pairs. A filter over several columns is then a handful of
+set operations on compact containers rather than full-length boolean masks,
+and cross-tab counts come from popcounts of intersections.
+"""
+import numpy as np
+import pandas as pd
+
+ARRAY_MAX = 4096
+_WORDS = 1024
+
+
+def _popcount(words: np.ndarray) -> int:
+    """Set bits in a uint64 array; np.bitwise_count needs NumPy 2.0, older versions unpack bytes."""
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def _to_bitset(values: np.ndarray) -> np.ndarray:
+    words = np.zeros(_WORDS, dtype=np.uint64)
+    v = values.astype(np.uint64)
+    np.bitwise_or.at(words, (v >> np.uint64(6)).astype(np.intp), np.uint64(1) << (v & np.uint64(63)))
+    return words
+
+
+def _to_array(words: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(words.view(np.uint8), bitorder="little")
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _is_bitset(container: np.ndarray) -> bool:
+    return container.dtype == np.uint64
+
+
+def _pack(container: np.ndarray) -> np.ndarray | None:
+    """Normalize a result container: arrays when sparse, bitsets when dense, None when empty."""
+    if _is_bitset(container):
+        count = _popcount(container)
+        if count == 0:
+            return None
+        return container if count > ARRAY_MAX else _to_array(container)
+    if len(container) == 0:
+        return None
+    return _to_bitset(container) if len(container) > ARRAY_MAX else container
+
+
+def _contains(words: np.ndarray, values: np.ndarray) -> np.ndarray:
+    v = values.astype(np.uint64)
+    return ((words[(v >> np.uint64(6)).astype(np.intp)] >> (v & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+
+def from_rows(rows) -> dict:
+    """Bitmap of a set of non-negative row ids."""
+    rows = np.unique(np.asarray(rows, dtype=np.int64))
+    chunks = rows >> 16
+    bounds = np.flatnonzero(np.r_[True, chunks[1:] != chunks[:-1], True])
+    out = {}
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        container = _pack((rows[lo:hi] & 0xFFFF).astype(np.uint16))
+        if container is not None:
+            out[int(chunks[lo])] = container
+    return out
+
+
+def from_mask(mask) -> dict:
+    return from_rows(np.flatnonzero(np.asarray(mask, dtype=bool)))
+
+
+def to_rows(bitmap: dict) -> np.ndarray:
+    """Sorted row ids of a bitmap."""
+    parts = [
+        (_to_array(c) if _is_bitset(c) else c).astype(np.int64) + (key << 16) for key, c in sorted(bitmap.items())
+    ]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def cardinality(bitmap: dict) -> int:
+    return sum(_popcount(c) if _is_bitset(c) else len(c) for c in bitmap.values())
+
+
+def _and(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if _is_bitset(a) and _is_bitset(b):
+        return a & b
+    if _is_bitset(a):
+        return b[_contains(a, b)]
+    if _is_bitset(b):
+        return a[_contains(b, a)]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+def _or(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if _is_bitset(a) or _is_bitset(b):
+        return (a if _is_bitset(a) else _to_bitset(a)) | (b if _is_bitset(b) else _to_bitset(b))
+    return np.union1d(a, b).astype(np.uint16)
+
+
+def _andnot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if _is_bitset(a) and _is_bitset(b):
+        return a & ~b
+    if _is_bitset(b):
+        return a[~_contains(b, a)]
+    if _is_bitset(a):
+        return a & ~_to_bitset(b)
+    return np.setdiff1d(a, b, assume_unique=True)
+
+
+def bitmap_and(a: dict, b: dict) -> dict:
+    out = {}
+    for key in a.keys() & b.keys():
+        container = _pack(_and(a[key], b[key]))
+        if container is not None:
+            out[key] = container
+    return out
+
+
+def bitmap_or(a: dict, b: dict) -> dict:
+    out = dict(a)
+    for key, container in b.items():
+        out[key] = _pack(_or(out[key], container)) if key in out else container
+    return out
+
+
+def bitmap_andnot(a: dict, b: dict) -> dict:
+    out = {}
+    for key, container in a.items():
+        result = _pack(_andnot(container, b[key])) if key in b else container
+        if result is not None:
+            out[key] = result
+    return out
+
+
+def build_bitmaps(df: pd.DataFrame, columns: list[str]) -> dict:
+    """One bitmap per (column, value): {"rows": n, "bitmaps": {column: {value: bitmap}}}.
+
+    Rows are grouped by value code with one stable sort per column, so each
+    bitmap is built from an already sorted run of row ids. Missing values get
+    no bitmap.
+    """
+    bitmaps = {}
+    for col in columns:
+        codes, uniques = pd.factorize(df[col], sort=True)
+        order = np.argsort(codes, kind="stable")
+        cut = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        bitmaps[col] = {
+            value: from_rows(order[cut[i] : cut[i + 1]]) for i, value in enumerate(uniques.tolist())
+        }
+    return {"rows": len(df), "bitmaps": bitmaps}
+
+
+def select(index: dict, filters: dict) -> dict:
+    """Rows matching every filter: {column: value or list of values}.
+
+    Values of one column are OR-ed, columns are AND-ed; an empty filter
+    dict selects every row.
+    """
+    result = None
+    for col, wanted in filters.items():
+        values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+        column = {}
+        for value in values:
+            column = bitmap_or(column, index["bitmaps"][col].get(value, {}))
+        result = column if result is None else bitmap_and(result, column)
+    return from_rows(np.arange(index["rows"])) if result is None else result
+
+
+def crosstab(index: dict, rows: str, columns: str, within: dict | None = None) -> pd.DataFrame:
+    """Counts for every (rows value, columns value) pair, optionally within a selection."""
+    left = index["bitmaps"][rows]
+    right = index["bitmaps"][columns]
+    if within is not None:
+        right = {value: bitmap_and(b, within) for value, b in right.items()}
+    return pd.DataFrame(
+        {c: {r: cardinality(bitmap_and(lb, rb)) for r, lb in left.items()} for c, rb in right.items()}
+    ).rename_axis(index=rows, columns=columns)
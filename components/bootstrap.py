@@ -0,0 +1,228 @@
+"""Vectorized bootstrap confidence intervals for portfolio metrics.
+
+Resamples are represented as a (B, n) weight matrix: multinomial counts
+from an index matrix, or i.i.d. Poisson(1) weights, an approximation that
+needs no global row index and so also suits chunked or distributed data.
+Statistics are batched functions of that matrix (mostly matrix-vector
+products), so all B replicates are evaluated at once; weighted Cox fits
+refit once per replicate row. Large jobs are split into row blocks that can
+run across a process pool. The PCA retained-variance bootstrap instead
+streams a memory-mapped matrix once, drawing Poisson weights per chunk of
+rows. Results are memoized on disk per dataset version, metric and the
+settings that change them, and statistics are only built on a cache miss.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from components.data_store import CACHE_DIR
+from components.pca_stats import components_for_variance
+from components.survival import fit_cox
+
+BOOT_DIR = CACHE_DIR / "bootstrap"
+_BLOCK_BYTES = 64 << 20
+
+
+# Batched statistics: weights (b, n) -> (b,) estimates. Module-level so that
+# partials of them pickle cleanly into worker processes.
+def weighted_mean(weights, x):
+    return (weights @ x) / weights.sum(axis=1)
+
+
+def weighted_ratio(weights, num, den):
+    return (weights @ num) / (weights @ den)
+
+
+def weighted_lift(weights, y, treat, control):
+    t = (weights @ (y * treat)) / (weights @ treat)
+    c = (weights @ (y * control)) / (weights @ control)
+    return t / c - 1
+
+
+def weighted_cox_hr(weights, X, duration, event):
+    return np.stack([np.exp(fit_cox(X, duration, event, weights=w)["coef"]) for w in weights])
+
+
+def mean_stat(x):
+    """Mean of x."""
+    return partial(weighted_mean, x=np.asarray(x, dtype=np.float64))
+
+
+def ratio_stat(num, den):
+    """sum(num) / sum(den), e.g. precision = TP / predicted positives."""
+    return partial(weighted_ratio, num=np.asarray(num, dtype=np.float64), den=np.asarray(den, dtype=np.float64))
+
+
+def lift_stat(y, treat, control):
+    """Relative lift of mean(y) in treat over control (0/1 masks)."""
+    return partial(
+        weighted_lift,
+        y=np.asarray(y, dtype=np.float64),
+        treat=np.asarray(treat, dtype=np.float64),
+        control=np.asarray(control, dtype=np.float64),
+    )
+
+
+def cox_stat(X, duration, event):
+    """Hazard ratios of a Cox fit on the design frame X, one column per covariate."""
+    return partial(
+        weighted_cox_hr,
+        X=X,
+        duration=np.asarray(duration, dtype=np.float64),
+        event=np.asarray(event, dtype=bool),
+    )
+
+
+def _weights(rng, b, n, method):
+    if method == "poisson":
+        return rng.poisson(1.0, size=(b, n)).astype(np.float64)
+    idx = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+    return np.bincount(idx.ravel(), minlength=b * n).reshape(b, n).astype(np.float64)
+
+
+def _run_block(statistic, n, b, method, seed):
+    """Evaluate one block of b replicates, sub-blocked to bound memory."""
+    rng = np.random.default_rng(seed)
+    rows = max(1, _BLOCK_BYTES // (16 * n))
+    out = []
+    for start in range(0, b, rows):
+        out.append(statistic(_weights(rng, min(rows, b - start), n, method)))
+    return np.concatenate(out)
+
+
+def bootstrap(
+    statistic,
+    n: int,
+    n_boot: int = 2000,
+    ci: float = 0.95,
+    method: str = "index",
+    seed: int = 0,
+    workers: int | None = None,
+) -> dict:
+    """Percentile bootstrap CI for a batched statistic over n rows.
+
+    method: "index" (exact multinomial resampling) or "poisson" (weights).
+    A statistic returning (b, p) gives per-column estimates and CIs as lists.
+    workers: number of processes; None or 1 runs in-process.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(max(1, workers or 1))
+    sizes = [len(part) for part in np.array_split(np.arange(n_boot), len(seeds))]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_run_block, [statistic] * len(seeds), [n] * len(seeds), sizes,
+                                  [method] * len(seeds), seeds))
+    else:
+        parts = [_run_block(statistic, n, b, method, s) for b, s in zip(sizes, seeds)]
+    reps = np.concatenate(parts)
+    return _summarize(reps, statistic(np.ones((1, n)))[0], ci, n_boot, method)
+
+
+def _summarize(reps, estimate, ci: float, n_boot: int, method: str) -> dict:
+    """Percentile CI and standard error from the finite replicates."""
+    reps = reps[np.isfinite(reps).reshape(len(reps), -1).all(axis=1)]
+    lo, hi = np.quantile(reps, [(1 - ci) / 2, 1 - (1 - ci) / 2], axis=0)
+    return {"estimate": _plain(estimate), "ci_low": _plain(lo), "ci_high": _plain(hi),
+            "se": _plain(reps.std(axis=0, ddof=1)), "n_boot": n_boot, "method": method}
+
+
+def _plain(value):
+    """Scalars as float, vector estimates as lists, so results stay JSON-serializable."""
+    return float(value) if np.ndim(value) == 0 else np.asarray(value, dtype=np.float64).tolist()
+
+
+def _variance_ratios(count, total, gram) -> np.ndarray:
+    """Explained-variance ratios (descending) of the correlation matrix of (weighted) moments."""
+    mean = total / count
+    cov = gram / count - np.outer(mean, mean)
+    scale = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    scale = np.where(scale > 0, scale, 1.0)
+    eigvals = np.clip(np.linalg.eigvalsh(cov / np.outer(scale, scale))[::-1], 0.0, None)
+    return eigvals / eigvals.sum()
+
+
+def retained_variance_bootstrap(
+    matrix: np.ndarray,
+    threshold: float = 0.95,
+    n_boot: int = 200,
+    ci: float = 0.95,
+    seed: int = 0,
+    chunk_rows: int = 16384,
+) -> dict:
+    """Poisson-bootstrap CI on the variance share the full-data PCA keeps for threshold.
+
+    One pass over row chunks, as in pca_stats.correlation_matrix: each chunk
+    draws its own (B, rows) Poisson(1) weights and adds to per-replicate
+    weighted sums and Gram matrices next to the unweighted ones. Cost is
+    O(B * rows * features^2), so B stays in the low hundreds.
+    """
+    n, p = matrix.shape
+    rng = np.random.default_rng(seed)
+    total, gram = np.zeros(p), np.zeros((p, p))
+    count, totals, grams = np.zeros(n_boot), np.zeros((n_boot, p)), np.zeros((n_boot, p, p))
+    for start in range(0, n, chunk_rows):
+        block = np.asarray(matrix[start:start + chunk_rows], dtype=np.float64)
+        weights = rng.poisson(1.0, size=(n_boot, len(block))).astype(np.float64)
+        total += block.sum(axis=0)
+        gram += block.T @ block
+        count += weights.sum(axis=1)
+        totals += weights @ block
+        for b in range(n_boot):
+            grams[b] += (block.T * weights[b]) @ block
+    ratios = _variance_ratios(n, total, gram)
+    k = components_for_variance(ratios, threshold)
+    reps = np.array([_variance_ratios(count[b], totals[b], grams[b])[:k].sum() for b in range(n_boot)])
+    return _summarize(reps, ratios[:k].sum(), ci, n_boot, "poisson")
+
+
+def _cached(name: str, compute) -> dict:
+    """compute() memoized as BOOT_DIR/<name>.json, shared by every process reading the cache."""
+    path = BOOT_DIR / f"{name}.json"
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    result = compute()
+    try:
+        BOOT_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp-{os.getpid()}")
+        with open(tmp, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return result
+
+
+def cached_bootstrap(
+    version: str,
+    metric: str,
+    make_statistic,
+    n: int,
+    n_boot: int = 2000,
+    ci: float = 0.95,
+    method: str = "index",
+    seed: int = 0,
+    workers: int | None = None,
+) -> dict:
+    """bootstrap() memoized on disk per (dataset version, metric, B, ci, method, seed).
+
+    make_statistic is a zero-argument callable returning the batched
+    statistic; it is only called on a cache miss, so cached results never
+    touch the data.
+    """
+    return _cached(
+        f"{version}-{metric}-{n_boot}-{method}-{ci:g}-{seed}",
+        lambda: bootstrap(make_statistic(), n, n_boot=n_boot, ci=ci, method=method, seed=seed, workers=workers),
+    )
+
+
+def cached_retained_variance(version: str, matrix, threshold: float = 0.95, n_boot: int = 200, ci: float = 0.95, seed: int = 0) -> dict:
+    """retained_variance_bootstrap() memoized on disk like cached_bootstrap()."""
+    return _cached(
+        f"{version}-retained_variance-{threshold:g}-{n_boot}-poisson-{ci:g}-{seed}",
+        lambda: retained_variance_bootstrap(matrix, threshold, n_boot=n_boot, ci=ci, seed=seed),
+    )
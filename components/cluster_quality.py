@@ -0,0 +1,147 @@
+"""Cluster-quality scores that scale to the full customer base.
+
+Exact silhouette needs all pairwise distances. Here it is estimated two ways.
+The simplified silhouette replaces mean distances with distances to the
+centroids, which is O(n k). The sampled silhouette computes exact values for
+a stratified sample of points: each sampled point is compared with every row
+through chunked distance blocks, and the blocks are reduced to per-cluster
+distance sums with one matrix multiply. Because of that, the stratified mean
+is an unbiased estimate of the full silhouette and comes with a confidence
+interval. Calinski-Harabasz and Davies-Bouldin come from per-cluster counts,
+sums and scatter accumulated chunk by chunk.
+"""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from components.kmeans import _open, _sq_distances
+
+
+def _chunks(source, model: dict, chunk_rows: int):
+    """Standardized row blocks of the matrix with their start offsets."""
+    matrix = _open(source)
+    for start in range(0, len(matrix), chunk_rows):
+        yield start, (np.asarray(matrix[start : start + chunk_rows], dtype=np.float64) - model["mean"]) / model["std"]
+
+
+def simplified_silhouette(source, model: dict, labels, chunk_rows: int = 65536) -> float:
+    """Mean of (b - a) / max(a, b) with a, b the distances to the own and nearest other centroid."""
+    labels = np.asarray(labels)
+    total = 0.0
+    for start, block in _chunks(source, model, chunk_rows):
+        d = np.sqrt(_sq_distances(block, model["centers"]))
+        own = labels[start : start + len(block)]
+        a = d[np.arange(len(block)), own]
+        d[np.arange(len(block)), own] = np.inf
+        b = d.min(axis=1)
+        with np.errstate(invalid="ignore"):
+            total += float(np.nan_to_num((b - a) / np.maximum(a, b)).sum())
+    return total / len(labels)
+
+
+def sampled_silhouette(
+    source,
+    model: dict,
+    labels,
+    sample_size: int = 1000,
+    confidence: float = 0.95,
+    seed: int = 0,
+    chunk_rows: int = 65536,
+) -> dict:
+    """Exact silhouette of a stratified sample (proportional per cluster), with a CI.
+
+    Returns estimate, ci_low, ci_high, standard error and the sample size.
+    """
+    labels = np.asarray(labels)
+    k = len(model["centers"])
+    sizes = np.bincount(labels, minlength=k)
+    n = len(labels)
+    rng = np.random.default_rng(seed)
+    take = np.minimum(sizes, np.maximum(2, np.round(sample_size * sizes / n).astype(int)))
+    sample = np.concatenate([
+        rng.choice(np.flatnonzero(labels == c), take[c], replace=False) for c in range(k) if take[c] > 0
+    ])
+    matrix = _open(source)
+    points = (np.asarray(matrix[np.sort(sample)], dtype=np.float64) - model["mean"]) / model["std"]
+    own = labels[np.sort(sample)]
+
+    sums = np.zeros((len(points), k))
+    for start, block in _chunks(source, model, chunk_rows):
+        onehot = np.zeros((len(block), k))
+        onehot[np.arange(len(block)), labels[start : start + len(block)]] = 1.0
+        sums += np.sqrt(_sq_distances(points, block)) @ onehot
+    rows = np.arange(len(points))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = sums[rows, own] / (sizes[own] - 1)
+        mean_other = sums / sizes
+    mean_other[rows, own] = np.inf
+    mean_other[:, sizes == 0] = np.inf
+    b = mean_other.min(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(sizes[own] > 1, (b - a) / np.maximum(a, b), 0.0)
+
+    weight = sizes / n
+    estimate, variance = 0.0, 0.0
+    for c in range(k):
+        part = s[own == c]
+        if len(part) == 0:
+            continue
+        estimate += weight[c] * part.mean()
+        if len(part) > 1:
+            # finite-population correction: strata are sampled without replacement
+            variance += weight[c] ** 2 * part.var(ddof=1) / len(part) * (1 - len(part) / sizes[c])
+    estimate, se = float(estimate), float(np.sqrt(variance))
+    z = float(stats.norm.ppf(0.5 + confidence / 2))
+    return {"estimate": estimate, "ci_low": estimate - z * se, "ci_high": estimate + z * se, "se": se, "sample": len(s)}
+
+
+def separation_scores(source, model: dict, labels, chunk_rows: int = 65536) -> dict:
+    """Calinski-Harabasz and Davies-Bouldin from one pass over the rows.
+
+    Cluster means and within-cluster sums of squares come from streamed
+    counts, sums and squared norms. Davies-Bouldin scatter (mean distance to
+    the center) is measured to the model's centers, which for a converged fit
+    are the cluster means.
+    """
+    labels = np.asarray(labels)
+    k, p = model["centers"].shape
+    counts = np.zeros(k)
+    sums = np.zeros((k, p))
+    sq = np.zeros(k)
+    dist = np.zeros(k)
+    for start, block in _chunks(source, model, chunk_rows):
+        lab = labels[start : start + len(block)]
+        counts += np.bincount(lab, minlength=k)
+        sums += np.stack([np.bincount(lab, weights=block[:, j], minlength=k) for j in range(p)], axis=1)
+        sq += np.bincount(lab, weights=(block**2).sum(axis=1), minlength=k)
+        dist += np.bincount(lab, weights=np.sqrt(_sq_distances(block, model["centers"])[np.arange(len(block)), lab]), minlength=k)
+    n = counts.sum()
+    used = counts > 0
+    means = sums[used] / counts[used, None]
+    grand = sums.sum(axis=0) / n
+    within = float((sq[used] - counts[used] * (means**2).sum(axis=1)).sum())
+    between = float((counts[used] * ((means - grand) ** 2).sum(axis=1)).sum())
+    m = int(used.sum())
+    ch = float(between * (n - m) / (within * (m - 1))) if m > 1 and within > 0 else float("nan")
+
+    scatter = dist[used] / counts[used]
+    centers = model["centers"][used]
+    gap = np.sqrt(_sq_distances(centers, centers))
+    np.fill_diagonal(gap, np.inf)
+    db = float(((scatter[:, None] + scatter[None, :]) / gap).max(axis=1).mean()) if m > 1 else float("nan")
+    return {"calinski_harabasz": ch, "davies_bouldin": db}
+
+
+def quality_report(source, models: dict, labels: dict, sample_size: int = 1000, seed: int = 0) -> pd.DataFrame:
+    """All scores for each k of a sweep: {k: model} and {k: labels} -> one row per k."""
+    rows = {}
+    for k, model in models.items():
+        sampled = sampled_silhouette(source, model, labels[k], sample_size, seed=seed)
+        rows[k] = {
+            "simplified_silhouette": simplified_silhouette(source, model, labels[k]),
+            "silhouette": sampled["estimate"],
+            "silhouette_ci_low": sampled["ci_low"],
+            "silhouette_ci_high": sampled["ci_high"],
+            **separation_scores(source, model, labels[k]),
+        }
+    return pd.DataFrame(rows).T.rename_axis("k")
@@ -0,0 +1,282 @@
+"""Shared columnar data layer for the analytics pages.
+
+Each CSV under data/ is parsed once into a typed column cache (one .npy file
+per column plus a JSON manifest) stored under data/.cache/ and keyed by the
+content hash of the source file. Later loads read the binary columns directly
+instead of re-parsing text, so cold starts in new worker processes are cheap.
+"""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+CACHE_DIR = DATA_DIR / ".cache"
+
+# Declared dtypes per dataset. Undeclared text columns become categoricals;
+# undeclared numeric columns are cast to "float_dtype" when one is given.
+DATASETS = {
+    "ab_test": {
+        "file": "ab_test_data.csv",
+        "dtypes": {
+            "user_id": "int64",
+            "variant": "category",
+            "conversion": "int8",
+            "revenue": "float64",
+            "segment": "category",
+            "cohort": "category",
+        },
+    },
+    "churn_survival": {
+        "file": "churn_survival_data.csv",
+        "dtypes": {
+            "customer_id": "int64",
+            "segment": "category",
+            "plan_type": "category",
+            "support_tickets": "int16",
+            "protected_class": "category",
+            "tenure": "int32",
+            "churned": "int8",
+            "observed": "int8",
+        },
+        "dates": ["signup_date"],
+    },
+    "targeting": {
+        "file": "targeting_classification_data.csv",
+        "dtypes": {
+            "prospect_id": "int64",
+            "company_size": "category",
+            "industry": "category",
+            "title_level": "category",
+            "whitepaper_downloads": "int16",
+            "pricing_page_visits": "int16",
+            "email_opens": "int16",
+            "email_clicks": "int16",
+            "days_since_last_activity": "int16",
+            "converted": "int8",
+            "protected_segment": "category",
+        },
+    },
+    "segmentation": {
+        "file": "segmentation_customer_data.csv",
+        "dtypes": {
+            "customer_id": "int64",
+            "recency_days": "int32",
+            "frequency": "int32",
+            "email_opens": "int32",
+            "site_visits": "int32",
+            "category_diversity": "int16",
+            "consent_profile": "bool",
+            "protected_region": "category",
+            "age_group": "category",
+            "segment_ground_truth": "category",
+            "cluster": "int16",
+            "segment_name": "category",
+        },
+        "dates": ["signup_date"],
+    },
+    "pca": {
+        "file": "pca_sample_data.csv",
+        "dtypes": {"fraud": "int8"},
+        "float_dtype": "float32",
+    },
+}
+
+_MANIFEST = "manifest.json"
+_STAMP = "stamp.json"
+
+
+def dataset_path(name: str) -> Path:
+    """Return the source CSV path for a registered dataset."""
+    return DATA_DIR / DATASETS[name]["file"]
+
+
+def _file_digest(path: Path) -> str:
+    """Content hash of a file, read in 1 MB blocks."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def dataset_version(name: str) -> str:
+    """Content hash of a dataset's source CSV.
+
+    The hash is remembered next to the cache together with the file size and
+    mtime, so unchanged files are not re-hashed by every new process.
+    """
+    path = dataset_path(name)
+    st_ = path.stat()
+    stamp_path = CACHE_DIR / name / _STAMP
+    try:
+        with open(stamp_path) as f:
+            stamp = json.load(f)
+        if stamp["size"] == st_.st_size and stamp["mtime_ns"] == st_.st_mtime_ns:
+            return stamp["digest"]
+    except (OSError, ValueError, KeyError):
+        pass
+    digest = _file_digest(path)
+    try:
+        stamp_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = stamp_path.with_suffix(f".tmp-{os.getpid()}")
+        with open(tmp, "w") as f:
+            json.dump({"size": st_.st_size, "mtime_ns": st_.st_mtime_ns, "digest": digest}, f)
+        os.replace(tmp, stamp_path)
+    except OSError:
+        pass
+    return digest
+
+
+def _parse_csv(name: str) -> pd.DataFrame:
+    """Parse the source CSV with the declared dtypes."""
+    spec = DATASETS[name]
+    df = pd.read_csv(
+        dataset_path(name),
+        dtype=spec.get("dtypes"),
+        parse_dates=spec.get("dates") or False,
+    )
+    float_dtype = spec.get("float_dtype")
+    for col in df.columns:
+        if col in (spec.get("dtypes") or {}) or col in (spec.get("dates") or []):
+            continue
+        if float_dtype and pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype(float_dtype)
+        elif not pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _write_columns(df: pd.DataFrame, target: Path, digest: str, source: str) -> None:
+    """Write one .npy per column plus a manifest, atomically via a temp dir."""
+    tmp = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+    tmp.mkdir(parents=True, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        fname = f"c{i:04d}.npy"
+        entry = {"name": col, "file": fname}
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(tmp / fname, series.cat.codes.to_numpy())
+            entry["dtype"] = "category"
+            entry["categories"] = series.cat.categories.tolist()
+        else:
+            arr = series.to_numpy()
+            np.save(tmp / fname, arr)
+            entry["dtype"] = str(arr.dtype)
+        columns.append(entry)
+    with open(tmp / _MANIFEST, "w") as f:
+        json.dump({"source": source, "digest": digest, "rows": len(df), "columns": columns}, f)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Another process finished the same conversion first.
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _prune(name: str, keep: str) -> None:
+    """Drop cache directories left behind by earlier versions of the source."""
+    for child in (CACHE_DIR / name).iterdir():
+        if child.is_dir() and not child.name.startswith(keep):
+            shutil.rmtree(child, ignore_errors=True)
+
+
+def _spec_key(name: str) -> str:
+    """Short hash of the dtype declaration, so changing it invalidates the cache."""
+    spec = json.dumps(DATASETS[name], sort_keys=True).encode()
+    return hashlib.blake2b(spec, digest_size=4).hexdigest()
+
+
+def ensure_cache(name: str) -> Path | None:
+    """Return the column-cache directory for a dataset, building it if needed.
+
+    Returns None when the cache cannot be written (e.g. read-only deploy).
+    """
+    digest = dataset_version(name)
+    key = f"{digest}-{_spec_key(name)}"
+    target = CACHE_DIR / name / key
+    if (target / _MANIFEST).exists():
+        return target
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _write_columns(_parse_csv(name), target, digest, DATASETS[name]["file"])
+        _prune(name, key)
+    except OSError:
+        return None
+    return target if (target / _MANIFEST).exists() else None
+
+
+def read_manifest(name: str) -> dict | None:
+    """Return the cache manifest for a dataset, or None if uncached."""
+    cache = ensure_cache(name)
+    if cache is None:
+        return None
+    with open(cache / _MANIFEST) as f:
+        manifest = json.load(f)
+    manifest["path"] = cache
+    return manifest
+
+
+def load_frame(name: str, columns: list[str] | None = None) -> pd.DataFrame:
+    """Load a dataset as a typed DataFrame from its column cache.
+
+    columns: optional subset to load; only those .npy files are read.
+    Falls back to parsing the CSV when the cache cannot be written.
+    """
+    manifest = read_manifest(name)
+    if manifest is None:
+        df = _parse_csv(name)
+        return df[columns] if columns is not None else df
+    wanted = set(columns) if columns is not None else None
+    data = {}
+    for entry in manifest["columns"]:
+        if wanted is not None and entry["name"] not in wanted:
+            continue
+        arr = np.load(manifest["path"] / entry["file"])
+        if entry["dtype"] == "category":
+            data[entry["name"]] = pd.Categorical.from_codes(arr, categories=entry["categories"])
+        else:
+            data[entry["name"]] = arr
+    df = pd.DataFrame(data)
+    return df[columns] if columns is not None else df
+
+
+def load_matrix(name: str) -> tuple[np.ndarray, list[str]]:
+    """Open the float feature columns of a dataset as one memory-mapped matrix.
+
+    The (rows, features) matrix is written once to the column cache as a
+    contiguous row-major .npy and then opened read-only with mmap, so every
+    process shares the OS page cache instead of holding its own copy. Slicing
+    (e.g. matrix[:15]) only touches the pages it reads. When the matrix file
+    cannot be written, the columns are stacked into an in-memory array.
+    Returns (matrix, column_names).
+    """
+    manifest = read_manifest(name)
+    if manifest is None:
+        df = _parse_csv(name)
+        cols = [c for c in df.columns if pd.api.types.is_float_dtype(df[c])]
+        return df[cols].to_numpy(), cols
+    entries = [e for e in manifest["columns"] if e["dtype"].startswith("float")]
+    cols = [e["name"] for e in entries]
+    path = manifest["path"] / "matrix.npy"
+    if not path.exists():
+        columns = [np.load(manifest["path"] / e["file"], mmap_mode="r") for e in entries]
+        dtype = np.result_type(*[e["dtype"] for e in entries])
+        tmp = path.with_name(f"matrix.tmp-{os.getpid()}.npy")
+        try:
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=(manifest["rows"], len(entries)))
+            for j, column in enumerate(columns):
+                out[:, j] = column
+            out.flush()
+            del out
+            os.replace(tmp, path)
+        except OSError:
+            # Cache not writable (shipped cache, read-only deploy, full disk):
+            # stack the memory-mapped columns in memory instead.
+            tmp.unlink(missing_ok=True)
+            return np.column_stack(columns), cols
+    return np.load(path, mmap_mode="r"), cols
@@ -0,0 +1,132 @@
+"""Feature drift monitoring from compact reference profiles.
+
+The reference window of each feature is reduced once to a fixed histogram:
+its distinct values when there are few, otherwise quantile bin edges, with
+counts per bin. Profiles are small JSON documents, so a new batch is checked
+with KS and PSI against the profile without touching the training data. All
+features of a batch are binned and counted with a single bincount over
+offset bin codes.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from components.data_store import CACHE_DIR
+
+PROFILE_DIR = CACHE_DIR / "drift"
+PSI_THRESHOLD = 0.2
+
+
+def build_profile(df: pd.DataFrame, features: list[str], bins: int = 64) -> dict:
+    """Histogram profile per feature: right-closed bin edges and bin counts.
+
+    Features with at most `bins` distinct values keep every value as an
+    edge, so their KS statistic is exact; others use reference quantiles.
+    """
+    profile = {}
+    for col in features:
+        x = df[col].dropna().to_numpy(np.float64)
+        uniq = np.unique(x)
+        discrete = len(uniq) <= bins
+        edges = uniq if discrete else np.unique(np.quantile(x, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, x, side="left"), minlength=len(edges) + 1)
+        profile[col] = {"edges": edges.tolist(), "counts": counts.tolist(), "n": int(len(x)), "discrete": discrete}
+    return profile
+
+
+def save_profile(profile: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".tmp-{os.getpid()}")
+    with open(tmp, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp, path)
+
+
+def load_profile(path: Path) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def batch_counts(profile: dict, batch: pd.DataFrame) -> dict:
+    """Counts of the batch in each feature's reference bins, one bincount for all."""
+    codes, offsets = [], [0]
+    for col, ref in profile.items():
+        x = batch[col].dropna().to_numpy(np.float64)
+        codes.append(np.searchsorted(np.asarray(ref["edges"]), x, side="left") + offsets[-1])
+        offsets.append(offsets[-1] + len(ref["edges"]) + 1)
+    counts = np.bincount(np.concatenate(codes), minlength=offsets[-1])
+    return {col: counts[offsets[i] : offsets[i + 1]] for i, col in enumerate(profile)}
+
+
+def compare(profile: dict, batch: pd.DataFrame, alpha: float = 0.05, psi_threshold: float = PSI_THRESHOLD) -> pd.DataFrame:
+    """KS (statistic and asymptotic p-value) and PSI of a batch per feature.
+
+    KS is the largest CDF gap at the reference edges; PSI uses the
+    reference bins with a small floor on empty bins.
+    """
+    rows = {}
+    for col, new in batch_counts(profile, batch).items():
+        ref = np.asarray(profile[col]["counts"], dtype=np.float64)
+        n_ref, n_new = ref.sum(), new.sum()
+        p_ref, p_new = ref / n_ref, new / n_new
+        ks = float(np.abs(np.cumsum(p_ref)[:-1] - np.cumsum(p_new)[:-1]).max(initial=0.0))
+        en = n_ref * n_new / (n_ref + n_new)
+        p_value = float(stats.kstwo.sf(ks, np.round(en)))
+        q_ref, q_new = np.maximum(p_ref, 1e-6), np.maximum(p_new, 1e-6)
+        psi = float(np.sum((q_new - q_ref) * np.log(q_new / q_ref)))
+        rows[col] = {
+            "ks_statistic": ks,
+            "p_value": p_value,
+            "psi": psi,
+            "drift_detected": bool(p_value < alpha or psi >= psi_threshold),
+            "exact_ks": profile[col]["discrete"],
+        }
+    return pd.DataFrame(rows).T.astype({"ks_statistic": float, "p_value": float, "psi": float})
+
+
+def append_to_log(log_path: Path, results: pd.DataFrame, reference: str, batch: str, alpha: float = 0.05) -> dict:
+    """Append a drift check to a governance log and refresh its summary fields.
+
+    The check is added to "drift_history"; "drift_monitoring" and
+    "drift_details" are updated to the latest check.
+    """
+    with open(log_path) as f:
+        log = json.load(f)
+    details = {
+        col: {
+            "ks_statistic": float(r["ks_statistic"]),
+            "p_value": float(r["p_value"]),
+            "psi": float(r["psi"]),
+            "drift_detected": bool(r["drift_detected"]),
+        }
+        for col, r in results.iterrows()
+    }
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "reference": reference,
+        "batch": batch,
+        "features": details,
+    }
+    log.setdefault("drift_history", []).append(entry)
+    monitoring = log.setdefault("drift_monitoring", {})
+    monitoring.update({
+        "method": "Kolmogorov-Smirnov Test + PSI (reference histogram profile)",
+        "drift_detected": any(d["drift_detected"] for d in details.values()),
+        "features_monitored": len(details),
+        "features_drifted": sum(d["drift_detected"] for d in details.values()),
+        "threshold": f"p < {alpha} or PSI >= {PSI_THRESHOLD}",
+    })
+    log["drift_details"] = details
+    tmp = log_path.with_suffix(f".tmp-{os.getpid()}")
+    with open(tmp, "w") as f:
+        json.dump(log, f, indent=2)
+    os.replace(tmp, log_path)
+    return entry
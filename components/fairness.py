@@ -0,0 +1,165 @@
+"""Shared fairness-audit engine (4/5ths rule, disparate impact, equalized odds).
+
+Every protected attribute is counted in one vectorized pass: the attribute
+codes are offset into a single key space and tallied with one bincount per
+statistic. Everything downstream (selection rates, disparate-impact ratios,
+TPR/FPR gaps, bootstrap CIs) is computed from the per-group counts, so the
+same code serves row-level data and pre-aggregated cells such as the A/B
+accumulator.
+"""
+import numpy as np
+import pandas as pd
+
+PROTECTED_ATTRIBUTES = ("segment", "protected_class", "protected_segment", "protected_region", "age_group")
+FOUR_FIFTHS = 0.8
+
+
+def group_counts(
+    df: pd.DataFrame,
+    selected: str,
+    attributes: list[str] | None = None,
+    label: str | None = None,
+    by: str | None = None,
+) -> pd.DataFrame:
+    """Per-(attribute, [by], group) counts for every attribute in one pass.
+
+    selected: 0/1 (or bool) column, e.g. conversion or model decision.
+    label: optional 0/1 ground truth, needed for equalized odds.
+    by: optional stratifier (e.g. variant); ratios are computed within it.
+    Returns columns n, selected and, with a label, positives and true_pos.
+    """
+    attributes = [a for a in (attributes or PROTECTED_ATTRIBUTES) if a in df.columns]
+    codes, names, offsets = [], [], [0]
+    for attr in attributes:
+        cat = df[attr].astype("category")
+        codes.append(cat.cat.codes.to_numpy().astype(np.int64))
+        names += [(attr, str(g)) for g in cat.cat.categories]
+        offsets.append(offsets[-1] + len(cat.cat.categories))
+    width = offsets[-1]
+    strata = pd.Index([None])
+    raw = np.concatenate(codes)
+    # missing values have code -1; mask them before offsetting or they land in the previous group
+    valid = raw >= 0
+    key = raw + np.repeat(offsets[:-1], len(df))
+    if by is not None:
+        by_cat = df[by].astype("category")
+        strata = by_cat.cat.categories
+        by_codes = np.tile(by_cat.cat.codes.to_numpy().astype(np.int64), len(attributes))
+        valid &= by_codes >= 0
+        key = key + by_codes * width
+    size = width * len(strata)
+
+    def tally(weights=None):
+        w = None if weights is None else np.tile(np.asarray(weights, dtype=np.float64), len(attributes))[valid]
+        return np.bincount(key[valid], weights=w, minlength=size)
+
+    sel = df[selected].to_numpy().astype(np.float64)
+    out = {"n": tally(), "selected": tally(sel)}
+    if label is not None:
+        lab = df[label].to_numpy().astype(np.float64)
+        out["positives"] = tally(lab)
+        out["true_pos"] = tally(sel * lab)
+
+    index = pd.MultiIndex.from_tuples(
+        [(attr, s, g) for s in strata for attr, g in names], names=["attribute", by or "stratum", "group"]
+    )
+    counts = pd.DataFrame(out, index=index)
+    counts = counts[counts["n"] > 0]
+    return counts if by is not None else counts.droplevel(1)
+
+
+def counts_from_aggregates(
+    agg: pd.DataFrame,
+    selected: str,
+    attributes: list[str] | None = None,
+    by: str | None = None,
+) -> pd.DataFrame:
+    """Same layout as group_counts, from pre-aggregated cells.
+
+    agg is indexed by key levels (e.g. variant, segment, cohort) and holds an
+    "n" column plus the summed selected column.
+    """
+    attributes = [a for a in (attributes or PROTECTED_ATTRIBUTES) if a in agg.index.names]
+    frames = []
+    for attr in attributes:
+        levels = [by, attr] if by is not None else [attr]
+        part = agg.groupby(level=levels, sort=True)[["n", selected]].sum()
+        part = part.rename(columns={selected: "selected"})
+        part.index = pd.MultiIndex.from_arrays(
+            [[attr] * len(part)] + [part.index.get_level_values(lvl).astype(str) for lvl in levels],
+            names=["attribute"] + ([by] if by is not None else []) + ["group"],
+        )
+        frames.append(part)
+    return pd.concat(frames)
+
+
+def _within(counts: pd.DataFrame) -> list:
+    """Index levels that define one comparison set (attribute [, stratum])."""
+    return list(counts.index.names[:-1])
+
+
+def disparate_impact(
+    counts: pd.DataFrame,
+    n_boot: int = 1000,
+    ci: float = 0.95,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Selection rate and disparate-impact ratio (vs best group) per group.
+
+    CIs come from a stratified bootstrap on the counts: resampling a 0/1
+    outcome within a group of size n is a Binomial(n, rate) draw, so all
+    groups and resamples are drawn as one (groups, n_boot) matrix.
+    """
+    levels = _within(counts)
+    n = counts["n"].to_numpy(float)
+    rate = counts["selected"].to_numpy(float) / n
+    out = counts.copy()
+    out["selection_rate"] = rate
+    best = out.groupby(level=levels)["selection_rate"].transform("max").to_numpy()
+    out["di_ratio"] = np.divide(rate, best, out=np.full_like(rate, np.nan), where=best > 0)
+    out["passes_four_fifths"] = out["di_ratio"] >= FOUR_FIFTHS
+
+    if n_boot:
+        rng = np.random.default_rng(seed)
+        boot = rng.binomial(n.astype(np.int64)[:, None], rate[:, None], size=(len(n), n_boot)) / n[:, None]
+        boot_best = pd.DataFrame(boot, index=counts.index).groupby(level=levels).transform("max").to_numpy()
+        ratio = np.divide(boot, boot_best, out=np.full_like(boot, np.nan), where=boot_best > 0)
+        lo, hi = np.nanquantile(ratio, [(1 - ci) / 2, 1 - (1 - ci) / 2], axis=1)
+        out["di_ci_low"], out["di_ci_high"] = lo, hi
+    return out
+
+
+def equalized_odds(counts: pd.DataFrame) -> pd.DataFrame:
+    """TPR and FPR per group plus the max-min gap within each attribute."""
+    tp = counts["true_pos"]
+    fp = counts["selected"] - tp
+    out = pd.DataFrame({
+        "tpr": tp / counts["positives"],
+        "fpr": fp / (counts["n"] - counts["positives"]),
+    })
+    grouped = out.groupby(level=_within(counts))
+    out["tpr_gap"] = grouped["tpr"].transform("max") - grouped["tpr"].transform("min")
+    out["fpr_gap"] = grouped["fpr"].transform("max") - grouped["fpr"].transform("min")
+    return out
+
+
+def fairness_report(counts: pd.DataFrame, n_boot: int = 1000, seed: int = 0) -> pd.DataFrame:
+    """Disparate impact (and equalized odds when labels were counted) per group."""
+    report = disparate_impact(counts, n_boot=n_boot, seed=seed)
+    if "true_pos" in counts.columns:
+        report = report.join(equalized_odds(counts))
+    return report
+
+
+def attribute_summary(report: pd.DataFrame) -> pd.DataFrame:
+    """One row per attribute (and stratum): worst DI ratio and pass/fail."""
+    grouped = report.groupby(level=_within(report), sort=False)
+    out = pd.DataFrame({
+        "groups": grouped.size(),
+        "min_di_ratio": grouped["di_ratio"].min(),
+        "passes_four_fifths": grouped["passes_four_fifths"].all(),
+    })
+    if "tpr_gap" in report.columns:
+        out["tpr_gap"] = grouped["tpr_gap"].first()
+        out["fpr_gap"] = grouped["fpr_gap"].first()
+    return out
@@ -0,0 +1,158 @@
+"""Mini-batch K-means over a standardized, possibly memory-mapped feature matrix.
+
+Column means and standard deviations come from one streamed pass. Each fit
+seeds its centers with k-means++ on a random sample, then updates them from
+random mini-batches with per-center learning rates 1 / (points seen), so only
+one batch of rows is ever standardized at a time. Labels and inertia come
+from a final chunked pass. Restarts and k values are independent fits and
+run in a process pool; workers memory-map the matrix from its .npy file
+instead of receiving a copy.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.pca_stats import correlation_matrix
+
+
+def save_features(df: pd.DataFrame, features: list[str], path: Path) -> Path:
+    """Write the feature columns as a contiguous float32 .npy for memory-mapping."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.tmp-{os.getpid()}.npy")
+    try:
+        np.save(tmp, df[features].to_numpy(np.float32))
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def _open(source) -> np.ndarray:
+    """An in-memory matrix as is, or a .npy path opened read-only with mmap."""
+    if isinstance(source, (str, Path)):
+        return np.load(source, mmap_mode="r")
+    return source
+
+
+def standardizer(source, chunk_rows: int = 65536) -> tuple[np.ndarray, np.ndarray]:
+    """Column (mean, std) from one streamed pass; zero-variance columns get std 1."""
+    mean, std, _ = correlation_matrix(_open(source), chunk_rows)
+    return mean, np.where(std > 0, std, 1.0)
+
+
+def _sq_distances(block: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """(rows, k) squared distances via one matrix multiply."""
+    d = block @ (-2 * centers.T)
+    d += (centers**2).sum(axis=1)
+    d += (block**2).sum(axis=1)[:, None]
+    return np.maximum(d, 0.0, out=d)
+
+
+def kmeans_plus_plus(sample: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding: each new center drawn with probability proportional to D(x)^2."""
+    centers = [sample[rng.integers(len(sample))]]
+    closest = ((sample - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        i = rng.choice(len(sample), p=closest / total) if total > 0 else rng.integers(len(sample))
+        centers.append(sample[i])
+        closest = np.minimum(closest, ((sample - sample[i]) ** 2).sum(axis=1))
+    return np.array(centers)
+
+
+def _batch(matrix, idx, mean, std) -> np.ndarray:
+    # sorted indices keep memory-mapped reads sequential
+    return (np.asarray(matrix[np.sort(idx)], dtype=np.float64) - mean) / std
+
+
+def fit_minibatch(
+    source,
+    k: int,
+    mean: np.ndarray,
+    std: np.ndarray,
+    seed: int = 0,
+    batch_size: int = 4096,
+    max_iter: int = 300,
+    tol: float = 1e-6,
+    init_size: int | None = None,
+) -> dict:
+    """One mini-batch K-means fit; centers are in standardized units.
+
+    Stops when the mean squared center shift of a batch falls below tol.
+    Returns centers, iterations and seed (inertia comes from assign()).
+    """
+    matrix = _open(source)
+    n = len(matrix)
+    rng = np.random.default_rng(seed)
+    init_size = min(n, init_size or max(3 * batch_size, 10 * k))
+    centers = kmeans_plus_plus(_batch(matrix, rng.choice(n, init_size, replace=False), mean, std), k, rng)
+    counts = np.zeros(k)
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        block = _batch(matrix, rng.integers(n, size=min(batch_size, n)), mean, std)
+        label = _sq_distances(block, centers).argmin(axis=1)
+        hits = np.bincount(label, minlength=k)
+        sums = np.stack([np.bincount(label, weights=block[:, j], minlength=k) for j in range(block.shape[1])], axis=1)
+        counts += hits
+        seen = hits > 0
+        new = centers.copy()
+        new[seen] += (sums[seen] - hits[seen, None] * centers[seen]) / counts[seen, None]
+        shift = ((new - centers) ** 2).sum(axis=1).mean()
+        centers = new
+        if shift < tol:
+            break
+    return {"k": k, "seed": seed, "centers": centers, "iterations": iterations}
+
+
+def assign(source, model: dict, chunk_rows: int = 65536) -> tuple[np.ndarray, float]:
+    """Labels for every row and the total inertia, one chunk of rows at a time."""
+    matrix = _open(source)
+    labels = np.empty(len(matrix), dtype=np.int32)
+    inertia = 0.0
+    for start in range(0, len(matrix), chunk_rows):
+        block = (np.asarray(matrix[start : start + chunk_rows], dtype=np.float64) - model["mean"]) / model["std"]
+        d = _sq_distances(block, model["centers"])
+        labels[start : start + len(block)] = d.argmin(axis=1)
+        inertia += float(d.min(axis=1).sum())
+    return labels, inertia
+
+
+def _fit_job(source, k, seed, mean, std, params):
+    model = fit_minibatch(source, k, mean, std, seed=seed, **params)
+    model.update(mean=mean, std=std)
+    model["inertia"] = assign(source, model)[1]
+    return model
+
+
+def sweep(
+    source,
+    ks,
+    restarts: int = 3,
+    workers: int | None = None,
+    seed: int = 0,
+    **params,
+) -> tuple[dict, pd.DataFrame]:
+    """Fit every (k, restart) pair and keep the lowest-inertia model per k.
+
+    source is a matrix or the path of a .npy file; pass the path with
+    workers > 1 so each process memory-maps it. Returns ({k: model}, runs)
+    where runs has one row per fit (k, seed, inertia, iterations).
+    """
+    mean, std = standardizer(source)
+    jobs = [(k, seed + r) for k in ks for r in range(restarts)]
+    args = [(source, k, s, mean, std, params) for k, s in jobs]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            fits = list(pool.map(_fit_job, *zip(*args)))
+    else:
+        fits = [_fit_job(*a) for a in args]
+    best = {}
+    for model in fits:
+        if model["k"] not in best or model["inertia"] < best[model["k"]]["inertia"]:
+            best[model["k"]] = model
+    runs = pd.DataFrame([{key: m[key] for key in ("k", "seed", "inertia", "iterations")} for m in fits])
+    return best, runs
@@ -0,0 +1,217 @@
+"""Random-forest lead-scoring pipeline for the targeting case study.
+
+Prospect rows are encoded into a float32 matrix (ordinal codes for ordered
+categories, one-hot for industry). Stratified k-fold CV runs fold by fold in a
+process pool. The final forest is saved under data/.cache/models/ in joblib's
+uncompressed (memory-mappable) format, keyed by the dataset hash, the
+hyperparameters and the encoding, so a retrain only happens when one of them
+changes. TreeSHAP values of the training rows are cached beside the forest.
+"""
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+from components.data_store import CACHE_DIR
+from components.tree_scorer import export_forest, load_forest, save_forest
+from components.tree_shap import build_explainer, shap_values
+
+MODEL_DIR = CACHE_DIR / "models"
+TARGET = "converted"
+NUMERIC = (
+    "whitepaper_downloads",
+    "pricing_page_visits",
+    "email_opens",
+    "email_clicks",
+    "days_since_last_activity",
+    "budget_authority_score",
+    "engagement_score",
+)
+ORDINAL = {
+    "company_size": ["smb", "mid_market", "enterprise"],
+    "title_level": ["manager", "director", "vp", "c_suite"],
+}
+ONE_HOT = ("industry",)
+DEFAULT_PARAMS = {
+    "n_estimators": 100,
+    "max_depth": 8,
+    "min_samples_leaf": 5,
+    "max_features": "sqrt",
+    "random_state": 42,
+}
+
+
+def encoding_spec(df: pd.DataFrame) -> dict:
+    """Column lists and category levels learned from the training data."""
+    return {
+        "numeric": [c for c in NUMERIC if c in df.columns],
+        "ordinal": {c: levels for c, levels in ORDINAL.items() if c in df.columns},
+        "one_hot": {c: sorted(map(str, df[c].dropna().unique())) for c in ONE_HOT if c in df.columns},
+    }
+
+
+def feature_names(spec: dict) -> list[str]:
+    names = list(spec["numeric"]) + list(spec["ordinal"])
+    for col, levels in spec["one_hot"].items():
+        names += [f"{col}_{level}" for level in levels]
+    return names
+
+
+def encode(df: pd.DataFrame, spec: dict) -> np.ndarray:
+    """Float32 feature matrix in feature_names(spec) order.
+
+    Unknown ordinal levels become -1 and unknown one-hot levels all zeros,
+    so scoring never fails on a category the model has not seen.
+    """
+    cols = [df[c].to_numpy(np.float32) for c in spec["numeric"]]
+    for col, levels in spec["ordinal"].items():
+        cols.append(pd.Categorical(df[col].astype(str), categories=levels).codes.astype(np.float32))
+    for col, levels in spec["one_hot"].items():
+        values = df[col].astype(str).to_numpy()
+        cols += [(values == level).astype(np.float32) for level in levels]
+    return np.column_stack(cols)
+
+
+def _fit_fold(X, y, train_idx, test_idx, params):
+    """Fit one CV fold and return its out-of-fold scores (module-level for pickling)."""
+    model = RandomForestClassifier(n_jobs=1, **params).fit(X[train_idx], y[train_idx])
+    return test_idx, model.predict_proba(X[test_idx])[:, 1]
+
+
+def cross_validate(X, y, params: dict, folds: int = 5, workers: int | None = None, seed: int = 0) -> dict:
+    """Stratified k-fold CV; folds run in parallel when workers > 1.
+
+    Returns per-fold AUCs and the pooled out-of-fold scores.
+    """
+    splits = list(StratifiedKFold(folds, shuffle=True, random_state=seed).split(X, y))
+    args = [(X, y, tr, te, params) for tr, te in splits]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, folds)) as pool:
+            results = list(pool.map(_fit_fold, *zip(*args)))
+    else:
+        results = [_fit_fold(*a) for a in args]
+    oof = np.empty(len(y))
+    fold_auc = []
+    for test_idx, scores in results:
+        oof[test_idx] = scores
+        fold_auc.append(roc_auc_score(y[test_idx], scores))
+    return {"fold_auc": fold_auc, "oof": oof}
+
+
+def model_key(version: str, params: dict, spec: dict, folds: int) -> str:
+    """Cache key over dataset hash, hyperparameters, encoding and CV setup."""
+    blob = json.dumps({"version": version, "params": params, "spec": spec, "folds": folds}, sort_keys=True)
+    return hashlib.blake2b(blob.encode(), digest_size=8).hexdigest()
+
+
+def _train(df: pd.DataFrame, target: str, params: dict, spec: dict, folds: int, workers: int | None):
+    X = encode(df, spec)
+    y = df[target].to_numpy(np.int64)
+    cv = cross_validate(X, y, params, folds=folds, workers=workers)
+    model = RandomForestClassifier(n_jobs=workers or 1, **params).fit(X, y)
+    names = feature_names(spec)
+    order = np.argsort(model.feature_importances_)[::-1]
+    meta = {
+        "params": params,
+        "spec": spec,
+        "features": names,
+        "rows": len(df),
+        "folds": folds,
+        "auc_roc": float(roc_auc_score(y, cv["oof"])),
+        "cv_auc_mean": float(np.mean(cv["fold_auc"])),
+        "cv_auc_std": float(np.std(cv["fold_auc"], ddof=1)),
+        "fold_auc": [float(a) for a in cv["fold_auc"]],
+        "feature_importance": [
+            {"feature": names[i], "importance": float(model.feature_importances_[i])} for i in order
+        ],
+    }
+    return model, meta, cv["oof"]
+
+
+def load_or_train(
+    df: pd.DataFrame,
+    version: str,
+    params: dict | None = None,
+    folds: int = 5,
+    workers: int | None = None,
+    target: str = TARGET,
+) -> tuple:
+    """Return (model, meta, oof_scores), training only on a cache miss.
+
+    A cached forest is read back with mmap_mode="r" rather than refitted.
+    Falls back to an in-memory fit when the cache is not writable.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    spec = encoding_spec(df)
+    key = model_key(version, params, spec, folds)
+    path = MODEL_DIR / key
+    try:
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+        return joblib.load(path / "model.joblib", mmap_mode="r"), meta, np.load(path / "oof.npy")
+    except (OSError, ValueError, EOFError):
+        pass
+
+    model, meta, oof = _train(df, target, params, spec, folds, workers)
+    meta["key"] = key
+    tmp = path.with_name(f"{key}.tmp-{os.getpid()}")
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, tmp / "model.joblib")
+        save_forest(export_forest(model), tmp / "forest")
+        np.save(tmp / "oof.npy", oof)
+        with open(tmp / "meta.json", "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return model, meta, oof
+
+
+def flat_forest(model, meta: dict) -> dict:
+    """Flat node arrays for tree_scorer, memory-mapped from the artifact.
+
+    Artifacts written before the export existed are exported on first use.
+    """
+    path = MODEL_DIR / meta.get("key", "") / "forest"
+    try:
+        return load_forest(path)
+    except (OSError, ValueError):
+        pass
+    forest = export_forest(model)
+    try:
+        save_forest(forest, path)
+    except OSError:
+        pass
+    return forest
+
+
+def explanations(model, meta: dict, X) -> tuple[np.ndarray, float]:
+    """TreeSHAP values for the training rows and the model's expected value.
+
+    Computed once per model artifact and stored next to it as shap.npz.
+    """
+    path = MODEL_DIR / meta.get("key", "") / "shap.npz"
+    try:
+        with np.load(path) as saved:
+            if saved["values"].shape == X.shape:
+                return saved["values"], float(saved["expected_value"])
+    except (OSError, ValueError, KeyError):
+        pass
+    explainer = build_explainer(model, X.shape[1])
+    values = shap_values(explainer, X)
+    tmp = path.with_name(f"shap.tmp-{os.getpid()}.npz")
+    try:
+        np.savez(tmp, values=values, expected_value=explainer["expected_value"])
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+    return values, explainer["expected_value"]
@@ -0,0 +1,46 @@
+"""Out-of-core PCA statistics over a (possibly memory-mapped) feature matrix.
+
+Rows are streamed in chunks into float64 sums and a Gram matrix, so the
+float32 matrix is never copied or up-cast as a whole.
+"""
+import numpy as np
+
+
+def correlation_matrix(matrix: np.ndarray, chunk_rows: int = 65536) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (mean, std, correlation) of the columns, one chunk of rows at a time."""
+    n, p = matrix.shape
+    total = np.zeros(p)
+    gram = np.zeros((p, p))
+    for start in range(0, n, chunk_rows):
+        block = np.asarray(matrix[start:start + chunk_rows], dtype=np.float64)
+        total += block.sum(axis=0)
+        gram += block.T @ block
+    mean = total / n
+    cov = (gram - n * np.outer(mean, mean)) / (n - 1)
+    std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    scale = np.where(std > 0, std, 1.0)
+    corr = cov / np.outer(scale, scale)
+    return mean, std, corr
+
+
+def fit_pca(matrix: np.ndarray, chunk_rows: int = 65536) -> dict:
+    """Standardized PCA: eigen-decomposition of the streamed correlation matrix.
+
+    Returns mean, std, explained_variance_ratio and components (rows sorted
+    by decreasing variance).
+    """
+    mean, std, corr = correlation_matrix(matrix, chunk_rows)
+    eigvals, eigvecs = np.linalg.eigh(corr)
+    order = np.argsort(eigvals)[::-1]
+    eigvals = np.clip(eigvals[order], 0.0, None)
+    return {
+        "mean": mean,
+        "std": std,
+        "explained_variance_ratio": eigvals / eigvals.sum(),
+        "components": eigvecs[:, order].T,
+    }
+
+
+def components_for_variance(ratios: np.ndarray, threshold: float = 0.95) -> int:
+    """Smallest number of components whose cumulative variance reaches threshold."""
+    return int(min(np.searchsorted(np.cumsum(ratios), threshold) + 1, len(ratios)))
@@ -0,0 +1,105 @@
+"""Real-time segment assignment from a precomputed centroid index.
+
+The scaler and the standardized centroids are folded into one float32
+weight matrix and bias vector. The nearest centroid of a raw feature row x is
+argmin(x @ weight + bias), because
+
+    ||(x - mean) / std - c||^2 = ||z||^2 - 2 x . (c / std) + (2 mean . (c / std) + ||c||^2)
+
+and ||z||^2 is the same for every centroid. Assigning one customer or a
+micro-batch is therefore one matrix multiply. New events move the centroids
+with sequential k-means updates (learning rate 1 / points seen), and the
+folded arrays are rebuilt from the moved centroids, so no re-clustering runs.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+_ARRAYS = ("mean", "std", "centers", "counts", "weight", "bias")
+
+
+def _fold(index: dict) -> dict:
+    scaled = index["centers"] / index["std"]
+    index["weight"] = np.ascontiguousarray(-2 * scaled.T, dtype=np.float32)
+    index["bias"] = (2 * scaled @ index["mean"] + (index["centers"] ** 2).sum(axis=1)).astype(np.float32)
+    return index
+
+
+def build_index(model: dict, names: list[str], features: list[str], counts=None) -> dict:
+    """Index from a fitted kmeans model ({mean, std, centers}) and one name per centroid.
+
+    counts (points per centroid) set how strongly later updates move each
+    centroid; without them every centroid starts at 1.
+    """
+    k = len(model["centers"])
+    index = {
+        "mean": np.asarray(model["mean"], dtype=np.float64),
+        "std": np.asarray(model["std"], dtype=np.float64),
+        "centers": np.asarray(model["centers"], dtype=np.float64),
+        "counts": np.ones(k) if counts is None else np.asarray(counts, dtype=np.float64),
+        "names": list(names),
+        "features": list(features),
+    }
+    return _fold(index)
+
+
+def save_index(index: dict, path: Path) -> None:
+    """Write into a temp directory renamed into place, so readers never see a partial index."""
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", index[name])
+        with open(tmp / "names.json", "w") as f:
+            json.dump({"names": index["names"], "features": index["features"]}, f)
+        os.replace(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_index(path: Path, mmap: bool = True) -> dict:
+    """Load saved arrays; memory-mapped by default so processes share pages."""
+    mode = "r" if mmap else None
+    index = {name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS}
+    with open(path / "names.json") as f:
+        index.update(json.load(f))
+    return index
+
+
+def encode_customer(record: dict, features: list[str]) -> np.ndarray:
+    """One customer dict -> float32 feature row in index order."""
+    return np.asarray([float(record[c]) for c in features], dtype=np.float32)
+
+
+def assign_segments(index: dict, X) -> np.ndarray:
+    """Nearest-centroid label for each row of X (rows, features) or a single row."""
+    X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+    return (X @ index["weight"] + index["bias"]).argmin(axis=1)
+
+
+def segment_names(index: dict, labels) -> list[str]:
+    return [index["names"][i] for i in np.atleast_1d(labels)]
+
+
+def update_index(index: dict, X) -> dict:
+    """Absorb new event rows: move each centroid toward the rows assigned to it.
+
+    Returns a new index (loaded arrays may be read-only memory maps); the
+    scaler stays fixed so labels remain comparable over time.
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+    labels = assign_segments(index, X)
+    k, p = index["centers"].shape
+    z = (X - index["mean"]) / index["std"]
+    hits = np.bincount(labels, minlength=k)
+    sums = np.stack([np.bincount(labels, weights=z[:, j], minlength=k) for j in range(p)], axis=1)
+    counts = index["counts"] + hits
+    centers = np.array(index["centers"], dtype=np.float64)
+    seen = hits > 0
+    centers[seen] += (sums[seen] - hits[seen, None] * centers[seen]) / counts[seen, None]
+    updated = {**index, "centers": centers, "counts": counts}
+    return _fold(updated)
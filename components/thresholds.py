@@ -0,0 +1,101 @@
+"""Threshold analysis for score-based targeting.
+
+Scores are sorted once. Confusion counts at every distinct threshold are
+cumulative sums over that order, for the whole population and for each
+protected group at the same time (one cumulative sum per group over the same
+sorted mask). Precision-recall and ROC curves, AUCs and cost-optimal
+thresholds are all read off those counts; the model is never re-evaluated.
+"""
+import numpy as np
+import pandas as pd
+
+
+def threshold_curves(scores, labels, groups=None) -> pd.DataFrame:
+    """Confusion counts and rates at every distinct score, overall and per group.
+
+    Row t means "select everyone with score >= threshold". Returns a tidy
+    frame with group ("All" plus each group), threshold, selected, tp, fp,
+    fn, tn, precision, recall (= TPR) and fpr.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    order = np.argsort(-scores, kind="stable")
+    s, y = scores[order], labels[order]
+    # last position of each run of equal scores
+    cut = np.r_[s[1:] != s[:-1], True]
+
+    masks = [("All", np.ones(len(s), dtype=bool))]
+    if groups is not None:
+        g = np.asarray(groups)[order]
+        masks += [(str(name), g == name) for name in pd.unique(g)]
+
+    frames = []
+    for name, mask in masks:
+        tp = np.cumsum(y & mask)[cut]
+        selected = np.cumsum(mask)[cut]
+        fp = selected - tp
+        pos, total = (y & mask).sum(), mask.sum()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frames.append(pd.DataFrame({
+                "group": name,
+                "threshold": s[cut],
+                "selected": selected,
+                "tp": tp,
+                "fp": fp,
+                "fn": pos - tp,
+                "tn": total - pos - fp,
+                "precision": np.where(selected > 0, tp / selected, 1.0),
+                "recall": tp / pos,
+                "fpr": fp / (total - pos),
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def curve_auc(curve: pd.DataFrame) -> pd.DataFrame:
+    """ROC AUC and average precision per group from threshold_curves output."""
+    out = {}
+    for name, part in curve.groupby("group", sort=False):
+        fpr = np.r_[0.0, part["fpr"].to_numpy()]
+        tpr = np.r_[0.0, part["recall"].to_numpy()]
+        out[name] = {
+            "roc_auc": float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)),
+            "average_precision": float(np.sum(np.diff(tpr) * part["precision"].to_numpy())),
+        }
+    return pd.DataFrame(out).T
+
+
+def pick_threshold(
+    curve: pd.DataFrame,
+    cost_fp: float = 1.0,
+    cost_fn: float = 1.0,
+    max_selected: float | None = None,
+    min_recall: float | None = None,
+    group: str = "All",
+) -> pd.Series:
+    """Lowest-cost threshold: cost_fp per wasted call, cost_fn per missed buyer.
+
+    max_selected caps the number of calls (a count, or a share of the group
+    when below 1); min_recall requires catching at least that share of
+    buyers. Returns the chosen curve row with its expected cost.
+    """
+    part = curve[curve["group"] == group]
+    ok = np.ones(len(part), dtype=bool)
+    if max_selected is not None:
+        total = part["tp"].iloc[0] + part["fp"].iloc[0] + part["fn"].iloc[0] + part["tn"].iloc[0]
+        cap = max_selected * total if max_selected < 1 else max_selected
+        ok &= part["selected"].to_numpy() <= cap
+    if min_recall is not None:
+        ok &= part["recall"].to_numpy() >= min_recall
+    if not ok.any():
+        raise ValueError("No threshold satisfies the constraints")
+    cost = cost_fp * part["fp"].to_numpy() + cost_fn * part["fn"].to_numpy()
+    best = np.flatnonzero(ok)[np.argmin(cost[ok])]
+    row = part.iloc[best].copy()
+    row["cost"] = cost[best]
+    return row
+
+
+def at_threshold(curve: pd.DataFrame, threshold: float) -> pd.DataFrame:
+    """Each group's curve row for 'score >= threshold' (one row per group)."""
+    part = curve[curve["threshold"] >= threshold]
+    return part.groupby("group", sort=False).tail(1).set_index("group")
@@ -0,0 +1,77 @@
+"""Low-latency forest scoring from flat NumPy node arrays.
+
+A fitted random forest is exported once into concatenated node arrays
+(feature, threshold, left, right, value) with leaves pointing to themselves.
+Scoring walks every tree of every row in lock-step for max_depth steps: each
+step is a gather and a comparison on an (rows, trees) index array, with no
+Python-level loop over trees. Only NumPy is needed at inference time, and
+the arrays are saved as .npy files that load memory-mapped.
+"""
+from pathlib import Path
+
+import numpy as np
+
+_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+def export_forest(model) -> dict:
+    """Flatten a fitted sklearn forest classifier (positive-class probability)."""
+    parts = {name: [] for name in _ARRAYS}
+    offset = 0
+    depth = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        leaf = tree.children_left < 0
+        idx = np.arange(n)
+        parts["feature"].append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        parts["threshold"].append(np.where(leaf, np.inf, tree.threshold))
+        parts["left"].append((np.where(leaf, idx, tree.children_left) + offset).astype(np.int32))
+        parts["right"].append((np.where(leaf, idx, tree.children_right) + offset).astype(np.int32))
+        counts = tree.value[:, 0, :]
+        parts["value"].append(counts[:, -1] / counts.sum(axis=1))
+        parts["roots"].append(np.array([offset], dtype=np.int32))
+        depth = max(depth, tree.max_depth)
+        offset += n
+    forest = {name: np.concatenate(arrays) for name, arrays in parts.items()}
+    forest["max_depth"] = depth
+    return forest
+
+
+def save_forest(forest: dict, path: Path) -> None:
+    path.mkdir(parents=True, exist_ok=True)
+    for name in _ARRAYS:
+        np.save(path / f"{name}.npy", forest[name])
+    np.save(path / "max_depth.npy", np.array(forest["max_depth"]))
+
+
+def load_forest(path: Path, mmap: bool = True) -> dict:
+    """Load exported arrays; memory-mapped by default so processes share pages."""
+    mode = "r" if mmap else None
+    forest = {name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in _ARRAYS}
+    forest["max_depth"] = int(np.load(path / "max_depth.npy"))
+    return forest
+
+
+def predict_proba(forest: dict, X) -> np.ndarray:
+    """Mean leaf probability over trees for each row of X (rows, features)."""
+    X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+    rows = np.arange(len(X))[:, None]
+    node = np.broadcast_to(forest["roots"], (len(X), len(forest["roots"])))
+    feature, threshold = forest["feature"], forest["threshold"]
+    left, right = forest["left"], forest["right"]
+    for _ in range(forest["max_depth"]):
+        go_left = X[rows, feature[node]] <= threshold[node]
+        node = np.where(go_left, left[node], right[node])
+    return forest["value"][node].mean(axis=1)
+
+
+def encode_record(record: dict, spec: dict) -> np.ndarray:
+    """One prospect dict -> feature row, matching lead_model.encode without pandas."""
+    row = [float(record[c]) for c in spec["numeric"]]
+    for col, levels in spec["ordinal"].items():
+        value = str(record[col])
+        row.append(float(levels.index(value)) if value in levels else -1.0)
+    for col, levels in spec["one_hot"].items():
+        row += [float(str(record[col]) == level) for level in levels]
+    return np.asarray(row, dtype=np.float32)
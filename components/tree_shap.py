@@ -0,0 +1,210 @@
+"""Exact path-dependent TreeSHAP for a fitted forest, batched over rows.
+
+For one leaf, TreeSHAP weights each feature on the root-to-leaf path by
+the Shapley kernel over the path's "zero fractions" (cover ratios) and
+"one fractions" (whether the row satisfies that feature's splits). A row's
+one fractions are 0/1, so a leaf with k distinct path features has only 2^k
+possible inputs. For leaves with up to TABLE_MAX_K path features the
+contribution table for every pattern is precomputed once per model, and
+explaining rows reduces to one interval test per (leaf, path feature) for a
+block of rows, packing the per-leaf bit patterns, and gathering table
+entries: O(leaves * depth) per row with no per-row Python work.
+
+Longer paths would need 2^k table rows, so those leaves use the polynomial
+form instead: the path's weights are the coefficients of
+prod_i (z_i + o_i t), built by multiplying in one factor per feature
+(EXTEND), and each feature's share comes from dividing its factor back out
+(UNWIND). That is O(k^2) per (leaf, row), batched over leaves of equal k
+and a block of rows.
+"""
+from math import factorial
+
+import numpy as np
+
+# longest path (distinct features) that gets a pattern table: a leaf's
+# tables hold k * 2^k entries, so this caps them at 2,048 floats per leaf
+TABLE_MAX_K = 8
+_PATH_BLOCK = 1 << 21
+
+
+def _leaf_paths(tree):
+    """Yield (leaf, [(feature, threshold, go_left, zero_fraction), ...]) for one sklearn tree."""
+    left, right = tree.children_left, tree.children_right
+    cover = tree.weighted_n_node_samples
+    stack = [(0, [])]
+    while stack:
+        node, path = stack.pop()
+        if left[node] < 0:
+            yield node, path
+            continue
+        f, t = int(tree.feature[node]), float(tree.threshold[node])
+        stack.append((left[node], path + [(f, t, True, cover[left[node]] / cover[node])]))
+        stack.append((right[node], path + [(f, t, False, cover[right[node]] / cover[node])]))
+
+
+def _shares(z: np.ndarray, one: np.ndarray, value) -> np.ndarray:
+    """Contribution of each path feature for broadcastable (k, ...) zero and one fractions.
+
+    EXTEND builds the coefficients of prod_i (z_i + o_i t) one factor at a
+    time; UNWIND divides feature j's factor back out (synthetic division by
+    t + z_j when o_j = 1, the constant z_j when o_j = 0) and weights the
+    remaining coefficients by the Shapley kernel s! (k - 1 - s)! / k!.
+    Each degree is its own array, so every step is a contiguous elementwise
+    operation over the leaves and rows (or patterns) being explained.
+    """
+    k = len(z)
+    weight = [factorial(s) * factorial(k - 1 - s) / factorial(k) for s in range(k)]
+    poly = [np.ones(np.broadcast_shapes(z.shape[1:], one.shape[1:]))]
+    for i in range(k):
+        poly = (
+            [poly[0] * z[i]]
+            + [poly[d] * z[i] + poly[d - 1] * one[i] for d in range(1, len(poly))]
+            + [poly[-1] * one[i]]
+        )
+    kept = sum(weight[d] * poly[d] for d in range(k))
+    out = np.empty((k,) + poly[0].shape)
+    for j in range(k):
+        rest = poly[k]
+        through = weight[k - 1] * rest
+        for d in range(k - 1, 0, -1):
+            rest = poly[d] - z[j] * rest
+            through += weight[d - 1] * rest
+        out[j] = value * (one[j] - z[j]) * np.where(one[j] > 0, through, kept / z[j])
+    return out
+
+
+def _pattern_table(z: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """Contributions for leaves sharing k path features: (k, leaves, 2^k).
+
+    z: (leaves, k) zero fractions; value: (leaves,) leaf outputs. Entry
+    [j, l, b] is feature j's contribution when bit i of b is the one fraction
+    of path feature i.
+    """
+    k = z.shape[1]
+    bits = ((np.arange(2**k) >> np.arange(k)[:, None]) & 1).astype(np.float64)
+    return _shares(z.T[:, :, None], bits[:, None, :], value[:, None])
+
+
+def _floor32(t: np.ndarray) -> np.ndarray:
+    """Largest float32 <= t, so float32 rows compare exactly as sklearn does in float64."""
+    t32 = t.astype(np.float32)
+    return np.where(t32 > t, np.nextafter(t32, np.float32(-np.inf)), t32)
+
+
+def build_explainer(model, n_features: int, table_max_k: int | None = None) -> dict:
+    """Precompute per-leaf path features, split intervals and pattern tables.
+
+    All splits on the same feature along a path collapse into one interval
+    test lo < x <= hi. Leaves with at most table_max_k (default
+    TABLE_MAX_K) path features get pattern tables, laid out densely as
+    (leaves, max path features) with padding slots that never fire and read
+    zero entries. Longer paths are kept as (features, intervals, zero
+    fractions) per path length for the polynomial pass. Works on sklearn
+    forest classifiers (positive-class probability) and averages over trees
+    like predict_proba.
+    """
+    table_max_k = TABLE_MAX_K if table_max_k is None else table_max_k
+    n_trees = len(model.estimators_)
+    leaves = []
+    expected = 0.0
+    for est in model.estimators_:
+        tree = est.tree_
+        counts = tree.value[:, 0, :]
+        prob = counts[:, -1] / counts.sum(axis=1)
+        cover = tree.weighted_n_node_samples
+        for leaf, path in _leaf_paths(tree):
+            value = prob[leaf] / n_trees
+            expected += value * cover[leaf] / cover[0]
+            slots = []
+            for f in dict.fromkeys(f for f, _, _, _ in path):
+                steps = [(t, go_left, zf) for f2, t, go_left, zf in path if f2 == f]
+                lo = max([t for t, go_left, _ in steps if not go_left], default=-np.inf)
+                hi = min([t for t, go_left, _ in steps if go_left], default=np.inf)
+                slots.append((f, lo, hi, np.prod([zf for _, _, zf in steps])))
+            leaves.append((value, slots))
+
+    explainer = {"n_features": n_features, "expected_value": expected}
+    explainer.update(_table_leaves([leaf for leaf in leaves if len(leaf[1]) <= table_max_k]))
+    deep = [leaf for leaf in leaves if len(leaf[1]) > table_max_k]
+    explainer["paths"] = [
+        _path_group([leaf for leaf in deep if len(leaf[1]) == kk]) for kk in sorted({len(s) for _, s in deep})
+    ]
+    return explainer
+
+
+def _table_leaves(leaves: list) -> dict:
+    """Dense slot arrays and pattern tables for [(value, slots), ...] leaves."""
+    k = np.array([len(slots) for _, slots in leaves], dtype=np.int64)
+    width = int(k.max(initial=0))
+    # table is grouped by slot then leaf, so one slot's lookups for a block of
+    # rows stay within a small contiguous region; the trailing zeros serve
+    # every padding slot whatever its pattern code
+    sizes = np.where(np.arange(width) < k[:, None], 2**k[:, None], 0).T.ravel()
+    start = np.r_[0, np.cumsum(sizes)][: sizes.size].reshape(width, len(leaves)).T
+    table = np.zeros(int(sizes.sum()) + 2**width)
+    base = np.where(np.arange(width) < k[:, None], start, len(table) - 2**width).astype(np.int32)
+    feature = np.zeros((len(leaves), width), dtype=np.int64)
+    lo = np.full((len(leaves), width), np.inf)
+    hi = np.full((len(leaves), width), np.inf)
+    for i, (_, slots) in enumerate(leaves):
+        for j, (f, a, b, _) in enumerate(slots):
+            feature[i, j], lo[i, j], hi[i, j] = f, a, b
+    for kk in np.unique(k[k > 0]):
+        idx = np.flatnonzero(k == kk)
+        z = np.array([[zf for *_, zf in leaves[i][1]] for i in idx])
+        value = np.array([leaves[i][0] for i in idx])
+        block = _pattern_table(z, value)
+        for j in range(kk):
+            table[(base[idx, j][:, None] + np.arange(2**kk)).ravel()] = block[j].ravel()
+    return {"feature": feature, "lo": _floor32(lo), "hi": _floor32(hi), "base": base, "k": k, "table": table}
+
+
+def _path_group(leaves: list) -> dict:
+    """Leaves that share a path length k, as (leaves, k) arrays for the polynomial pass."""
+    return {
+        "feature": np.array([[f for f, *_ in slots] for _, slots in leaves], dtype=np.int64),
+        "lo": _floor32(np.array([[a for _, a, _, _ in slots] for _, slots in leaves])),
+        "hi": _floor32(np.array([[b for _, _, b, _ in slots] for _, slots in leaves])),
+        "zero": np.array([[zf for *_, zf in slots] for _, slots in leaves]),
+        "value": np.array([value for value, _ in leaves]),
+    }
+
+
+def _path_phi(group: dict, block: np.ndarray, phi: np.ndarray) -> None:
+    """Add the contributions of one path group for a (features, rows) block to phi."""
+    n_leaves, k = group["zero"].shape
+    step = max(1, _PATH_BLOCK // (block.shape[1] * (k + 1)))
+    for a in range(0, n_leaves, step):
+        feature = group["feature"][a : a + step].T
+        x = block[feature]
+        one = (x > group["lo"][a : a + step].T[..., None]) & (x <= group["hi"][a : a + step].T[..., None])
+        shares = _shares(group["zero"][a : a + step].T[..., None], one.astype(np.float64), group["value"][a : a + step, None])
+        to_feature = np.zeros((len(phi), feature.size))
+        to_feature[feature.ravel(), np.arange(feature.size)] = 1.0
+        phi += to_feature @ shares.reshape(feature.size, -1)
+
+
+def shap_values(explainer: dict, X, block_rows: int = 128) -> np.ndarray:
+    """SHAP values (rows, features); each row sums to f(x) - expected_value."""
+    X = np.asarray(X, dtype=np.float32)
+    e = explainer
+    leaves, width = e["feature"].shape
+    # per-slot one-hot map from leaves to features, so attribution is a matmul
+    to_feature = np.zeros((width, e["n_features"], leaves))
+    for j in range(width):
+        real = np.flatnonzero(e["k"] > j)
+        to_feature[j, e["feature"][real, j], real] = 1.0
+    out = np.empty((len(X), e["n_features"]))
+    for start in range(0, len(X), block_rows):
+        block = np.ascontiguousarray(X[start : start + block_rows].T)
+        code = np.zeros((leaves, block.shape[1]), dtype=np.int32)
+        for j in range(width):
+            x = block[e["feature"][:, j]]
+            code |= ((x > e["lo"][:, j, None]) & (x <= e["hi"][:, j, None])).astype(np.int32) << j
+        phi = np.zeros((e["n_features"], block.shape[1]))
+        for j in range(width):
+            phi += to_feature[j] @ e["table"][e["base"][:, j, None] + code]
+        for group in e["paths"]:
+            _path_phi(group, block, phi)
+        out[start : start + block_rows] = phi.T
+    return out
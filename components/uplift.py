@@ -0,0 +1,127 @@
+"""Uplift modeling: T-learner, X-learner and transformed-outcome estimators.
+
+Base learners are regularized linear models fitted with closed-form or
+Newton solves (logistic for outcomes, ridge for effects). Each arm is fitted
+independently, so the two arms can run in a process pool. A fitted model is
+a handful of coefficient vectors, and uplift for any number of rows is a few
+matrix-vector products per row block. Qini and uplift curves come from one
+sort of the predicted uplift plus cumulative sums.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+LEARNERS = ("t_learner", "x_learner", "transformed_outcome")
+
+
+def _sigmoid(z):
+    return 0.5 * (1 + np.tanh(0.5 * z))
+
+
+def fit_logistic(X, y, l2: float = 1e-3, max_iter: int = 50, tol: float = 1e-10) -> np.ndarray:
+    """L2-regularized logistic regression by Newton-Raphson (intercept unpenalized)."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    penalty = np.full(X.shape[1], l2 * len(y))
+    penalty[0] = 0.0
+    beta = np.zeros(X.shape[1])
+    for _ in range(max_iter):
+        p = _sigmoid(X @ beta)
+        grad = X.T @ (y - p) - penalty * beta
+        hess = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalty)
+        step = np.linalg.solve(hess, grad)
+        beta += step
+        if np.abs(step).max() < tol:
+            break
+    return beta
+
+
+def fit_ridge(X, z, l2: float = 1e-3) -> np.ndarray:
+    """Ridge regression in closed form (intercept unpenalized)."""
+    X = np.asarray(X, dtype=np.float64)
+    penalty = np.full(X.shape[1], l2 * len(X))
+    penalty[0] = 0.0
+    return np.linalg.solve(X.T @ X + np.diag(penalty), X.T @ np.asarray(z, dtype=np.float64))
+
+
+def _fit_arms(fit, jobs, workers):
+    """Fit independent (X, target) jobs, in a process pool when workers > 1."""
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            return list(pool.map(fit, *zip(*jobs)))
+    return [fit(*job) for job in jobs]
+
+
+def fit_uplift(X, treat, y, learner: str = "t_learner", workers: int | None = None) -> dict:
+    """Fit an uplift model on a randomized log.
+
+    X must include an intercept column first. treat and y are 0/1. The
+    propensity is the observed treated share (randomized assignment).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    treat = np.asarray(treat, dtype=bool)
+    y = np.asarray(y, dtype=np.float64)
+    propensity = float(treat.mean())
+    if learner == "transformed_outcome":
+        z = y * (treat - propensity) / (propensity * (1 - propensity))
+        return {"learner": learner, "tau": fit_ridge(X, z)}
+    if learner not in LEARNERS:
+        raise ValueError(f"Unknown learner: {learner}")
+
+    mu0, mu1 = _fit_arms(fit_logistic, [(X[~treat], y[~treat]), (X[treat], y[treat])], workers)
+    model = {"learner": learner, "mu0": mu0, "mu1": mu1}
+    if learner == "x_learner":
+        # imputed individual effects in each arm, regressed back on X
+        d1 = y[treat] - _sigmoid(X[treat] @ mu0)
+        d0 = _sigmoid(X[~treat] @ mu1) - y[~treat]
+        tau0, tau1 = _fit_arms(fit_ridge, [(X[~treat], d0), (X[treat], d1)], workers)
+        model.update(tau0=tau0, tau1=tau1, propensity=propensity)
+    return model
+
+
+def predict_uplift(model: dict, X, chunk_rows: int = 1 << 20) -> np.ndarray:
+    """Predicted uplift (treated minus control conversion probability) per row."""
+    out = []
+    for start in range(0, len(X), chunk_rows):
+        block = np.asarray(X[start : start + chunk_rows], dtype=np.float64)
+        if model["learner"] == "transformed_outcome":
+            out.append(block @ model["tau"])
+        elif model["learner"] == "x_learner":
+            e = model["propensity"]
+            out.append(e * (block @ model["tau0"]) + (1 - e) * (block @ model["tau1"]))
+        else:
+            out.append(_sigmoid(block @ model["mu1"]) - _sigmoid(block @ model["mu0"]))
+    return np.concatenate(out) if out else np.empty(0)
+
+
+def qini_curve(uplift, treat, y, points: int | None = 100) -> pd.DataFrame:
+    """Qini and uplift curves from one sort by predicted uplift (descending).
+
+    At each targeting depth: qini = Y_t - Y_c * N_t / N_c (incremental
+    conversions) and uplift = (Y_t / N_t - Y_c / N_c) * (N_t + N_c).
+    `random` is the qini line of random targeting. With points set, the
+    curve is thinned to that many depths.
+    """
+    order = np.argsort(-np.asarray(uplift, dtype=np.float64), kind="stable")
+    t = np.asarray(treat, dtype=bool)[order]
+    yy = np.asarray(y, dtype=np.float64)[order]
+    n_t, n_c = np.cumsum(t), np.cumsum(~t)
+    y_t, y_c = np.cumsum(yy * t), np.cumsum(yy * ~t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        qini = np.where(n_c > 0, y_t - y_c * n_t / n_c, 0.0)
+        curve = np.where((n_t > 0) & (n_c > 0), (y_t / n_t - y_c / n_c) * (n_t + n_c), 0.0)
+    depth = np.arange(1, len(order) + 1)
+    keep = np.unique(np.linspace(0, len(order) - 1, points).round().astype(int)) if points else slice(None)
+    return pd.DataFrame({
+        "fraction": np.r_[0.0, (depth / len(order))[keep]],
+        "qini": np.r_[0.0, qini[keep]],
+        "uplift": np.r_[0.0, curve[keep]],
+        "random": np.r_[0.0, (depth / len(order) * qini[-1])[keep]],
+    })
+
+
+def qini_coefficient(curve: pd.DataFrame) -> float:
+    """Area between the Qini curve and random targeting, per targeted fraction."""
+    gap = (curve["qini"] - curve["random"]).to_numpy()
+    return float(np.sum(np.diff(curve["fraction"].to_numpy()) * (gap[1:] + gap[:-1]) / 2))
@@ -4,13 +4,20 @@ Chi-Square validation, Fairness Auditing, Model Risk Management
 """
 
 import json
+from functools import partial
 from pathlib import Path
 
-import pandas as pd
 import streamlit as st
-from scipy import stats
 
+from components.ab_bandit import compare_policies
+from components.ab_bayes import beta_posteriors, posterior_summary
+from components.ab_engine import chi_square, compare
+from components.ab_sequential import cumulative_looks, msprt
+from components.ab_stream import DEFAULT_KEYS, DEFAULT_METRICS, refresh, rollup
+from components.bootstrap import cached_bootstrap, lift_stat
 from components.craig_section import craig_section
+from components.data_store import CACHE_DIR, dataset_version, load_frame
+from components.fairness import counts_from_aggregates, fairness_report
 from components.sidebar_nav import render_sidebar_nav
 
 st.set_page_config(
@@ -25,6 +32,7 @@ BASE = Path(__file__).parent.parent
 DATA_DIR = BASE / "data"
 CSV_PATH = DATA_DIR / "ab_test_data.csv"
 JSON_PATH = DATA_DIR / "governance_log.json"
+ACC_PATH = CACHE_DIR / "ab_accumulator.json"
 
 # Custom CSS - uniform font and color, no green/teal
 st.markdown(
@@ -48,20 +56,61 @@ st.markdown(
 # Load data with error handling
 @st.cache_data
 def load_data():
-    df = None
     gov = None
-    if CSV_PATH.exists():
-        df = pd.read_csv(CSV_PATH)
     if JSON_PATH.exists():
         with open(JSON_PATH) as f:
             gov = json.load(f)
-    return df, gov
+    return gov
+
+
+# Incremental accumulator: only rows appended since the last run are parsed.
+# Keyed on file size/mtime so an unchanged event log is a pure cache hit.
+@st.cache_data
+def load_cells(size, mtime_ns):
+    with open(CSV_PATH) as f:
+        columns = f.readline().strip().split(",")
+    if "variant" not in columns or "conversion" not in columns:
+        # nothing to accumulate; the page shows its missing-columns warning
+        return None, columns
+    keys = [k for k in DEFAULT_KEYS if k in columns]
+    metrics = [m for m in DEFAULT_METRICS if m in columns]
+    return refresh(CSV_PATH, ACC_PATH, keys, metrics), columns
+
+
+# Posterior sampling is cached on the posterior parameters, so reruns skip the draw
+@st.cache_data
+def bayes_summary(posteriors, control):
+    return posterior_summary(posteriors, control)
+
+
+@st.cache_data
+def lift_bootstrap(mtime_ns, metric, control, treatment):
+    events = load_frame("ab_test", columns=["variant", metric])
+    variant = events["variant"].astype(str).to_numpy()
+    stat = partial(lift_stat, events[metric].to_numpy(), variant == treatment, variant == control)
+    return cached_bootstrap(dataset_version("ab_test"), f"lift_{metric}_{treatment}_vs_{control}", stat, len(events))
+
+
+@st.cache_data
+def bandit_replay(mtime_ns):
+    events = load_frame("ab_test", columns=["variant", "conversion"])
+    return compare_policies(events["variant"].cat.codes.to_numpy(), events["conversion"].to_numpy(), batch_size=200)
+
+
+# Disparate-impact ratios with bootstrap CIs for every segment x variant cell
+@st.cache_data
+def ab_fairness(cells):
+    return fairness_report(counts_from_aggregates(cells, "conversion_sum", by="variant"))
 
 
 with st.spinner("Loading A/B test data and governance log..."):
-    df, governance = load_data()
+    governance = load_data()
+    cells, columns = (None, [])
+    if CSV_PATH.exists():
+        stat = CSV_PATH.stat()
+        cells, columns = load_cells(stat.st_size, stat.st_mtime_ns)
 
-if df is None:
+if not columns:
     st.error(f"Data file not found: {CSV_PATH}. Please add ab_test_data.csv from Colab.")
     st.stop()
 
@@ -158,25 +207,28 @@ Equalized Odds: Fairness metric ensuring the model performs equally well across
 st.markdown("---")
 
 # Metrics - defensive: handle missing variant/conversion columns (wrong CSV format)
-has_variant = "variant" in df.columns and "conversion" in df.columns
+has_variant = "variant" in columns and "conversion" in columns
+ab_metrics = ["conversion", "revenue"] if "revenue" in columns else ["conversion"]
+# Per-variant n / sum / sum of squares rolled up from the accumulator cells; every test below reads from it
+summary = rollup(cells, "variant") if has_variant else None
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    st.metric("Total Users", f"{len(df):,}")
+    st.metric("Total Users", f"{int(cells['n'].sum()):,}" if has_variant else "N/A")
 with col2:
-    if has_variant:
-        conv_a = df[df["variant"] == "A"]["conversion"].mean() * 100
+    if has_variant and "A" in summary.index:
+        conv_a = summary.loc["A", "conversion_sum"] / summary.loc["A", "n"] * 100
         st.metric("Variant A Conv %", f"{conv_a:.2f}%")
     else:
         st.metric("Variant A Conv %", "N/A")
 with col3:
-    if has_variant:
-        conv_b = df[df["variant"] == "B"]["conversion"].mean() * 100
+    if has_variant and "B" in summary.index:
+        conv_b = summary.loc["B", "conversion_sum"] / summary.loc["B", "n"] * 100
         st.metric("Variant B Conv %", f"{conv_b:.2f}%")
     else:
         st.metric("Variant B Conv %", "N/A")
 with col4:
-    if has_variant and "revenue" in df.columns:
-        rev_b = df[df["variant"] == "B"]["revenue"].sum()
+    if has_variant and "revenue" in columns and "B" in summary.index:
+        rev_b = summary.loc["B", "revenue_sum"]
         st.metric("Variant B Revenue", f"${rev_b:,.0f}")
     else:
         st.metric("Variant B Revenue", "N/A")
@@ -184,19 +236,98 @@ with col4:
 # Chi-Square Test (only if variant/conversion exist)
 if has_variant:
     st.subheader("Statistical Validation (Chi-Square)")
-    contingency = pd.crosstab(df["variant"], df["conversion"])
-    chi2, p_value, dof, expected = stats.chi2_contingency(contingency)
+    chi = chi_square(summary)
+    chi2, p_value, dof = chi["chi2"], chi["p_value"], chi["dof"]
     st.markdown(f"**Chi-Square** = {chi2:.2f} | **p-value** = {p_value:.4f} | **df** = {dof}")
     if p_value < 0.05:
         st.success("Statistically significant at α=0.05. Variant B shows significant lift.")
     else:
         st.warning("Not statistically significant at α=0.05.")
 
+    # Per-metric comparison of every variant against the control (first variant)
+    if len(summary) > 1:
+        comparison = compare(summary, ab_metrics, control=summary.index[0])
+        st.dataframe(
+            comparison.style.format({
+                "control_mean": "{:.4f}",
+                "variant_mean": "{:.4f}",
+                "relative_lift": "{:+.1%}",
+                "lift_ci_low": "{:+.1%}",
+                "lift_ci_high": "{:+.1%}",
+                "statistic": "{:.2f}",
+                "p_value": "{:.2e}",
+            }),
+            use_container_width=True,
+        )
+        for metric in ab_metrics:
+            boot = lift_bootstrap(CSV_PATH.stat().st_mtime_ns, metric, summary.index[0], summary.index[1])
+            st.caption(
+                f"Bootstrap {metric} lift ({boot['n_boot']:,} resamples): {boot['estimate']:+.1%} "
+                f"[95% CI {boot['ci_low']:+.1%}, {boot['ci_high']:+.1%}]"
+            )
+
+    # Sequential monitoring: cohorts are the looks, in time order
+    if "cohort" in columns and len(summary) > 1:
+        st.subheader("Sequential Monitoring (mSPRT Early Stopping)")
+        seq = msprt(cumulative_looks(cells, control=summary.index[0], treatment=summary.index[1]))
+        stops = seq.index[seq["decision"].str.startswith("stop")]
+        if len(stops):
+            st.markdown(f"**Decision:** {seq.loc[stops[0], 'decision']} at look **{stops[0]}** of {len(seq)}")
+        else:
+            st.markdown(f"**Decision:** continue after {len(seq)} looks")
+        st.dataframe(
+            seq.style.format({"lift": "{:+.1%}", "z": "{:.2f}", "always_valid_p": "{:.2e}"}),
+            use_container_width=True,
+        )
+
+    # Bayesian view: conjugate posteriors per segment and variant
+    if len(summary) > 1:
+        st.subheader("Bayesian A/B (Beta-Binomial Posteriors)")
+        posteriors = beta_posteriors(cells, group="segment" if "segment" in columns else None)
+        bayes = bayes_summary(posteriors, control=summary.index[0])
+        st.dataframe(
+            bayes.style.format({
+                "posterior_mean": "{:.2%}",
+                "ci_low": "{:.2%}",
+                "ci_high": "{:.2%}",
+                "prob_beats_control": "{:.1%}",
+                "prob_best": "{:.1%}",
+                "expected_loss": "{:.4f}",
+            }),
+            use_container_width=True,
+        )
+
+    # Bandit replay over the logged event stream vs the fixed 50/50 split
+    if len(summary) > 1:
+        st.subheader("Multi-Armed Bandit Replay")
+        st.caption("Offline replay of the logged events: a bandit's pick counts only when it matches the logged arm.")
+        bandits = bandit_replay(CSV_PATH.stat().st_mtime_ns)
+        st.dataframe(
+            bandits.style.format({
+                "conversion_rate": "{:.2%}",
+                "regret": "{:.1f}",
+                "regret_per_1k": "{:.2f}",
+                "best_arm_share": "{:.1%}",
+            }),
+            use_container_width=True,
+        )
+
     # Segment fairness (4/5ths rule)
-    if "segment" in df.columns:
+    if "segment" in columns:
         st.subheader("Fairness Audit (4/5ths Rule)")
-        segment_conv = df.groupby(["segment", "variant"])["conversion"].mean().unstack(fill_value=0)
+        seg_cells = rollup(cells, ["segment", "variant"])
+        segment_conv = (seg_cells["conversion_sum"] / seg_cells["n"]).unstack(fill_value=0)
         st.dataframe(segment_conv.style.format("{:.2%}"))
+        ab_report = ab_fairness(cells)
+        st.dataframe(
+            ab_report.style.format({
+                "selection_rate": "{:.2%}",
+                "di_ratio": "{:.3f}",
+                "di_ci_low": "{:.3f}",
+                "di_ci_high": "{:.3f}",
+            }),
+            use_container_width=True,
+        )
 else:
     st.warning("Data file missing expected columns (variant, conversion). Please ensure ab_test_data.csv has columns: user_id, variant, conversion, revenue, segment, cohort.")
 
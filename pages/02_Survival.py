@@ -6,12 +6,26 @@ Kaplan-Meier, Cox PH, Censored Data, Hazard Ratios
 import json
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 
+from components.bootstrap import cached_bootstrap, cox_stat
 from components.craig_section import _key_terms_box
+from components.churn_scoring import hazard_model, score_customers
+from components.data_store import CACHE_DIR, dataset_path, dataset_version, load_frame
+from components.fairness import fairness_report, group_counts
 from components.sidebar_nav import render_sidebar_nav
+from components.survival import (
+    breslow_baseline,
+    concordance,
+    design_matrix,
+    fit_cox,
+    kaplan_meier,
+    person_period_cells,
+    piecewise_exponential,
+)
 
 st.set_page_config(
     page_title="Survival Analysis | Zubia Mughal",
@@ -41,19 +55,94 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+COX_NUMERIC = ("monthly_spend", "support_tickets", "feature_adoption")
+COX_CATEGORICAL = ("plan_type",)
+REPORT_PATH = CACHE_DIR / "at_risk_report.csv"
+
+
 # Load data
 @st.cache_data
 def load_data():
     df = None
     gov = None
     if CSV_PATH.exists():
-        df = pd.read_csv(CSV_PATH)
+        df = load_frame("churn_survival")
     if JSON_PATH.exists():
         with open(JSON_PATH) as f:
             gov = json.load(f)
     return df, gov
 
 
+@st.cache_data
+def km_curves(version, stratify):
+    """Kaplan-Meier / Nelson-Aalen curves, one sorted pass over the churn data."""
+    data = load_frame("churn_survival")
+    event = data["observed"] if "observed" in data.columns else data["churned"]
+    return kaplan_meier(data["tenure"], event, None if stratify is None else data[stratify])
+
+
+def cox_design(data):
+    """Cox design matrix, event indicator and the one-hot encoded columns."""
+    numeric = [c for c in COX_NUMERIC if c in data.columns]
+    categorical = [c for c in COX_CATEGORICAL if c in data.columns]
+    event = data["observed"] if "observed" in data.columns else data["churned"]
+    return design_matrix(data, numeric, categorical), event, categorical
+
+
+@st.cache_data
+def cox_model(version):
+    """Cox PH fit (Efron ties), its C-index per segment, and the scoring model."""
+    data = load_frame("churn_survival")
+    X, event, categorical = cox_design(data)
+    fit = fit_cox(X, data["tenure"], event)
+    strata = data["segment"] if "segment" in data.columns else None
+    c_index = concordance(data["tenure"], event, X.to_numpy() @ fit["coef"], strata)
+    model = hazard_model(fit["summary"], breslow_baseline(X, data["tenure"], event, fit["coef"]), X.mean(), categorical)
+    return fit["summary"], c_index, model
+
+
+@st.cache_data
+def cox_bootstrap(version, covariates, n_boot=200):
+    """Percentile bootstrap CIs on the hazard ratios: one weighted Cox refit per resample.
+
+    The design is only built on a bootstrap-cache miss; covariates name the
+    hazard-ratio columns in fit order.
+    """
+    def make_statistic():
+        data = load_frame("churn_survival")
+        X, event, _ = cox_design(data)
+        return cox_stat(X, data["tenure"], event)
+
+    rows = len(load_frame("churn_survival", columns=["tenure"]))
+    boot = cached_bootstrap(version, "cox_hr", make_statistic, rows, n_boot=n_boot)
+    return pd.DataFrame({"hr_boot_low": boot["ci_low"], "hr_boot_high": boot["ci_high"]}, index=list(covariates))
+
+
+@st.cache_data
+def pwe_model(version, width=90):
+    """Piecewise-exponential hazards fitted on collapsed (interval, bucket) cells."""
+    data = load_frame("churn_survival")
+    numeric = [c for c in COX_NUMERIC if c in data.columns]
+    categorical = [c for c in COX_CATEGORICAL if c in data.columns]
+    event = "observed" if "observed" in data.columns else "churned"
+    cuts = np.arange(0, data["tenure"].max(), width)
+    cells = person_period_cells(data, "tenure", event, cuts, numeric, categorical)
+    fit = piecewise_exponential(cells, numeric, categorical)
+    return fit["summary"], len(cells), int(np.ceil((data["tenure"] + 1) / width).sum())
+
+
+@st.cache_data
+def at_risk_report(version, horizon=90):
+    """Weekly At-Risk batch job: streams the customer file, writes the flagged list."""
+    _, _, model = cox_model(version)
+    return score_customers(dataset_path("churn_survival"), model, REPORT_PATH, horizon=horizon)
+
+
+@st.cache_data
+def churn_fairness(version):
+    return fairness_report(group_counts(load_frame("churn_survival"), "churned"))
+
+
 with st.spinner("Loading churn survival data and governance log..."):
     df, gov = load_data()
 
@@ -82,6 +171,17 @@ hr_spend = hr.get("monthly_spend") or 0.99
 hr_tickets = hr.get("support_tickets") or 1.05
 hr_feature = hr.get("feature_adoption") or 0.42
 
+# Hazard ratios and concordance refit from the data on every refresh; the logged values are the fallback
+cox = c_index = report = None
+if "tenure" in df.columns and "churned" in df.columns:
+    cox, c_index, _ = cox_model(dataset_version("churn_survival"))
+    conc = c_index.loc["All", "c_index"]
+    report = at_risk_report(dataset_version("churn_survival"))
+    n_at_risk = report["flagged"]
+    hr_spend = cox["hazard_ratio"].get("monthly_spend", hr_spend)
+    hr_tickets = cox["hazard_ratio"].get("support_tickets", hr_tickets)
+    hr_feature = cox["hazard_ratio"].get("feature_adoption", hr_feature)
+
 # Header
 st.title("Churn Prevention with Survival Analysis")
 st.markdown("*Time-to-event modeling for proactive customer retention*")
@@ -172,6 +272,23 @@ The model passed fairness audits, equally accurate for all customer segments. No
 
     st.success(f"ROI Calculation: ${savings/1000:.0f}K saved revenue vs. $50K intervention cost = {roi:.1f}x return on the analytics investment.")
 
+    if report is not None and not report["top"].empty:
+        st.markdown("**This Week's At-Risk Report (top accounts by revenue at risk)**")
+        st.caption(
+            f"Batch-scored {report['scored']:,} active customers with the Cox model; "
+            f"{report['flagged']:,} have a 90-day churn probability of 10% or more "
+            f"(${report['revenue_at_risk']:,.0f} revenue at risk). "
+            + (f"Full list: {REPORT_PATH.name}" if report["written"] else "Full list not saved (read-only storage)")
+        )
+        st.dataframe(
+            report["top"].style.format({
+                "monthly_spend": "${:.2f}",
+                "churn_prob": "{:.1%}",
+                "revenue_at_risk": "${:,.2f}",
+            }),
+            use_container_width=True,
+        )
+
 with tab5:
     st.subheader("From Prediction to Prescription")
     st.write("""**Current State:** We know WHO is at risk and WHEN.
@@ -187,33 +304,42 @@ with tab5:
 
 st.markdown("---")
 
-# Survival curve visualization (simplified retention by tenure bins)
+# Kaplan-Meier survival curves (censoring-aware), optionally stratified
 if "tenure" in df.columns and "churned" in df.columns:
     st.subheader("Customer Retention Over Time")
-    bins = [0, 90, 180, 270, 365, 450, 550, 650, 730]
-    df_binned = df.copy()
-    df_binned["tenure_bin"] = pd.cut(df_binned["tenure"], bins=bins, include_lowest=True)
-    retention = (
-        df_binned.groupby("tenure_bin", observed=True)
-        .agg(n=("customer_id", "count"), churned=("churned", "sum"))
-        .assign(survival_pct=lambda x: 100 * (1 - x["churned"] / x["n"]))
-        .reset_index()
-    )
-    retention["bin_mid"] = [b.mid for b in retention["tenure_bin"]]
+    strata_options = ["None"] + [c for c in ("segment", "plan_type") if c in df.columns]
+    stratify = st.selectbox("Stratify by", strata_options, index=0)
+    curve = km_curves(dataset_version("churn_survival"), None if stratify == "None" else stratify)
 
+    palette = ["#8892B0", "#CCD6F6", "#5A6A8C", "#A8B2D1"]
     fig = go.Figure()
-    fig.add_trace(
-        go.Scatter(
-            x=retention["bin_mid"],
-            y=retention["survival_pct"],
-            mode="lines+markers",
-            line=dict(color="#8892B0", width=2),
-            marker=dict(size=8),
+    for i, (name, part) in enumerate(curve.groupby("stratum", sort=False)):
+        color = palette[i % len(palette)]
+        fig.add_trace(
+            go.Scatter(
+                x=np.r_[part["time"], part["time"][::-1]],
+                y=100 * np.r_[part["ci_high"], part["ci_low"][::-1]],
+                fill="toself",
+                fillcolor="rgba(136,146,176,0.15)",
+                line=dict(width=0),
+                line_shape="hv",
+                hoverinfo="skip",
+                showlegend=False,
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=part["time"],
+                y=100 * part["survival"],
+                mode="lines",
+                line=dict(color=color, width=2),
+                line_shape="hv",
+                name=str(name),
+            )
         )
-    )
     fig.update_layout(
         xaxis_title="Tenure (days)",
-        yaxis_title="% Still Active in Segment",
+        yaxis_title="% Still Active (Kaplan-Meier, 95% CI)",
         template="plotly_dark",
         paper_bgcolor="rgba(10,25,47,0)",
         plot_bgcolor="rgba(17,34,64,0.5)",
@@ -221,6 +347,46 @@ if "tenure" in df.columns and "churned" in df.columns:
     )
     st.plotly_chart(fig, use_container_width=True)
 
+if cox is not None:
+    st.subheader("Cox Proportional Hazards Model")
+    st.caption(
+        "Fitted on the current data (Newton-Raphson, Efron ties); 95% Wald CIs on the hazard ratios "
+        "and 95% bootstrap CIs from 200 resampled refits"
+    )
+    st.dataframe(
+        cox.join(cox_bootstrap(dataset_version("churn_survival"), tuple(cox.index))).style.format({
+            "coef": "{:.4f}",
+            "hazard_ratio": "{:.3f}",
+            "se": "{:.4f}",
+            "z": "{:.2f}",
+            "p_value": "{:.4f}",
+            "hr_ci_low": "{:.3f}",
+            "hr_ci_high": "{:.3f}",
+            "hr_boot_low": "{:.3f}",
+            "hr_boot_high": "{:.3f}",
+        }),
+        use_container_width=True,
+    )
+
+    pwe, n_cells, n_periods = pwe_model(dataset_version("churn_survival"))
+    st.subheader("Piecewise-Exponential Model (aggregated cells)")
+    st.caption(
+        f"Poisson GLM on {n_cells:,} collapsed (90-day interval, covariate bucket) cells instead of "
+        f"~{n_periods:,} customer-periods; hazard ratios should agree with the Cox fit above"
+    )
+    st.dataframe(
+        pwe.style.format({
+            "coef": "{:.4f}",
+            "hazard_ratio": "{:.3f}",
+            "se": "{:.4f}",
+            "z": "{:.2f}",
+            "p_value": "{:.4f}",
+            "ci_low": "{:.3f}",
+            "ci_high": "{:.3f}",
+        }),
+        use_container_width=True,
+    )
+
 # Fairness audit
 st.subheader("Fairness Audit by Segment")
 fa = gov.get("fairness_audit") or {}
@@ -234,6 +400,33 @@ if fa:
     if fa_data:
         st.dataframe(pd.DataFrame(fa_data), use_container_width=True)
 
+# Churn-rate parity recomputed from data for every protected attribute
+if "churned" in df.columns:
+    st.caption("Recomputed from data: churn-rate disparate impact (ratio to the highest-churn group)")
+    st.dataframe(
+        churn_fairness(dataset_version("churn_survival")).style.format({
+            "selection_rate": "{:.2%}",
+            "di_ratio": "{:.3f}",
+            "di_ci_low": "{:.3f}",
+            "di_ci_high": "{:.3f}",
+        }),
+        use_container_width=True,
+    )
+
+# Model accuracy parity: Cox C-index within each segment
+if c_index is not None:
+    st.caption("Recomputed from data: Cox model concordance (C-index) overall and within each segment")
+    st.dataframe(
+        c_index.style.format({
+            "comparable": "{:,.0f}",
+            "concordant": "{:,.0f}",
+            "discordant": "{:,.0f}",
+            "tied_risk": "{:,.0f}",
+            "c_index": "{:.3f}",
+        }),
+        use_container_width=True,
+    )
+
 st.markdown("---")
 if st.button("Back to Portfolio"):
     st.switch_page("app.py")
@@ -4,13 +4,26 @@ Precision-Recall optimization, Drift Detection, Bias Audit
 """
 
 import json
+import os
+import time
+from functools import partial
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
 
+from components.bootstrap import cached_bootstrap, ratio_stat
 from components.craig_section import _key_terms_box
+from components.data_store import dataset_version, load_frame
+from components.drift import PROFILE_DIR, append_to_log, build_profile, compare, load_profile, save_profile
+from components.fairness import fairness_report, group_counts
+from components.lead_model import NUMERIC, encode, explanations, flat_forest, load_or_train
 from components.sidebar_nav import render_sidebar_nav
+from components.thresholds import at_threshold, curve_auc, pick_threshold, threshold_curves
+from components.tree_scorer import encode_record, predict_proba
+from components.uplift import LEARNERS, fit_uplift, predict_uplift, qini_coefficient, qini_curve
 
 st.set_page_config(
     page_title="Smart Targeting | Zubia Mughal",
@@ -46,13 +59,112 @@ def load_data():
     df = None
     gov = None
     if CSV_PATH.exists():
-        df = pd.read_csv(CSV_PATH)
+        df = load_frame("targeting")
     if JSON_PATH.exists():
         with open(JSON_PATH) as f:
             gov = json.load(f)
     return df, gov
 
 
+# Cached per data version and threshold; selection = model score above threshold
+@st.cache_data
+def targeting_fairness(version, threshold):
+    data = load_frame("targeting")
+    data["selected"] = (data["conversion_prob"] >= threshold).astype("int8")
+    return fairness_report(group_counts(data, "selected", label="converted"))
+
+
+@st.cache_data
+def precision_bootstrap(version, threshold):
+    data = load_frame("targeting", columns=["conversion_prob", "converted", "protected_segment"])
+    selected = (data["conversion_prob"] >= threshold).to_numpy()
+    hit = selected & (data["converted"] == 1).to_numpy()
+    out = {}
+    for group in data["protected_segment"].cat.categories:
+        in_group = (data["protected_segment"] == group).to_numpy()
+        stat = partial(ratio_stat, hit & in_group, selected & in_group)
+        out[group] = cached_bootstrap(version, f"precision_{group}_{threshold:.4f}", stat, len(data))
+    return out
+
+
+@st.cache_resource
+def lead_model(version):
+    """Random forest trained (or loaded from the artifact cache) for this data version."""
+    return load_or_train(load_frame("targeting"), version, workers=os.cpu_count())
+
+
+@st.cache_resource
+def lead_scorer(version):
+    """Flat-array forest for single-prospect scoring, plus its measured latency."""
+    model, meta, _ = lead_model(version)
+    forest = flat_forest(model, meta)
+    records = load_frame("targeting").head(200).to_dict(orient="records")
+    latency = []
+    for record in records:
+        start = time.perf_counter()
+        predict_proba(forest, encode_record(record, meta["spec"]))
+        latency.append(time.perf_counter() - start)
+    return forest, meta["spec"], np.percentile(latency, [50, 99]) * 1000
+
+
+@st.cache_data
+def lead_explanations(version):
+    """Per-prospect TreeSHAP values, and mean |SHAP| per feature for each protected segment."""
+    model, meta, _ = lead_model(version)
+    data = load_frame("targeting")
+    values, expected = explanations(model, meta, encode(data, meta["spec"]))
+    per_prospect = pd.DataFrame(values, columns=meta["features"], index=data["prospect_id"].to_numpy())
+    by_segment = per_prospect.abs().groupby(data["protected_segment"].to_numpy(), observed=True).mean()
+    return per_prospect, expected, by_segment.T
+
+
+@st.cache_data
+def threshold_analysis(version):
+    """PR/ROC curves of the out-of-fold model scores, overall and per protected segment."""
+    _, _, oof = lead_model(version)
+    data = load_frame("targeting", columns=["converted", "protected_segment"])
+    curve = threshold_curves(oof, data["converted"], data["protected_segment"])
+    return curve, curve_auc(curve)
+
+
+@st.cache_data
+def drift_check(version, features, reference_share=0.7):
+    """KS/PSI of the latest prospects against the stored training-window profile.
+
+    The profile is built once per data version; later checks read only the
+    batch and the profile.
+    """
+    data = load_frame("targeting").sort_values("prospect_id")
+    cut = int(len(data) * reference_share)
+    path = PROFILE_DIR / f"targeting-{version}-{cut}.json"
+    profile = load_profile(path)
+    if profile is None or set(profile) != set(features):
+        profile = build_profile(data.iloc[:cut], list(features))
+        try:
+            save_profile(profile, path)
+        except OSError:
+            pass
+    return compare(profile, data.iloc[cut:]), f"prospects 1-{cut:,}", f"prospects {cut + 1:,}-{len(data):,}"
+
+
+@st.cache_data
+def uplift_demo(version):
+    """Uplift learners on the randomized email experiment (the only log with a treatment arm)."""
+    events = load_frame("ab_test")
+    X = pd.get_dummies(events[["segment", "cohort"]], drop_first=True, dtype=float)
+    X.insert(0, "intercept", 1.0)
+    treat = (events["variant"] == events["variant"].cat.categories[-1]).to_numpy()
+    y = events["conversion"].to_numpy()
+    curves, scores = {}, {}
+    for learner in LEARNERS:
+        uplift = predict_uplift(fit_uplift(X.to_numpy(), treat, y, learner, workers=1), X.to_numpy())
+        curves[learner] = qini_curve(uplift, treat, y)
+        scores[learner] = uplift
+    by_segment = pd.DataFrame(scores).groupby(events["segment"].to_numpy()).mean()
+    qini = pd.Series({k: qini_coefficient(c) for k, c in curves.items()}, name="qini_coefficient")
+    return curves, qini, by_segment
+
+
 with st.spinner("Loading targeting data and governance log..."):
     df, gov = load_data()
 
@@ -67,6 +179,20 @@ st.markdown("---")
 
 # Metrics - support both performance (Colab) and model_performance (placeholder) structures
 perf = gov.get("performance") or gov.get("model_performance") or {}
+importance = gov.get("feature_importance") or []
+meta = None
+if df is not None and "converted" in df.columns:
+    # Metrics from the trained pipeline (out-of-fold); the log is the fallback
+    with st.spinner("Training lead-scoring model..."):
+        _, meta, _ = lead_model(dataset_version("targeting"))
+    # the log's threshold belongs to the offline conversion_prob score used by the audit below
+    logged_threshold = perf.get("optimal_threshold", 0.5)
+    perf = {**perf, **{k: meta[k] for k in ("auc_roc", "cv_auc_mean", "cv_auc_std")}}
+    importance = meta["feature_importance"]
+    curve, curve_aucs = threshold_analysis(dataset_version("targeting"))
+    best = pick_threshold(curve)
+    perf.update(optimal_threshold=best["threshold"], precision_at_threshold=best["precision"],
+                recall_at_threshold=best["recall"])
 auc_val = perf.get("auc_roc") or perf.get("auc") or perf.get("concordance_index", 0)
 bi = gov.get("business_impact") or {}
 c1, c2, c3, c4 = st.columns(4)
@@ -113,24 +239,48 @@ with tab3:
 Used Random Forest algorithm, 100 "expert trees" voting on the answer. Why? Because buying signals interact: "Downloaded whitepaper" alone = 5% conversion, but "Downloaded whitepaper + Pricing page + VP title" = 65% conversion.""")
 
         st.write("**Top Buying Signals:**")
-        for feat in (gov.get("feature_importance") or [])[:3]:
+        for feat in importance[:3]:
             st.write(f"- {feat['feature']}: {feat['importance']:.1%} importance")
 
     with col2:
         st.markdown("**Governance Controls**")
-        perf = gov.get("performance") or gov.get("model_performance") or {}
         st.write(f"""- Risk Tier: {gov.get('risk_tier', 'N/A')}
 - Approval: {gov.get('approval', 'N/A')}
 - Optimal Threshold: {perf.get('optimal_threshold', 0.5):.0%} probability
 - Precision: {perf.get('precision_at_threshold', 0):.0%} (when we say they'll buy, we're right)
 - Recall: {perf.get('recall_at_threshold', 0):.0%} (we catch most actual buyers)
 - Drift Monitoring: Weekly KS tests for data distribution changes""")
+        if perf.get("cv_auc_mean"):
+            st.write(f"Cross-validated AUC: {perf['cv_auc_mean']:.3f} ± {perf['cv_auc_std']:.3f}"
+                     + (f" ({meta['folds']}-fold, {meta['rows']:,} prospects)" if meta else ""))
 
     st.markdown("---")
     st.markdown("**Fairness and Bias Audit**")
     st.write("Model accuracy by protected segment (ensuring no discrimination):")
     for group, metrics in (gov.get("fairness_audit") or {}).items():
         st.write(f"- {group}: {metrics['precision']:.1%} accuracy (n={metrics['sample_size']})")
+    if df is not None and {"conversion_prob", "converted"} <= set(df.columns):
+        threshold = logged_threshold if meta is not None else perf.get("optimal_threshold", 0.5)
+        st.write(f"Recomputed from data: selection at score >= {threshold:.0%}, 4/5ths rule and equalized odds:")
+        st.dataframe(
+            targeting_fairness(dataset_version("targeting"), threshold).style.format({
+                "selection_rate": "{:.2%}",
+                "di_ratio": "{:.3f}",
+                "di_ci_low": "{:.3f}",
+                "di_ci_high": "{:.3f}",
+                "tpr": "{:.1%}",
+                "fpr": "{:.1%}",
+                "tpr_gap": "{:.3f}",
+                "fpr_gap": "{:.3f}",
+            }),
+            use_container_width=True,
+        )
+
+        for group, boot in precision_bootstrap(dataset_version("targeting"), threshold).items():
+            st.write(
+                f"- {group}: precision {boot['estimate']:.1%} "
+                f"(95% CI {boot['ci_low']:.1%} to {boot['ci_high']:.1%}, bootstrap)"
+            )
 
     dm = gov.get("drift_monitoring") or {}
     st.markdown("**Drift Detection Results**")
@@ -138,6 +288,21 @@ Used Random Forest algorithm, 100 "expert trees" voting on the answer. Why? Beca
     st.write(f"Status: {'Drift Detected' if dm.get('drift_detected') else 'No Significant Drift'}")
     st.write(f"Features monitored: {dm.get('features_monitored', 0)}")
     st.write(f"Features drifted: {dm.get('features_drifted', 0)}")
+    if df is not None:
+        features = tuple(c for c in (gov.get("drift_details") or {}) if c in df.columns) or NUMERIC
+        drift, reference, batch = drift_check(dataset_version("targeting"), features)
+        st.write(f"Recomputed from data: latest batch ({batch}) vs reference profile ({reference}):")
+        st.dataframe(
+            drift.style.format({"ks_statistic": "{:.4f}", "p_value": "{:.4f}", "psi": "{:.4f}"}),
+            use_container_width=True,
+        )
+        if st.button("Append drift check to governance log"):
+            try:
+                append_to_log(JSON_PATH, drift, reference, batch)
+                load_data.clear()
+                st.success(f"Drift check appended to {JSON_PATH.name}")
+            except OSError as exc:
+                st.error(f"Could not update {JSON_PATH.name}: {exc}")
 
     _key_terms_box("""Random Forest: 100+ decision trees voting on the answer. More accurate than one tree, less likely to overfit.<br><br>
 Kolmogorov-Smirnov (KS) Test: A statistical test that checks if two samples (training data vs new data) come from the same distribution. If p-value < 0.05, the data has "drifted" and the model may be outdated.<br><br>
@@ -179,6 +344,32 @@ with tab5:
 
 **The Vision:** Fully autonomous "Sales Intelligence" that orchestrates timing, channel, message, and pricing, personalized per prospect.""")
 
+    st.markdown("**Uplift Prototype: Finding the Persuadables**")
+    st.caption("T-learner, X-learner and transformed-outcome models fitted on the randomized email A/B log "
+               "(segment and cohort features), since the targeting data has no treatment arm yet")
+    curves, qini, by_segment = uplift_demo(dataset_version("ab_test"))
+    fig = go.Figure()
+    palette = ["#CCD6F6", "#8892B0", "#A8B2D1"]
+    for i, (learner, c) in enumerate(curves.items()):
+        fig.add_trace(go.Scatter(x=c["fraction"], y=c["qini"], mode="lines", name=learner,
+                                 line=dict(color=palette[i % len(palette)], width=2)))
+    first = next(iter(curves.values()))
+    fig.add_trace(go.Scatter(x=first["fraction"], y=first["random"], mode="lines", name="random",
+                             line=dict(color="#5A6A8C", dash="dash")))
+    fig.update_layout(
+        xaxis_title="Share of customers targeted (by predicted uplift)",
+        yaxis_title="Incremental conversions (Qini)",
+        template="plotly_dark",
+        paper_bgcolor="rgba(10,25,47,0)",
+        plot_bgcolor="rgba(17,34,64,0.5)",
+        font=dict(color="#CCD6F6"),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(
+        by_segment.T.join(qini).style.format("{:.4f}"),
+        use_container_width=True,
+    )
+
 st.markdown("---")
 st.caption("Skills: Random Forest, Classification, Precision-Recall, Drift Detection, Feature Engineering, Bias Auditing")
 
@@ -186,6 +377,86 @@ if df is not None and len(df) > 0:
     st.subheader("Sample Lead Data")
     st.dataframe(df.head(10), use_container_width=True)
 
+if meta is not None:
+    st.subheader("Threshold Optimizer")
+    st.caption("Out-of-fold model scores; every threshold is evaluated from one sorted pass")
+    t1, t2, t3 = st.columns(3)
+    cost_call = t1.number_input("Cost of a wasted call ($)", min_value=0.0, value=50.0, step=10.0)
+    cost_missed = t2.number_input("Value of a missed buyer ($)", min_value=0.0, value=500.0, step=50.0)
+    capacity = t3.slider("Max calls (% of prospects)", 5, 100, 100, step=5)
+    try:
+        choice = pick_threshold(curve, cost_fp=cost_call, cost_fn=cost_missed, max_selected=capacity / 100)
+    except ValueError:
+        choice = None
+    if choice is None:
+        st.warning("No threshold fits within that call capacity.")
+    else:
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Threshold", f"{choice['threshold']:.1%}")
+        k2.metric("Calls", f"{int(choice['selected']):,}")
+        k3.metric("Precision", f"{choice['precision']:.1%}")
+        k4.metric("Recall", f"{choice['recall']:.1%}")
+        per_group = at_threshold(curve, choice["threshold"])[["selected", "precision", "recall", "fpr"]]
+        st.dataframe(
+            per_group.join(curve_aucs).style.format({
+                "selected": "{:,.0f}",
+                "precision": "{:.1%}",
+                "recall": "{:.1%}",
+                "fpr": "{:.1%}",
+                "roc_auc": "{:.3f}",
+                "average_precision": "{:.3f}",
+            }),
+            use_container_width=True,
+        )
+
+    palette = ["#CCD6F6", "#8892B0", "#5A6A8C", "#A8B2D1"]
+    fig = go.Figure()
+    for i, (name, part) in enumerate(curve.groupby("group", sort=False)):
+        fig.add_trace(go.Scatter(x=part["recall"], y=part["precision"], mode="lines", name=name,
+                                 line=dict(color=palette[i % len(palette)], width=2)))
+    fig.update_layout(
+        xaxis_title="Recall",
+        yaxis_title="Precision",
+        template="plotly_dark",
+        paper_bgcolor="rgba(10,25,47,0)",
+        plot_bgcolor="rgba(17,34,64,0.5)",
+        font=dict(color="#CCD6F6"),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Real-Time Lead Scoring")
+    forest, spec, (p50, p99) = lead_scorer(dataset_version("targeting"))
+    prospect = st.selectbox("Score a prospect", df["prospect_id"].head(100).tolist())
+    record = df[df["prospect_id"] == prospect].iloc[0].to_dict()
+    score = float(predict_proba(forest, encode_record(record, spec))[0])
+    s1, s2, s3 = st.columns(3)
+    s1.metric("Lead Score", f"{score:.1%}")
+    s2.metric("Latency p50", f"{p50:.3f} ms")
+    s3.metric("Latency p99", f"{p99:.3f} ms")
+    st.caption(f"Scored from flat tree arrays ({len(forest['roots'])} trees, depth {forest['max_depth']}); "
+               "latency measured per single-prospect call, including encoding")
+
+    st.subheader("Why This Score")
+    shap, expected, shap_by_segment = lead_explanations(dataset_version("targeting"))
+    contrib = shap.loc[prospect].sort_values(key=np.abs, ascending=False).head(8)[::-1]
+    fig = go.Figure(go.Bar(
+        x=contrib.values,
+        y=contrib.index,
+        orientation="h",
+        marker_color=["#CCD6F6" if v > 0 else "#5A6A8C" for v in contrib.values],
+    ))
+    fig.update_layout(
+        xaxis_title="Contribution to lead score",
+        template="plotly_dark",
+        paper_bgcolor="rgba(10,25,47,0)",
+        plot_bgcolor="rgba(17,34,64,0.5)",
+        font=dict(color="#CCD6F6"),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Exact TreeSHAP: the average score {expected:.1%} plus all contributions equals the lead score")
+    st.markdown("**Mean |SHAP| by protected segment**")
+    st.dataframe(shap_by_segment.style.format("{:.4f}"), use_container_width=True)
+
 st.markdown("---")
 if st.button("Back to Portfolio"):
     st.switch_page("app.py")
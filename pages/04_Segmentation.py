@@ -4,12 +4,33 @@ K-Means, RFM Analysis, Privacy-by-design, GDPR compliance
 """
 
 import json
+import os
+import time
+from functools import partial
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
+from scipy.stats import chi2_contingency
 
+from components.ann_index import build_ivf_pq, load_ann, look_alikes, recall_benchmark, save_ann
+from components.bitmap_index import build_bitmaps, cardinality, crosstab, select
+from components.bootstrap import cached_bootstrap, mean_stat
+from components.cluster_quality import quality_report
 from components.craig_section import _key_terms_box
+from components.data_store import CACHE_DIR, dataset_version, load_frame
+from components.kmeans import _open, assign, save_features, standardizer, sweep
+from components.segment_service import (
+    assign_segments,
+    build_index,
+    encode_customer,
+    load_index,
+    save_index,
+    segment_names,
+    update_index,
+)
 from components.sidebar_nav import render_sidebar_nav
 
 st.set_page_config(
@@ -24,6 +45,8 @@ BASE = Path(__file__).parent.parent
 DATA_DIR = BASE / "data"
 CSV_PATH = DATA_DIR / "segmentation_customer_data.csv"
 JSON_PATH = DATA_DIR / "segmentation_governance_log.json"
+RFM_FEATURES = ["recency_days", "frequency", "monetary_avg", "email_opens", "site_visits"]
+CONTRACT_COLUMNS = ["consent_profile", "protected_region", "age_group", "segment_name"]
 
 # Custom CSS - uniform font and color
 st.markdown(
@@ -53,7 +76,7 @@ def load_data():
     gov = None
     try:
         if CSV_PATH.exists():
-            df = pd.read_csv(CSV_PATH)
+            df = load_frame("segmentation")
     except Exception:
         pass
     try:
@@ -71,6 +94,138 @@ def load_data():
     return df, gov
 
 
+@st.cache_resource
+def contract_index(version):
+    """Compressed bitmaps per value of the consent, protected-attribute and segment columns."""
+    return build_bitmaps(load_frame("segmentation", columns=CONTRACT_COLUMNS), CONTRACT_COLUMNS)
+
+
+@st.cache_data
+def bias_audit(version, attribute="age_group"):
+    """Chi-square test of segment vs a protected attribute among consented customers."""
+    index = contract_index(version)
+    counts = crosstab(index, "segment_name", attribute, within=select(index, {"consent_profile": True}))
+    chi2, p_value, _, _ = chi2_contingency(counts)
+    return counts, float(chi2), float(p_value)
+
+
+@st.cache_data
+def consent_bootstrap(version):
+    consent = load_frame("segmentation", columns=["consent_profile"])["consent_profile"].to_numpy()
+    return cached_bootstrap(version, "consent_rate", partial(mean_stat, consent), len(consent))
+
+
+@st.cache_resource
+def feature_matrix(version, features):
+    """Path of the float32 feature matrix, written once per data version for memory-mapping.
+
+    Falls back to the in-memory matrix when the cache is not writable; it is
+    a cached resource so that copy is built once and shared by every caller.
+    """
+    path = CACHE_DIR / "kmeans" / f"{version}-{'-'.join(features)}.npy"
+    if path.exists():
+        return path
+    data = load_frame("segmentation", columns=list(features))
+    try:
+        return save_features(data, list(features), path)
+    except OSError:
+        return data.to_numpy(np.float32)
+
+
+@st.cache_data
+def kmeans_sweep(version, features, ks=tuple(range(2, 9)), restarts=3):
+    """Mini-batch K-means for each k (best of several restarts) on the standardized features."""
+    data = load_frame("segmentation", columns=["cluster"])
+    path = feature_matrix(version, features)
+    # workers memory-map a saved matrix; an in-memory one would be pickled to each
+    best, runs = sweep(path, ks, restarts=restarts, workers=os.cpu_count() if isinstance(path, Path) else 1)
+    elbow = runs.groupby("k").agg(inertia=("inertia", "min"), worst_restart=("inertia", "max"), iterations=("iterations", "mean"))
+    agreement = {}
+    for k, model in best.items():
+        labels, _ = assign(path, model)
+        # share of customers whose new cluster's majority precomputed cluster matches their own
+        agreement[k] = pd.crosstab(labels, data["cluster"].to_numpy()).max(axis=1).sum() / len(data)
+    elbow["agreement_with_precomputed"] = pd.Series(agreement)
+    return best, elbow
+
+
+@st.cache_data
+def sweep_quality(version, features):
+    """Silhouette (simplified and sampled, with 95% CI), Calinski-Harabasz and Davies-Bouldin per k."""
+    best, _ = kmeans_sweep(version, features)
+    path = feature_matrix(version, features)
+    labels = {k: assign(path, model)[0] for k, model in best.items()}
+    return quality_report(path, best, labels)
+
+
+@st.cache_resource
+def segment_index(version, features, k):
+    """Serving index for the k-segment fit, named after each cluster's majority segment.
+
+    Saved once per data version and k, then memory-mapped; returns the index
+    and the measured single-customer latency (p50, p99 in ms).
+    """
+    path = CACHE_DIR / "segment_index" / f"{version}-{'-'.join(features)}-k{k}"
+    try:
+        index = load_index(path)
+    except (OSError, ValueError):
+        best, _ = kmeans_sweep(version, features)
+        labels, _ = assign(feature_matrix(version, features), best[k])
+        current = load_frame("segmentation", columns=["segment_name"])["segment_name"].astype(str).to_numpy()
+        majority = pd.crosstab(labels, current).idxmax(axis=1).reindex(range(k), fill_value="Unassigned")
+        names = [f"{name} ({i})" if (majority == name).sum() > 1 else name for i, name in enumerate(majority)]
+        index = build_index(best[k], names, features, np.bincount(labels, minlength=k))
+        try:
+            save_index(index, path)
+        except OSError:
+            pass
+    records = load_frame("segmentation", columns=list(features)).head(200).to_dict(orient="records")
+    latency = []
+    for record in records:
+        start = time.perf_counter()
+        assign_segments(index, encode_customer(record, features))
+        latency.append(time.perf_counter() - start)
+    return index, np.percentile(latency, [50, 99]) * 1000
+
+
+@st.cache_resource
+def lookalike_index(version, features):
+    """IVF-PQ index over the standardized features, built once per data version and memory-mapped."""
+    path = CACHE_DIR / "ann" / f"{version}-{'-'.join(features)}"
+    try:
+        return load_ann(path)
+    except (OSError, ValueError):
+        pass
+    source = feature_matrix(version, features)
+    index = build_ivf_pq(source, *standardizer(source))
+    try:
+        save_ann(index, path)
+    except OSError:
+        pass
+    return index
+
+
+@st.cache_data
+def ann_recall(version, features, queries=200, seed=0):
+    """Recall@10 of the index against a brute-force scan, for random customers as queries."""
+    source = feature_matrix(version, features)
+    matrix = _open(source)
+    rows = np.sort(np.random.default_rng(seed).choice(len(matrix), min(queries, len(matrix)), replace=False))
+    return recall_benchmark(lookalike_index(version, features), source, np.asarray(matrix[rows]))
+
+
+@st.cache_data
+def lookalike_audience(version, features, seed_segment, size, n_probe=8):
+    """Look-alikes of one ground-truth segment: (seed count, audience, query ms)."""
+    source = feature_matrix(version, features)
+    labels = load_frame("segmentation", columns=["segment_ground_truth"])["segment_ground_truth"].astype(str)
+    seed_rows = np.flatnonzero((labels == seed_segment).to_numpy())
+    seeds = np.asarray(_open(source)[seed_rows], dtype=np.float64)
+    start = time.perf_counter()
+    audience = look_alikes(lookalike_index(version, features), (seeds, seed_rows), size=size, n_probe=n_probe, source=source)
+    return len(seed_rows), audience, (time.perf_counter() - start) * 1000
+
+
 with st.spinner("Loading segmentation data and governance log..."):
     df, gov = load_data()
 
@@ -155,14 +310,21 @@ Step 3: K-Means Clustering. Found natural groupings using the "Elbow Method" (op
         st.write(f"- Chi-Square: {bias.get('chi2', 0):.2f}")
         st.write(f"- P-Value: {bias.get('p_value', 0):.4f}")
         st.write(f"- Status: {'Review Required' if bias.get('bias_detected') else 'No significant bias'}")
+        if df is not None and set(CONTRACT_COLUMNS) <= set(df.columns):
+            _, data_chi2, data_p = bias_audit(dataset_version("segmentation"))
+            st.write(f"- From data (segment vs age group, bitmap index): chi-square {data_chi2:.2f}, p = {data_p:.4f}")
 
     st.markdown("---")
     st.markdown("**Data Contract Implementation**")
     priv = gov.get("privacy") or {}
+    consent_ci = ""
+    if df is not None and "consent_profile" in df.columns:
+        boot = consent_bootstrap(dataset_version("segmentation"))
+        consent_ci = f" (from data: {boot['estimate']:.1%}, 95% CI {boot['ci_low']:.1%} to {boot['ci_high']:.1%})"
     st.write(f"""Consent Compliance:
 - Behavioral segmentation: {priv.get('behavioral_segments', 0):,} customers (consented)
 - Generic-only treatment: {priv.get('generic_only', 0):,} customers (opted-out)
-- Consent rate: {priv.get('consent_rate', 'N/A')}
+- Consent rate: {priv.get('consent_rate', 'N/A')}{consent_ci}
 
 Technical Enforcement:
 - Schema validation (pipeline stops if data malformed)
@@ -214,6 +376,109 @@ if df is not None and len(df) > 0:
     st.subheader("Sample Customer Data")
     st.dataframe(df.head(15), use_container_width=True)
 
+    features = [c for c in (clust.get("features_used") or RFM_FEATURES) if c in df.columns]
+    st.subheader("Re-Segmentation Engine")
+    _, elbow = kmeans_sweep(dataset_version("segmentation"), tuple(features))
+    fig = go.Figure(go.Scatter(x=elbow.index, y=elbow["inertia"], mode="lines+markers", line=dict(color="#CCD6F6")))
+    fig.update_layout(
+        xaxis_title="Number of segments (k)",
+        yaxis_title="Inertia (standardized)",
+        template="plotly_dark",
+        paper_bgcolor="rgba(10,25,47,0)",
+        plot_bgcolor="rgba(17,34,64,0.5)",
+        font=dict(color="#CCD6F6"),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(
+        elbow.style.format({
+            "inertia": "{:,.0f}",
+            "worst_restart": "{:,.0f}",
+            "iterations": "{:.0f}",
+            "agreement_with_precomputed": "{:.1%}",
+        }),
+        use_container_width=True,
+    )
+    st.caption(f"Mini-batch K-means with k-means++ seeding on standardized {', '.join(features)}; "
+               "best of 3 restarts per k, fitted in parallel processes")
+
+    st.markdown("**Choosing k: cluster quality**")
+    quality = sweep_quality(dataset_version("segmentation"), tuple(features))
+    st.dataframe(quality.style.format("{:.3f}"), use_container_width=True)
+    logged_k = clust.get("optimal_k")
+    if logged_k in quality.index:
+        row = quality.loc[logged_k]
+        st.caption(f"Logged silhouette at k={logged_k}: {clust.get('silhouette_score', 0):.3f}; re-estimated from a "
+                   f"stratified sample: {row['silhouette']:.3f} (95% CI {row['silhouette_ci_low']:.3f} to "
+                   f"{row['silhouette_ci_high']:.3f}). Simplified silhouette uses centroid distances only.")
+
+    st.subheader("Real-Time Segment Assignment")
+    serve_k = logged_k if logged_k in quality.index else int(quality.index[0])
+    index, (p50, p99) = segment_index(dataset_version("segmentation"), tuple(features), serve_k)
+    customer = st.selectbox("Customer", df["customer_id"].head(100).tolist())
+    record = df[df["customer_id"] == customer].iloc[0].to_dict()
+    extra_visits = st.slider("Site visits during this browsing session", 0, 30, 0)
+    session = {**record, "site_visits": record["site_visits"] + extra_visits, "recency_days": 0 if extra_visits else record["recency_days"]}
+    before, after = segment_names(index, assign_segments(index, np.stack([
+        encode_customer(record, features), encode_customer(session, features),
+    ])))
+    r1, r2, r3, r4 = st.columns(4)
+    r1.metric("Stored Segment", before)
+    r2.metric("Live Segment", after)
+    r3.metric("Latency p50", f"{p50:.3f} ms")
+    r4.metric("Latency p99", f"{p99:.3f} ms")
+    moved = update_index(index, encode_customer(session, features))
+    shift = np.abs(np.asarray(moved["centers"]) - np.asarray(index["centers"])).max()
+    st.caption(f"One matrix multiply against {serve_k} float32 centroids with the scaler folded in. Preview: absorbing "
+               f"this session as a new event would move the centroids by at most {shift:.2e} standard deviations, so no "
+               "re-clustering is needed (the served index is not changed by this demo)")
+
+    st.subheader("Data Contract Filter")
+    contract = contract_index(dataset_version("segmentation"))
+    f1, f2, f3 = st.columns(3)
+    consent_only = f1.checkbox("Consented only", value=True)
+    regions = f1.multiselect("Region", list(contract["bitmaps"]["protected_region"]))
+    ages = f2.multiselect("Age group", list(contract["bitmaps"]["age_group"]))
+    segments = f3.multiselect("Segment", list(contract["bitmaps"]["segment_name"]))
+    filters = {"consent_profile": True} if consent_only else {}
+    filters.update({col: values for col, values in (
+        ("protected_region", regions), ("age_group", ages), ("segment_name", segments),
+    ) if values})
+    start = time.perf_counter()
+    matched = select(contract, filters)
+    elapsed = (time.perf_counter() - start) * 1000
+    consented = cardinality(select(contract, {"consent_profile": True}))
+    b1, b2, b3 = st.columns(3)
+    b1.metric("Matching Customers", f"{cardinality(matched):,}")
+    b2.metric("Filter Time", f"{elapsed:.2f} ms")
+    b3.metric("Consented in Data", f"{consented:,}")
+    st.caption("Filters are AND/OR operations over roaring-style compressed bitmaps (one per column value); "
+               "opted-out customers are excluded before any behavioral selection")
+
+    st.subheader("Look-Alike Expansion")
+    version = dataset_version("segmentation")
+    ann = lookalike_index(version, tuple(features))
+    labels = df["segment_ground_truth"].astype(str)
+    seed_segments = labels.value_counts().index.tolist()
+    seed_segment = st.selectbox("Seed segment", seed_segments, index=seed_segments.index("VIP") if "VIP" in seed_segments else 0)
+    audience_size = st.slider("Audience size", 10, 500, 100, step=10)
+    n_seeds, audience, elapsed = lookalike_audience(version, tuple(features), seed_segment, audience_size)
+    l1, l2, l3 = st.columns(3)
+    l1.metric("Seed Customers", f"{n_seeds:,}")
+    l2.metric("Look-Alikes Found", f"{len(audience):,}")
+    l3.metric("Query Time", f"{elapsed:.1f} ms")
+    audience = audience.assign(customer_id=df["customer_id"].to_numpy()[audience["row"]], segment=labels.to_numpy()[audience["row"]])
+    st.dataframe(
+        audience[["customer_id", "segment", "votes", "distance"]].head(15).style.format({"distance": "{:.3f}"}),
+        use_container_width=True,
+    )
+    st.caption("Audience composition: " + ", ".join(
+        f"{name} {share:.0%}" for name, share in audience["segment"].value_counts(normalize=True).items()
+    ))
+    st.markdown("**Index recall vs brute-force scan (recall@10)**")
+    st.dataframe(ann_recall(version, tuple(features)).style.format({"recall": "{:.3f}", "ms_per_query": "{:.3f}"}), use_container_width=True)
+    st.caption(f"IVF-PQ: {len(ann['coarse'])} inverted lists, one uint8 code per feature; "
+               "look-alikes probe 8 lists per seed and re-rank the best candidates exactly")
+
 st.markdown("---")
 if st.button("Back to Portfolio"):
     st.switch_page("app.py")
@@ -6,10 +6,14 @@ Dimensionality reduction for real-time ML with governance
 import json
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from components.bootstrap import cached_retained_variance
 from components.craig_section import _key_terms_box
+from components.data_store import dataset_version, load_frame, load_matrix
+from components.pca_stats import components_for_variance, fit_pca
 from components.sidebar_nav import render_sidebar_nav
 
 st.set_page_config(
@@ -68,13 +72,7 @@ FALLBACK_GOV = {
 
 @st.cache_data
 def load_data():
-    df = None
     gov = None
-    try:
-        if CSV_PATH.exists():
-            df = pd.read_csv(CSV_PATH)
-    except Exception:
-        pass
     try:
         if JSON_PATH.exists():
             with open(JSON_PATH) as f:
@@ -87,11 +85,42 @@ def load_data():
                 gov = json.load(f)
         except Exception:
             pass
-    return df, gov
+    return gov
+
+
+# Feature matrix is memory-mapped float32, shared by all sessions in the process
+# (and via the OS page cache across worker processes) instead of copied per session.
+@st.cache_resource
+def load_features():
+    try:
+        if CSV_PATH.exists():
+            matrix, cols = load_matrix("pca")
+            labels = load_frame("pca", columns=["fraud"])["fraud"].to_numpy()
+            return matrix, cols, labels
+    except Exception:
+        pass
+    return None, [], None
+
+
+@st.cache_data
+def pca_summary(version):
+    """Standardized PCA computed by streaming the memory-mapped matrix."""
+    matrix, _, _ = load_features()
+    pca = fit_pca(matrix)
+    ratios = pca["explained_variance_ratio"]
+    k = components_for_variance(ratios, 0.95)
+    boot = cached_retained_variance(version, matrix, 0.95)
+    return {
+        "n_components": k,
+        "retained": float(ratios[:k].sum()),
+        "retained_ci": (boot["ci_low"], boot["ci_high"]),
+        "n_features": matrix.shape[1],
+    }
 
 
 with st.spinner("Loading PCA governance and sample data..."):
-    df, gov = load_data()
+    gov = load_data()
+    matrix, feature_cols, fraud = load_features()
 
 if gov is None:
     gov = FALLBACK_GOV
@@ -277,9 +306,17 @@ with tab5:
 st.markdown("---")
 st.caption("Skills: PCA • Dimensionality Reduction • Feature Stores • Eigenvalue Analysis • Data Lineage • MLOps")
 
-if df is not None and len(df) > 0:
+if matrix is not None and len(matrix) > 0:
+    summary = pca_summary(dataset_version("pca"))
+    st.caption(
+        f"Recomputed from data: {summary['n_components']}/{summary['n_features']} components "
+        f"retain {summary['retained']:.1%} of variance "
+        f"(95% CI {summary['retained_ci'][0]:.1%} to {summary['retained_ci'][1]:.1%}, bootstrap)"
+    )
     st.subheader("Sample Feature Data")
-    st.dataframe(df.head(15), use_container_width=True)
+    sample = pd.DataFrame(np.asarray(matrix[:15]), columns=feature_cols)
+    sample["fraud"] = fraud[:15]
+    st.dataframe(sample, use_container_width=True)
 
 st.markdown("---")
 if st.button("Back to Portfolio"):
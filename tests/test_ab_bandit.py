@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from components.ab_bandit import POLICIES, compare_policies, fixed_split, replay
+
+
+def _log(n=40_000, rates=(0.05, 0.12), seed=0):
+    rng = np.random.default_rng(seed)
+    arms = rng.integers(0, len(rates), n)
+    rewards = (rng.random(n) < np.asarray(rates)[arms]).astype(float)
+    return arms, rewards
+
+
+def _brute_regret(arms, rewards, used):
+    rate = np.array([rewards[arms == a].mean() for a in range(arms.max() + 1)])
+    return (rate.max() - rate[used]).sum()
+
+
+def test_fixed_split_regret_matches_brute_force():
+    arms, rewards = _log()
+    out = fixed_split(arms, rewards)
+    assert out["events_used"] == len(arms)
+    assert out["regret"] == pytest.approx(_brute_regret(arms, rewards, arms))
+    assert out["conversion_rate"] == pytest.approx(rewards.mean())
+
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_policies_beat_the_fixed_split(policy):
+    arms, rewards = _log()
+    out = replay(arms, rewards, policy, batch_size=500)
+    assert out["best_arm_share"] > 0.6
+    assert out["regret_per_1k"] < fixed_split(arms, rewards)["regret_per_1k"]
+    assert out["decision_event"] is not None
+
+
+def test_compare_policies_has_every_row():
+    arms, rewards = _log(5000)
+    assert compare_policies(arms, rewards).index.tolist() == ["fixed_split", *POLICIES]
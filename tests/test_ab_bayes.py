@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import integrate, stats
+
+from components.ab_bayes import beta_posteriors, posterior_summary
+
+
+def _cells():
+    rows = [
+        ("a", "control", 400, 40), ("a", "treatment", 400, 60),
+        ("b", "control", 300, 45), ("b", "treatment", 300, 30),
+    ]
+    return pd.DataFrame(rows, columns=["segment", "variant", "n", "conversion_sum"]).set_index(["segment", "variant"])
+
+
+def test_posteriors_add_counts_to_the_prior():
+    post = beta_posteriors(_cells(), prior_alpha=2.0, prior_beta=3.0)
+    assert post.loc[("a", "treatment")].tolist() == [62.0, 343.0]
+    assert post.loc[("All", "control")].tolist() == [87.0, 618.0]
+
+
+def test_summary_matches_numerical_integration():
+    post = beta_posteriors(_cells(), overall=False)
+    out = posterior_summary(post, "control", draws=200_000, seed=1)
+    a0, b0 = post.loc[("a", "control")]
+    a1, b1 = post.loc[("a", "treatment")]
+    # P(p1 > p0) = integral of pdf0(x) * (1 - cdf1(x))
+    exact, _ = integrate.quad(lambda x: stats.beta.pdf(x, a0, b0) * stats.beta.sf(x, a1, b1), 0, 1)
+    row = out.loc[("a", "treatment")]
+    assert row["prob_beats_control"] == pytest.approx(exact, abs=0.005)
+    assert row["prob_best"] == pytest.approx(exact, abs=0.005)
+    assert row["posterior_mean"] == pytest.approx(a1 / (a1 + b1))
+    assert row["ci_low"] == pytest.approx(stats.beta.ppf(0.025, a1, b1))
+    assert out.loc[("a", "control"), "prob_beats_control"] == 0.0
+    assert np.allclose(out.groupby(level="group")["prob_best"].sum(), 1.0)
+
+
+def test_groups_missing_a_variant_compare_the_variants_they_have():
+    cells = pd.concat([_cells(), pd.DataFrame(
+        [("c", "control", 200, 20), ("d", "treatment", 100, 10)], columns=["segment", "variant", "n", "conversion_sum"]
+    ).set_index(["segment", "variant"])])
+    out = posterior_summary(beta_posteriors(cells, overall=False), "control", draws=5000)
+    assert ("c", "treatment") not in out.index and ("d", "control") not in out.index
+    assert out.loc[("c", "control"), "prob_best"] == 1.0
+    assert out.loc[("c", "control"), "expected_loss"] == 0.0
+    assert out.loc[("d", "treatment"), "prob_best"] == 1.0
+    assert np.isnan(out.loc[("d", "treatment"), "prob_beats_control"])
+    # complete groups are unaffected by the incomplete ones
+    full = posterior_summary(beta_posteriors(_cells(), overall=False), "control", draws=5000)
+    assert np.allclose(out.loc[["a", "b"]].to_numpy(), full.to_numpy())
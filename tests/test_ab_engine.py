@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from components.ab_engine import chi_square, compare, merge, metric_moments, summarize
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(0)
+    n = 3000
+    variant = rng.choice(["control", "a", "b"], n)
+    conversion = (rng.random(n) < np.where(variant == "b", 0.14, 0.10)).astype(int)
+    revenue = rng.gamma(2.0, np.where(variant == "a", 12.0, 10.0), n) * conversion
+    return pd.DataFrame({"variant": variant, "conversion": conversion, "revenue": revenue})
+
+
+def test_moments_match_raw(events):
+    mom = metric_moments(summarize(events, ["revenue"]), "revenue")
+    raw = events.groupby("variant")["revenue"].agg(["mean", "var"])
+    np.testing.assert_allclose(mom["mean"], raw["mean"].loc[mom.index], rtol=1e-12)
+    np.testing.assert_allclose(mom["var"], raw["var"].loc[mom.index], rtol=1e-10)
+
+
+def test_merge_of_chunks_equals_single_pass(events):
+    whole = summarize(events, ["conversion", "revenue"])
+    parts = merge(summarize(events.iloc[:1000], ["conversion", "revenue"]), summarize(events.iloc[1000:], ["conversion", "revenue"]))
+    pd.testing.assert_frame_equal(parts, whole, check_dtype=False)
+
+
+def test_chi_square_matches_scipy(events):
+    table = pd.crosstab(events["variant"], events["conversion"]).to_numpy()
+    expected = stats.chi2_contingency(table)
+    result = chi_square(summarize(events, ["conversion"]))
+    assert result["chi2"] == pytest.approx(expected[0], rel=1e-12)
+    assert result["p_value"] == pytest.approx(expected[1], rel=1e-10)
+
+
+def test_welch_and_z_tests_match_reference(events):
+    table = compare(summarize(events, ["conversion", "revenue"]), ["conversion", "revenue"], "control").set_index(["metric", "variant"])
+    control = events[events["variant"] == "control"]
+    for variant in ("a", "b"):
+        treated = events[events["variant"] == variant]
+        welch = stats.ttest_ind(treated["revenue"], control["revenue"], equal_var=False)
+        assert table.loc[("revenue", variant), "statistic"] == pytest.approx(welch.statistic, rel=1e-9)
+        assert table.loc[("revenue", variant), "p_value"] == pytest.approx(welch.pvalue, rel=1e-8)
+
+        x1, n1, x0, n0 = treated["conversion"].sum(), len(treated), control["conversion"].sum(), len(control)
+        pooled = (x1 + x0) / (n1 + n0)
+        z = (x1 / n1 - x0 / n0) / np.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n0))
+        assert table.loc[("conversion", variant), "statistic"] == pytest.approx(z, rel=1e-12)
+        assert table.loc[("conversion", variant), "relative_lift"] == pytest.approx((x1 / n1) / (x0 / n0) - 1, rel=1e-12)
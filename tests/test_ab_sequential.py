@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.ab_sequential import cumulative_looks, msprt
+
+
+def _cells(rows):
+    return pd.DataFrame(rows, columns=["cohort", "variant", "n", "conversion_sum"]).set_index(["cohort", "variant"])
+
+
+def test_always_valid_p_matches_closed_form():
+    looks = pd.DataFrame({"n0": [1000, 2000], "x0": [100, 205], "n1": [1000, 2000], "x1": [120, 250]})
+    out = msprt(looks, tau=0.05)
+    p0, p1 = 205 / 2000, 250 / 2000
+    v = p0 * (1 - p0) / 2000 + p1 * (1 - p1) / 2000
+    lr = np.sqrt(v / (v + 0.0025)) * np.exp(0.0025 * (p1 - p0) ** 2 / (2 * v * (v + 0.0025)))
+    first = out["always_valid_p"].iloc[0]
+    assert out["always_valid_p"].iloc[1] == pytest.approx(min(first, 1 / lr), rel=1e-12)
+
+
+def test_empty_arm_and_zero_variance_looks_do_not_poison_later_looks():
+    cells = _cells([
+        ("c1", "control", 50, 0), ("c1", "treatment", 0, 0),
+        ("c2", "control", 50, 0), ("c2", "treatment", 50, 0),
+        ("c3", "control", 5000, 400), ("c3", "treatment", 5000, 700),
+    ])
+    out = msprt(cumulative_looks(cells, "control", "treatment"))
+    assert out["always_valid_p"].iloc[0] == 1.0
+    assert out["always_valid_p"].iloc[1] == 1.0
+    assert out["decision"].iloc[:2].tolist() == ["continue", "continue"]
+    assert np.isfinite(out["always_valid_p"]).all()
+    assert out["decision"].iloc[2] == "stop: success"
+
+
+def test_no_effect_keeps_running():
+    rng = np.random.default_rng(0)
+    rows = []
+    for look in range(10):
+        for variant in ("control", "treatment"):
+            rows.append((f"c{look:02d}", variant, 1000, rng.binomial(1000, 0.1)))
+    out = msprt(cumulative_looks(_cells(rows), "control", "treatment"))
+    assert (out["always_valid_p"].diff().dropna() <= 0).all()
+    assert out["decision"].eq("continue").all()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.ab_engine import summarize
+from components import ab_stream
+from components.ab_stream import load_state, refresh, rollup
+
+
+def _events(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "user_id": np.arange(n),
+        "variant": rng.choice(["control", "treatment"], n),
+        "conversion": rng.integers(0, 2, n),
+        "revenue": rng.gamma(2.0, 10.0, n).round(2),
+        "segment": rng.choice(["new", "returning"], n),
+        "cohort": rng.choice(["w1", "w2"], n),
+    })
+
+
+def test_incremental_refresh_matches_full_summary(tmp_path):
+    source, state = tmp_path / "events.csv", tmp_path / "state.json"
+    first, second = _events(500, 0), _events(300, 1)
+    first.to_csv(source, index=False)
+    refresh(source, state, chunk_bytes=2048)
+    with open(source, "a") as f:
+        second.to_csv(f, index=False, header=False)
+    cells = refresh(source, state, chunk_bytes=2048)
+
+    expected = summarize(pd.concat([first, second]).astype({"variant": str, "segment": str, "cohort": str}),
+                         ["conversion", "revenue"], by=["variant", "segment", "cohort"])
+    pd.testing.assert_frame_equal(cells.sort_index(), expected, check_dtype=False, rtol=1e-12)
+    assert rollup(cells, [])["n"].item() == 800
+
+
+def test_summarize_without_keys_is_one_overall_row():
+    events = _events(100, 2)
+    out = summarize(events, ["revenue"], by=[])
+    assert list(out.index) == ["All"]
+    assert out["n"].item() == 100
+    assert out["revenue_sum"].item() == pytest.approx(events["revenue"].sum())
+
+
+def test_refresh_without_keys_is_rejected(tmp_path):
+    source = tmp_path / "events.csv"
+    _events(10, 3).to_csv(source, index=False)
+    with pytest.raises(ValueError):
+        refresh(source, tmp_path / "state.json", keys=())
+
+
+def test_appends_to_a_short_log_are_folded_not_rebuilt(tmp_path, monkeypatch):
+    source, state = tmp_path / "events.csv", tmp_path / "state.json"
+    _events(20, 4).to_csv(source, index=False)
+    refresh(source, state)
+    assert source.stat().st_size < ab_stream._PREFIX_BYTES
+    assert load_state(state)["prefix_bytes"] == source.stat().st_size
+
+    def rebuilt(*args):
+        raise AssertionError("state was rebuilt")
+
+    monkeypatch.setattr(ab_stream, "_new_state", rebuilt)
+    with open(source, "a") as f:
+        _events(20, 5).to_csv(f, index=False, header=False)
+    assert rollup(refresh(source, state), [])["n"].item() == 40
+    monkeypatch.undo()
+    # a rewritten head still resets the state
+    _events(60, 6).to_csv(source, index=False)
+    assert rollup(refresh(source, state), [])["n"].item() == 60
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from components import ann_index
+from components.ann_index import build_ivf_pq, exact_search, load_ann, look_alikes, save_ann, search
+from components.kmeans import standardizer
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(0, 4, size=(6, 4))
+    X = (centers[rng.integers(6, size=3000)] + rng.normal(size=(3000, 4))) * [1, 10, 100, 0.1]
+    X = X.astype(np.float32)
+    return X, build_ivf_pq(X, *standardizer(X), n_lists=20, n_codes=32)
+
+
+def _brute(index, X, queries, k):
+    z = (queries.astype(np.float64) - index["mean"]) / index["std"]
+    Z = (X.astype(np.float64) - index["mean"]) / index["std"]
+    d = ((z[:, None, :] - Z[None, :, :]) ** 2).sum(axis=2)
+    return np.argsort(d, axis=1, kind="stable")[:, :k], np.sort(d, axis=1)[:, :k]
+
+
+def test_exact_search_matches_brute_force(data):
+    X, index = data
+    ids, d = exact_search(index, X, X[:50], k=7, chunk_rows=400)
+    ref_ids, ref_d = _brute(index, X, X[:50], 7)
+    assert np.allclose(d, ref_d)
+    assert np.mean(ids == ref_ids) > 0.99
+
+
+def test_adc_distances_match_decoded_codes(data):
+    X, index = data
+    lists = np.repeat(np.arange(len(index["coarse"])), np.diff(index["offsets"]))
+    decoded = index["coarse"][lists].copy()
+    for j in range(len(index["bounds"]) - 1):
+        lo, hi = index["bounds"][j], index["bounds"][j + 1]
+        decoded[:, lo:hi] += index["codebooks"][j, index["codes"][:, j], : hi - lo]
+    queries = X[::300]
+    z = (queries.astype(np.float64) - index["mean"]) / index["std"]
+    ref = ((z[:, None, :] - decoded[None, :, :]) ** 2).sum(axis=2)
+    ids, d = search(index, queries, k=10, n_probe=len(index["coarse"]))
+    order = np.argsort(ref, axis=1, kind="stable")[:, :10]
+    assert np.allclose(d, np.take_along_axis(ref, order, axis=1))
+    # ids are reported in original row order, so the row's own code decodes to the same distance
+    rank = np.argsort(index["ids"])
+    assert np.allclose(d, ref[np.arange(len(queries))[:, None], rank[ids]])
+
+
+def test_search_recall_and_exact_rerank(data):
+    X, index = data
+    queries = X[::60]
+    truth, truth_d = exact_search(index, X, queries, k=10)
+    found, _ = search(index, queries, k=10, n_probe=8, source=X)
+    recall = np.mean([len(np.intersect1d(a, b)) / 10 for a, b in zip(found, truth)])
+    assert recall > 0.9
+    # every list probed and every candidate re-ranked is the brute-force answer
+    found, d = search(index, queries, k=10, n_probe=len(index["coarse"]), source=X, rerank=len(X))
+    assert np.allclose(d, truth_d)
+
+
+def test_query_blocks_do_not_change_results(data, monkeypatch):
+    X, index = data
+    queries = X[5::40]
+    together = search(index, queries, k=12, n_probe=4, source=X)
+    monkeypatch.setattr(ann_index, "_TABLE_BLOCK", 1)
+    alone = search(index, queries, k=12, n_probe=4, source=X)
+    assert np.array_equal(together[0], alone[0])
+    assert np.allclose(together[1], alone[1])
+
+
+def test_short_lists_are_padded(data):
+    X, index = data
+    k = len(X)
+    ids, d = search(index, X[:3], k=k, n_probe=1)
+    for q in range(3):
+        real = ids[q] >= 0
+        assert np.isinf(d[q, ~real]).all() and np.all(ids[q, ~real] == -1)
+        assert np.all(np.diff(d[q, real]) >= 0)
+        assert 0 < real.sum() < k
+
+
+def test_look_alikes_exclude_seeds(data):
+    X, index = data
+    seed_rows = np.arange(0, 3000, 100)
+    audience = look_alikes(index, (X[seed_rows], seed_rows), size=40, source=X)
+    assert len(audience) == 40
+    assert not np.isin(audience["row"], seed_rows).any()
+    assert audience["votes"].is_monotonic_decreasing
+
+
+def test_save_is_atomic_and_round_trips(data, tmp_path):
+    X, index = data
+    save_ann(index, tmp_path / "ann")
+    loaded = load_ann(tmp_path / "ann")
+    assert all(np.array_equal(loaded[name], index[name]) for name in index)
+    assert [p.name for p in tmp_path.iterdir()] == ["ann"]
+    assert np.array_equal(search(loaded, X[:5], source=X)[0], search(index, X[:5], source=X)[0])
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import bitmap_index
+from components.bitmap_index import (
+    bitmap_and,
+    bitmap_andnot,
+    bitmap_or,
+    build_bitmaps,
+    cardinality,
+    crosstab,
+    from_mask,
+    from_rows,
+    select,
+    to_rows,
+)
+
+N = 200_000
+
+
+def _masks(seed=0):
+    rng = np.random.default_rng(seed)
+    # sparse, dense and mixed chunks: density varies across the 65,536-row chunks
+    density = np.repeat([0.01, 0.5, 0.03, 0.2], N // 4)
+    return rng.random(N) < density, rng.random(N) < density[::-1]
+
+
+def test_set_operations_match_boolean_masks():
+    a, b = _masks()
+    ba, bb = from_mask(a), from_mask(b)
+    assert {bitmap_index._is_bitset(c) for c in ba.values()} == {True, False}
+    for result, ref in [(bitmap_and(ba, bb), a & b), (bitmap_or(ba, bb), a | b), (bitmap_andnot(ba, bb), a & ~b)]:
+        assert np.array_equal(to_rows(result), np.flatnonzero(ref))
+        assert cardinality(result) == ref.sum()
+
+
+def test_select_and_crosstab_match_pandas():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "segment": rng.choice(["a", "b", "c"], N, p=[0.7, 0.2, 0.1]),
+        "region": rng.choice(["n", "s", None], N, p=[0.5, 0.45, 0.05]),
+        "consent": rng.random(N) < 0.8,
+    })
+    index = build_bitmaps(df, ["segment", "region", "consent"])
+    mask = df["segment"].isin(["a", "c"]) & (df["region"] == "n")
+    assert np.array_equal(to_rows(select(index, {"segment": ["a", "c"], "region": "n"})), np.flatnonzero(mask))
+    assert cardinality(select(index, {})) == N
+    within = select(index, {"consent": True})
+    counts = crosstab(index, "segment", "region", within=within)
+    ref = pd.crosstab(df.loc[df["consent"], "segment"], df.loc[df["consent"], "region"])
+    assert counts.loc[ref.index, ref.columns].equals(ref.rename_axis(index="segment", columns="region"))
+
+
+def test_popcount_fallback_without_bitwise_count(monkeypatch):
+    words = np.random.default_rng(2).integers(0, 2**63, size=1024, dtype=np.uint64) | np.uint64(1 << 63)
+    expected = sum(bin(int(w)).count("1") for w in words)
+    assert bitmap_index._popcount(words) == expected
+    monkeypatch.delattr(np, "bitwise_count", raising=False)
+    assert bitmap_index._popcount(words) == expected
+    a, b = _masks()
+    assert cardinality(bitmap_and(from_mask(a), from_mask(b))) == (a & b).sum()
+
+
+@pytest.mark.parametrize("rows", [[], [0], [65535, 65536], list(range(4097))])
+def test_container_boundaries_round_trip(rows):
+    bitmap = from_rows(rows)
+    assert np.array_equal(to_rows(bitmap), np.asarray(rows, dtype=np.int64))
+    assert cardinality(bitmap) == len(rows)
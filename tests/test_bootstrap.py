@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import bootstrap as boot
+from components.bootstrap import bootstrap, cached_bootstrap, cox_stat, mean_stat, ratio_stat, retained_variance_bootstrap
+from components.pca_stats import components_for_variance, fit_pca
+from components.survival import fit_cox
+
+
+def test_mean_ci_matches_normal_theory():
+    x = np.random.default_rng(0).normal(5.0, 2.0, 4000)
+    out = bootstrap(mean_stat(x), len(x), n_boot=2000)
+    assert out["estimate"] == pytest.approx(x.mean())
+    assert out["se"] == pytest.approx(x.std() / np.sqrt(len(x)), rel=0.1)
+    assert out["ci_low"] < x.mean() < out["ci_high"]
+
+
+def test_index_weights_are_resamples():
+    x = np.arange(10.0)
+    stat = ratio_stat(x, np.ones_like(x))
+    a = bootstrap(stat, len(x), n_boot=300, method="index", seed=3)
+    b = bootstrap(stat, len(x), n_boot=300, method="index", seed=3, workers=1)
+    assert a == b
+    assert 0 <= a["ci_low"] <= a["ci_high"] <= 9
+
+
+def test_unit_weights_reproduce_the_full_fits():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({"a": rng.normal(size=300), "b": rng.integers(0, 2, 300).astype(float)})
+    duration = rng.exponential(np.exp(-0.5 * X["a"]))
+    event = rng.random(300) < 0.8
+    out = bootstrap(cox_stat(X, duration, event), len(X), n_boot=50)
+    full = fit_cox(X, duration, event)["summary"]["hazard_ratio"]
+    assert out["estimate"] == pytest.approx(full.tolist())
+    assert len(out["ci_low"]) == 2
+    assert all(lo < hr < hi for lo, hr, hi in zip(out["ci_low"], full, out["ci_high"]))
+
+
+def test_streamed_retained_variance_matches_in_memory_resampling():
+    rng = np.random.default_rng(2)
+    matrix = (rng.normal(size=(3000, 6)) @ rng.normal(size=(6, 6))).astype(np.float32)
+    ratios = fit_pca(matrix)["explained_variance_ratio"]
+    k = components_for_variance(ratios, 0.9)
+    out = retained_variance_bootstrap(matrix, 0.9, n_boot=200, chunk_rows=700)
+    assert out["estimate"] == pytest.approx(ratios[:k].sum())
+    # reference: row resamples of the full matrix refit with fit_pca
+    reps = [
+        fit_pca(matrix[rng.integers(0, len(matrix), len(matrix))])["explained_variance_ratio"][:k].sum()
+        for _ in range(200)
+    ]
+    assert out["se"] == pytest.approx(np.std(reps, ddof=1), rel=0.25)
+    assert out["ci_low"] < out["estimate"] < out["ci_high"]
+
+
+def test_cache_builds_the_statistic_only_on_a_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(boot, "BOOT_DIR", tmp_path)
+    x = np.random.default_rng(3).normal(size=500)
+    built = []
+
+    def make():
+        built.append(1)
+        return mean_stat(x)
+
+    first = cached_bootstrap("v1", "mean", make, len(x), n_boot=200)
+    assert cached_bootstrap("v1", "mean", make, len(x), n_boot=200) == first
+    assert len(built) == 1
+    # settings that change the result get their own cache entries
+    assert cached_bootstrap("v1", "mean", make, len(x), n_boot=200, ci=0.8)["ci_low"] > first["ci_low"]
+    assert cached_bootstrap("v1", "mean", make, len(x), n_boot=200, method="poisson")["method"] == "poisson"
+    cached_bootstrap("v1", "mean", make, len(x), n_boot=200, seed=1)
+    assert len(built) == 4 and len(list(tmp_path.iterdir())) == 4
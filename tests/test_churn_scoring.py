@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.churn_scoring import hazard_model, score_block, score_customers
+from components.survival import breslow_baseline, design_matrix, fit_cox
+
+
+@pytest.fixture
+def churn(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 1200
+    df = pd.DataFrame({
+        "customer_id": np.arange(n),
+        "segment": rng.choice(["a", "b"], n),
+        "plan_type": rng.choice(["basic", "pro", "enterprise"], n),
+        "monthly_spend": rng.gamma(2.0, 50.0, n),
+        "support_tickets": rng.poisson(2, n).astype(float),
+    })
+    df["tenure"] = np.ceil(rng.exponential(200 * np.exp(-0.2 * df["support_tickets"]))) + 1
+    df["churned"] = (rng.random(n) < 0.4).astype(int)
+    path = tmp_path / "churn.csv"
+    df.to_csv(path, index=False)
+    X = design_matrix(df, ["monthly_spend", "support_tickets"], ["plan_type"])
+    fit = fit_cox(X, df["tenure"], df["churned"])
+    model = hazard_model(fit["summary"], breslow_baseline(X, df["tenure"], df["churned"], fit["coef"]), X.mean(), ["plan_type"])
+    return df, path, model
+
+
+def test_streamed_report_matches_one_block(churn, tmp_path):
+    df, path, model = churn
+    out = score_customers(path, model, tmp_path / "out" / "report.csv", chunk_rows=100, top_k=5)
+    active = df[df["churned"] == 0]
+    full = score_block(active, model, 90)
+    risk = full["churn_prob"] * active["monthly_spend"] * 3
+    flagged = full["churn_prob"] >= 0.1
+    assert out["written"]
+    assert out["scored"] == len(active)
+    assert out["flagged"] == flagged.sum()
+    assert out["revenue_at_risk"] == pytest.approx(risk[flagged].sum())
+    assert out["top"]["customer_id"].tolist() == risk[flagged].nlargest(5).index.map(df["customer_id"]).tolist()
+    saved = pd.read_csv(tmp_path / "out" / "report.csv")
+    assert saved["customer_id"].tolist() == active.loc[flagged, "customer_id"].tolist()
+
+
+def test_unwritable_report_still_scores(churn, tmp_path):
+    df, path, model = churn
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    out = score_customers(path, model, blocker / "report.csv", chunk_rows=100)
+    assert not out["written"]
+    assert out["scored"] == (df["churned"] == 0).sum()
+    assert sorted(tmp_path.iterdir()) == sorted([path, blocker])
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score, silhouette_samples
+
+from components.cluster_quality import quality_report, sampled_silhouette, separation_scores, simplified_silhouette
+
+
+def _fitted(n=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[0.0, 0.0], [4.0, 0.0], [0.0, 5.0]])
+    X = centers[rng.integers(0, 3, n)] + rng.normal(size=(n, 2))
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    z = (X - mean) / std
+    labels = ((z[:, None] - (centers - mean) / std) ** 2).sum(axis=2).argmin(axis=1)
+    # centers at the cluster means, as for a converged fit
+    model = {"mean": mean, "std": std, "centers": np.stack([z[labels == c].mean(axis=0) for c in range(3)])}
+    return X, z, labels, model
+
+
+def test_separation_scores_match_sklearn():
+    X, z, labels, model = _fitted()
+    scores = separation_scores(X, model, labels, chunk_rows=400)
+    assert scores["calinski_harabasz"] == pytest.approx(calinski_harabasz_score(z, labels))
+    assert scores["davies_bouldin"] == pytest.approx(davies_bouldin_score(z, labels))
+
+
+def test_sampled_silhouette_is_exact_for_sampled_points():
+    X, z, labels, model = _fitted()
+    exact = silhouette_samples(z, labels)
+    full = sampled_silhouette(X, model, labels, sample_size=len(X), chunk_rows=300)
+    assert full["estimate"] == pytest.approx(exact.mean())
+    assert full["se"] == pytest.approx(0.0, abs=1e-12)
+    part = sampled_silhouette(X, model, labels, sample_size=300, seed=1)
+    assert part["ci_low"] <= exact.mean() <= part["ci_high"]
+
+
+def test_simplified_silhouette_uses_centroid_distances():
+    X, z, labels, model = _fitted()
+    d = np.sqrt(((z[:, None] - model["centers"]) ** 2).sum(axis=2))
+    a = d[np.arange(len(z)), labels]
+    d[np.arange(len(z)), labels] = np.inf
+    b = d.min(axis=1)
+    assert simplified_silhouette(X, model, labels, chunk_rows=256) == pytest.approx(np.mean((b - a) / np.maximum(a, b)))
+    report = quality_report(X, {3: model}, {3: labels})
+    assert report.loc[3, "davies_bouldin"] == pytest.approx(davies_bouldin_score(z, labels))
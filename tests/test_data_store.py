@@ -0,0 +1,99 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import data_store
+from components.data_store import dataset_version, ensure_cache, load_frame, load_matrix, read_manifest
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(data_store, "CACHE_DIR", tmp_path / "data" / ".cache")
+    monkeypatch.setitem(data_store.DATASETS, "toy", {
+        "file": "toy.csv",
+        "dtypes": {"id": "int64", "count": "int16", "flag": "bool"},
+        "dates": ["day"],
+        "float_dtype": "float32",
+    })
+    (tmp_path / "data").mkdir()
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(500),
+        "count": rng.integers(0, 50, 500),
+        "flag": rng.random(500) < 0.3,
+        "day": pd.date_range("2024-01-01", periods=500, freq="h").strftime("%Y-%m-%d %H:%M:%S"),
+        "plan": rng.choice(["basic", "pro", None], 500),
+        "x": rng.normal(size=500),
+        "y": rng.normal(size=500) * 100,
+    })
+    path = tmp_path / "data" / "toy.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_load_frame_round_trips_the_csv(store):
+    ref = pd.read_csv(store, dtype={"id": "int64", "count": "int16", "flag": "bool"}, parse_dates=["day"])
+    df = load_frame("toy")
+    assert list(df.columns) == list(ref.columns)
+    assert df["count"].dtype == np.int16 and df["flag"].dtype == bool
+    assert df["x"].dtype == np.float32 and np.allclose(df["x"], ref["x"], rtol=1e-6)
+    assert isinstance(df["plan"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_series_equal(df["plan"].astype(object), ref["plan"])
+    assert (df["day"] == ref["day"]).all()
+    # a second load reads the cache, and a subset keeps the requested order
+    assert load_frame("toy").equals(df)
+    assert list(load_frame("toy", columns=["y", "id"]).columns) == ["y", "id"]
+    assert load_frame("toy", columns=["y", "id"]).equals(df[["y", "id"]])
+
+
+def test_cache_follows_content_and_spec(store, monkeypatch):
+    first = ensure_cache("toy")
+    version = dataset_version("toy")
+    store.write_text(store.read_text().replace("basic", "team"))
+    second = ensure_cache("toy")
+    assert dataset_version("toy") != version and second != first
+    assert "team" in load_frame("toy")["plan"].cat.categories
+    monkeypatch.setitem(data_store.DATASETS["toy"]["dtypes"], "count", "int32")
+    third = ensure_cache("toy")
+    assert third != second and load_frame("toy")["count"].dtype == np.int32
+
+
+def test_prune_keeps_only_the_current_key(store):
+    old = ensure_cache("toy")
+    store.write_text(store.read_text().replace("pro", "premium"))
+    new = ensure_cache("toy")
+    assert not old.exists()
+    assert sorted(p.name for p in new.parent.iterdir() if p.is_dir()) == [new.name]
+    with open(new / "manifest.json") as f:
+        assert json.load(f)["rows"] == 500
+
+
+def test_read_only_cache_falls_back_to_parsing(store, monkeypatch, tmp_path):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    monkeypatch.setattr(data_store, "CACHE_DIR", blocker / ".cache")
+    assert read_manifest("toy") is None
+    assert load_frame("toy", columns=["x"])["x"].dtype == np.float32
+
+
+def test_load_matrix_is_a_read_only_memmap_of_the_float_columns(store):
+    matrix, cols = load_matrix("toy")
+    assert cols == ["x", "y"]
+    assert isinstance(matrix, np.memmap) and not matrix.flags.writeable
+    assert np.array_equal(matrix, load_frame("toy", columns=cols).to_numpy())
+    assert load_matrix("toy")[0].filename == matrix.filename
+
+
+def test_load_matrix_falls_back_when_the_matrix_cannot_be_written(store, monkeypatch):
+    cache = ensure_cache("toy")
+
+    def fail(*args):
+        raise OSError("read-only")
+
+    monkeypatch.setattr(data_store.os, "replace", fail)
+    matrix, cols = load_matrix("toy")
+    assert np.array_equal(matrix, load_frame("toy", columns=cols).to_numpy())
+    assert sorted(p.name for p in cache.iterdir() if p.name.startswith("matrix")) == []
@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from components.drift import build_profile, compare
+
+
+def _frames(seed=0):
+    rng = np.random.default_rng(seed)
+    ref = pd.DataFrame({"visits": rng.poisson(3, 5000), "spend": rng.normal(100, 20, 5000)})
+    new = pd.DataFrame({"visits": rng.poisson(3.4, 2000), "spend": rng.normal(104, 20, 2000)})
+    return ref, new
+
+
+def test_discrete_ks_is_exact():
+    ref, new = _frames()
+    profile = json.loads(json.dumps(build_profile(ref, ["visits", "spend"])))
+    out = compare(profile, new)
+    exact = stats.ks_2samp(ref["visits"], new["visits"])
+    assert out.loc["visits", "exact_ks"]
+    assert out.loc["visits", "ks_statistic"] == pytest.approx(exact.statistic)
+    assert out.loc["visits", "p_value"] == pytest.approx(exact.pvalue, rel=0.2)
+
+
+def test_binned_ks_and_psi_track_the_full_samples():
+    ref, new = _frames()
+    profile = build_profile(ref, ["spend"], bins=64)
+    out = compare(profile, new)
+    exact = stats.ks_2samp(ref["spend"], new["spend"]).statistic
+    # the gap is only measured at the edges, so it can only undershoot, by at most a bin's mass
+    assert exact - 2 / 64 <= out.loc["spend", "ks_statistic"] <= exact + 1e-12
+    edges = np.asarray(profile["spend"]["edges"])
+    p = np.bincount(np.searchsorted(edges, ref["spend"]), minlength=65) / len(ref)
+    q = np.bincount(np.searchsorted(edges, new["spend"]), minlength=65) / len(new)
+    p, q = np.maximum(p, 1e-6), np.maximum(q, 1e-6)
+    assert out.loc["spend", "psi"] == pytest.approx(np.sum((q - p) * np.log(q / p)))
+
+
+def test_same_distribution_does_not_drift():
+    ref, _ = _frames()
+    later = _frames(seed=1)[0]
+    out = compare(build_profile(ref, ["visits", "spend"]), later)
+    assert not out["drift_detected"].any()
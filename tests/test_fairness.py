@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.fairness import counts_from_aggregates, disparate_impact, equalized_odds, group_counts
+
+
+def _frame(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "segment": rng.choice(["a", "b", "c"], n),
+        "age_group": rng.choice(["young", "old"], n),
+        "variant": rng.choice(["control", "treatment"], n),
+        "selected": rng.integers(0, 2, n),
+        "label": rng.integers(0, 2, n),
+    })
+    df.loc[rng.random(n) < 0.1, "age_group"] = np.nan
+    df.loc[rng.random(n) < 0.05, "variant"] = np.nan
+    return df
+
+
+def _reference(df, attrs, by=None):
+    frames = []
+    for attr in attrs:
+        keys = [by, attr] if by else [attr]
+        part = df.dropna(subset=keys).groupby(keys).agg(
+            n=("selected", "size"), selected=("selected", "sum"), positives=("label", "sum"),
+            true_pos=("selected", lambda s: (s * df.loc[s.index, "label"]).sum()),
+        )
+        part.index = pd.MultiIndex.from_frame(part.index.to_frame().astype(str).assign(attribute=attr)[["attribute", *keys]])
+        frames.append(part)
+    return pd.concat(frames).astype(float)
+
+
+@pytest.mark.parametrize("by", [None, "variant"])
+def test_counts_match_groupby_with_missing_values(by):
+    df = _frame()
+    attrs = ["segment", "age_group"]
+    counts = group_counts(df, "selected", attrs, label="label", by=by)
+    ref = _reference(df, attrs, by)
+    counts.index = counts.index.set_names(ref.index.names)
+    pd.testing.assert_frame_equal(counts.astype(float).sort_index(), ref.sort_index())
+
+
+def test_aggregates_match_row_counts():
+    df = _frame().dropna()
+    agg = df.groupby(["variant", "segment", "age_group"]).agg(n=("selected", "size"), selected=("selected", "sum"))
+    from_rows = group_counts(df, "selected", ["segment", "age_group"], by="variant")
+    from_agg = counts_from_aggregates(agg, "selected", ["segment", "age_group"], by="variant")
+    assert np.allclose(from_rows.sort_index()[["n", "selected"]].to_numpy(), from_agg.sort_index().to_numpy())
+
+
+def test_ratios_and_rates():
+    counts = pd.DataFrame(
+        {"n": [100, 200], "selected": [40, 60], "positives": [50, 100], "true_pos": [30, 50]},
+        index=pd.MultiIndex.from_tuples([("segment", "a"), ("segment", "b")], names=["attribute", "group"]),
+    )
+    di = disparate_impact(counts, n_boot=0)
+    assert di["di_ratio"].tolist() == pytest.approx([1.0, 0.75])
+    assert di["passes_four_fifths"].tolist() == [True, False]
+    eo = equalized_odds(counts)
+    assert eo["tpr"].tolist() == pytest.approx([0.6, 0.5])
+    assert eo["fpr"].tolist() == pytest.approx([0.2, 0.1])
+    assert eo["fpr_gap"].iloc[0] == pytest.approx(0.1)
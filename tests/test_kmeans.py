@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import KMeans
+
+from components.kmeans import assign, save_features, standardizer, sweep
+
+
+def _blobs(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[0, 0, 0], [6, 0, 30], [0, 6, -30], [6, 6, 0]], dtype=float)
+    X = centers[rng.integers(0, 4, n)] + rng.normal(scale=[1, 1, 5], size=(n, 3))
+    return pd.DataFrame(X, columns=["a", "b", "c"])
+
+
+def test_standardizer_and_assign_match_numpy(tmp_path):
+    df = _blobs()
+    path = save_features(df, ["a", "b", "c"], tmp_path / "x.npy")
+    X = df.to_numpy(np.float32).astype(np.float64)
+    mean, std = standardizer(path, chunk_rows=700)
+    assert np.allclose(mean, X.mean(axis=0))
+    assert np.allclose(std, X.std(axis=0, ddof=1))
+    centers = np.random.default_rng(1).normal(size=(4, 3))
+    labels, inertia = assign(path, {"mean": mean, "std": std, "centers": centers}, chunk_rows=500)
+    z = (X - mean) / std
+    assert np.array_equal(labels, ((z[:, None] - centers) ** 2).sum(axis=2).argmin(axis=1))
+    assert inertia == pytest.approx(((z - centers[labels]) ** 2).sum())
+
+
+def test_sweep_reaches_sklearn_inertia(tmp_path):
+    df = _blobs()
+    path = save_features(df, ["a", "b", "c"], tmp_path / "x.npy")
+    best, runs = sweep(path, [2, 4], restarts=2, workers=2)
+    in_memory, _ = sweep(df.to_numpy(np.float32), [2, 4], restarts=2)
+    mean, std = standardizer(path)
+    z = (df.to_numpy(np.float32).astype(np.float64) - mean) / std
+    ref = KMeans(4, n_init=5, random_state=0).fit(z).inertia_
+    assert best[4]["inertia"] == pytest.approx(ref, rel=0.01)
+    assert np.allclose(in_memory[4]["centers"], best[4]["centers"])
+    assert len(runs) == 4 and set(runs["k"]) == {2, 4}
+
+
+def test_failed_save_leaves_no_temp_file(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    with pytest.raises(OSError):
+        save_features(_blobs(10), ["a"], blocker / "x.npy")
+    assert list(tmp_path.iterdir()) == [blocker]
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+from components import lead_model
+
+
+def _prospects(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "email_opens": rng.poisson(4, n),
+        "pricing_page_visits": rng.poisson(1, n),
+        "company_size": rng.choice(["smb", "mid_market", "enterprise"], n),
+        "industry": rng.choice(["retail", "saas", "finance"], n),
+    })
+    logit = 0.4 * df["pricing_page_visits"] + 0.1 * df["email_opens"] - 1.5
+    df["converted"] = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return df
+
+
+def test_encode_orders_columns_and_tolerates_unknown_levels():
+    spec = lead_model.encoding_spec(_prospects())
+    assert lead_model.feature_names(spec) == [
+        "pricing_page_visits", "email_opens", "company_size", "industry_finance", "industry_retail", "industry_saas",
+    ]
+    new = pd.DataFrame({"email_opens": [3], "pricing_page_visits": [2], "company_size": ["huge"], "industry": ["mining"]})
+    assert lead_model.encode(new, spec).tolist() == [[2.0, 3.0, -1.0, 0.0, 0.0, 0.0]]
+
+
+def test_cross_validation_matches_sklearn():
+    df = _prospects()
+    spec = lead_model.encoding_spec(df)
+    X, y = lead_model.encode(df, spec), df["converted"].to_numpy()
+    params = {**lead_model.DEFAULT_PARAMS, "n_estimators": 20}
+    cv = lead_model.cross_validate(X, y, params, folds=3)
+    ref = cross_val_predict(
+        RandomForestClassifier(n_jobs=1, **params), X, y,
+        cv=StratifiedKFold(3, shuffle=True, random_state=0), method="predict_proba",
+    )[:, 1]
+    assert np.allclose(cv["oof"], ref)
+    assert np.allclose(lead_model.cross_validate(X, y, params, folds=3, workers=2)["oof"], ref)
+
+
+def test_second_call_loads_the_cached_forest(tmp_path, monkeypatch):
+    monkeypatch.setattr(lead_model, "MODEL_DIR", tmp_path)
+    df = _prospects()
+    model, meta, oof = lead_model.load_or_train(df, "v1", {"n_estimators": 10}, folds=3)
+    again, meta2, oof2 = lead_model.load_or_train(df, "v1", {"n_estimators": 10}, folds=3)
+    assert meta2 == meta
+    assert np.array_equal(oof2, oof)
+    X = lead_model.encode(df, meta["spec"])
+    assert np.array_equal(again.predict_proba(X), model.predict_proba(X))
+    assert len(list(tmp_path.iterdir())) == 1
+    lead_model.load_or_train(df, "v2", {"n_estimators": 10}, folds=3)
+    assert len(list(tmp_path.iterdir())) == 2
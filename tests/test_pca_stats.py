@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from components.pca_stats import components_for_variance, correlation_matrix, fit_pca
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    rng = np.random.default_rng(0)
+    latent = rng.normal(size=(3000, 3))
+    X = latent @ rng.normal(size=(3, 8)) + 0.3 * rng.normal(size=(3000, 8)) + rng.uniform(-50, 50, 8)
+    return X.astype(np.float32)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 1000, 65536])
+def test_streamed_moments_match_numpy(matrix, chunk_rows):
+    mean, std, corr = correlation_matrix(matrix, chunk_rows)
+    X = matrix.astype(np.float64)
+    assert np.allclose(mean, X.mean(axis=0))
+    assert np.allclose(std, X.std(axis=0, ddof=1))
+    assert np.allclose(corr, np.corrcoef(X, rowvar=False), atol=1e-8)
+
+
+@pytest.mark.parametrize("chunk_rows", [13, 65536])
+def test_fit_pca_matches_eigh(matrix, chunk_rows):
+    pca = fit_pca(matrix, chunk_rows)
+    eigvals, eigvecs = np.linalg.eigh(np.corrcoef(matrix.astype(np.float64), rowvar=False))
+    eigvals, eigvecs = eigvals[::-1], eigvecs[:, ::-1]
+    assert np.allclose(pca["explained_variance_ratio"], eigvals / eigvals.sum(), atol=1e-9)
+    # components match up to sign
+    assert np.allclose(np.abs((pca["components"] * eigvecs.T).sum(axis=1)), 1.0, atol=1e-6)
+    k = components_for_variance(pca["explained_variance_ratio"], 0.95)
+    assert np.cumsum(pca["explained_variance_ratio"])[k - 1] >= 0.95 > np.r_[0, np.cumsum(pca["explained_variance_ratio"])][k - 1]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from components.kmeans import assign
+from components.segment_service import (
+    assign_segments,
+    build_index,
+    encode_customer,
+    load_index,
+    save_index,
+    segment_names,
+    update_index,
+)
+
+
+def _model(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal([50, 3, 200], [20, 2, 80], size=(2000, 3))
+    model = {"mean": X.mean(axis=0), "std": X.std(axis=0), "centers": rng.normal(size=(4, 3))}
+    return X, model
+
+
+def test_folded_index_matches_standardized_assignment():
+    X, model = _model()
+    index = build_index(model, ["a", "b", "c", "d"], ["x", "y", "z"])
+    labels, _ = assign(X, model)
+    assert np.mean(assign_segments(index, X) == labels) > 0.999
+    record = {"x": X[0, 0], "y": X[0, 1], "z": X[0, 2]}
+    assert segment_names(index, assign_segments(index, encode_customer(record, ["x", "y", "z"]))) == [
+        "abcd"[labels[0]]
+    ]
+
+
+def test_update_is_a_sequential_kmeans_step():
+    X, model = _model()
+    index = build_index(model, list("abcd"), ["x", "y", "z"], counts=[100, 200, 300, 400])
+    new = X[:50]
+    moved = update_index(index, new)
+    labels = assign_segments(index, new)
+    z = (new - model["mean"]) / model["std"]
+    for c in range(4):
+        hit = labels == c
+        expected = (index["counts"][c] * model["centers"][c] + z[hit].sum(axis=0)) / (index["counts"][c] + hit.sum())
+        assert np.allclose(moved["centers"][c], expected)
+    assert np.array_equal(index["centers"], model["centers"])
+    # the folded arrays are rebuilt from the moved centers
+    assert np.mean(assign_segments(moved, X) == assign(X, {**model, "centers": moved["centers"]})[0]) > 0.999
+
+
+def test_save_is_atomic_and_round_trips(tmp_path):
+    _, model = _model()
+    index = build_index(model, list("abcd"), ["x", "y", "z"])
+    save_index(index, tmp_path / "idx")
+    loaded = load_index(tmp_path / "idx")
+    assert np.array_equal(loaded["weight"], index["weight"])
+    assert loaded["names"] == list("abcd")
+    assert [p.name for p in tmp_path.iterdir()] == ["idx"]
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    with pytest.raises(OSError):
+        save_index(index, blocker / "idx")
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.survival import (
+    concordance,
+    design_matrix,
+    fit_cox,
+    fit_poisson_glm,
+    kaplan_meier,
+    median_survival,
+    person_period_cells,
+    piecewise_exponential,
+)
+
+lifelines = pytest.importorskip("lifelines")
+
+
+def _churn(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "spend": rng.normal(size=n),
+        "tickets": rng.poisson(2, n).astype(float),
+        "segment": rng.choice(["a", "b", "c"], n),
+    })
+    hazard = np.exp(0.6 * df["spend"] - 0.3 * df["tickets"])
+    # integer tenures give tied event times
+    df["tenure"] = np.ceil(rng.exponential(30 / hazard)).clip(max=120)
+    df["observed"] = (rng.random(n) < 0.75) & (df["tenure"] < 120)
+    return df
+
+
+def test_kaplan_meier_matches_lifelines():
+    df = _churn()
+    curve = kaplan_meier(df["tenure"], df["observed"])
+    ref = lifelines.KaplanMeierFitter().fit(df["tenure"], df["observed"])
+    times = curve["time"].to_numpy()
+    assert np.allclose(curve["survival"], ref.survival_function_at_times(times).to_numpy())
+    ci = ref.confidence_interval_survival_function_.reindex(times)
+    assert np.allclose(curve["ci_low"], ci.iloc[:, 0], atol=1e-8)
+    assert np.allclose(curve["ci_high"], ci.iloc[:, 1], atol=1e-8)
+    assert median_survival(curve)["All"] == ref.median_survival_time_
+
+
+def test_nelson_aalen_matches_lifelines_per_stratum():
+    df = _churn()
+    curve = kaplan_meier(df["tenure"], df["observed"], df["segment"])
+    for segment, part in df.groupby("segment"):
+        mine = curve[curve["stratum"] == segment]
+        ref = lifelines.NelsonAalenFitter(nelson_aalen_smoothing=False).fit(part["tenure"], part["observed"])
+        assert np.allclose(mine["cum_hazard"], ref.cumulative_hazard_.reindex(mine["time"]).iloc[:, 0])
+        assert mine["at_risk"].iloc[0] == len(part)
+
+
+def test_cox_efron_matches_lifelines():
+    df = _churn()
+    X = design_matrix(df, ["spend", "tickets"], ["segment"])
+    fit = fit_cox(X, df["tenure"], df["observed"])
+    ref = lifelines.CoxPHFitter().fit(X.assign(T=df["tenure"], E=df["observed"]), "T", "E")
+    # lifelines stops at a looser tolerance than fit_cox
+    assert np.allclose(fit["coef"], ref.params_[X.columns], atol=1e-5)
+    assert np.allclose(fit["summary"]["se"], ref.standard_errors_[X.columns], rtol=1e-5)
+    assert fit["loglik"] == pytest.approx(ref.log_likelihood_, rel=1e-9)
+
+
+def test_cox_breslow_solves_the_score_equation():
+    df = _churn()
+    X = design_matrix(df, ["spend", "tickets"], ["segment"])
+    fit = fit_cox(X, df["tenure"], df["observed"], ties="breslow")
+    # brute force over risk sets: sum over events of x_i minus the risk-weighted mean of x
+    x, t = X.to_numpy(), df["tenure"].to_numpy()
+    risk = np.exp(x @ fit["coef"])
+    score = np.zeros(x.shape[1])
+    for i in np.flatnonzero(df["observed"]):
+        at_risk = t >= t[i]
+        score += x[i] - (risk[at_risk] @ x[at_risk]) / risk[at_risk].sum()
+    assert np.allclose(score, 0.0, atol=1e-6)
+
+
+def test_cox_case_weights_equal_duplicated_rows():
+    df = _churn(300)
+    X = design_matrix(df, ["spend", "tickets"])
+    w = np.random.default_rng(2).integers(0, 3, len(df))
+    weighted = fit_cox(X, df["tenure"], df["observed"], weights=w, ties="breslow")
+    rows = np.repeat(np.arange(len(df)), w)
+    expanded = fit_cox(X.iloc[rows], df["tenure"].iloc[rows], df["observed"].iloc[rows], ties="breslow")
+    assert np.allclose(weighted["coef"], expanded["coef"], atol=1e-8)
+
+
+def test_weighted_efron_matches_lifelines():
+    df = _churn(400)
+    X = design_matrix(df, ["spend", "tickets"])
+    w = np.random.default_rng(3).integers(1, 4, len(df)).astype(float)
+    fit = fit_cox(X, df["tenure"], df["observed"], weights=w)
+    ref = lifelines.CoxPHFitter().fit(X.assign(T=df["tenure"], E=df["observed"], w=w), "T", "E", weights_col="w")
+    assert np.allclose(fit["coef"], ref.params_[X.columns], atol=1e-5)
+
+
+def _brute_concordance(t, e, risk):
+    comparable = concordant = tied = 0
+    for i in np.flatnonzero(e):
+        # j outlives i: a later time, or censored at i's event time
+        later = (t > t[i]) | ((t == t[i]) & ~e)
+        comparable += later.sum()
+        concordant += (risk[later] < risk[i]).sum()
+        tied += (risk[later] == risk[i]).sum()
+    return comparable, concordant, tied
+
+
+def test_concordance_matches_brute_force_and_lifelines():
+    df = _churn(500)
+    risk = np.round(0.6 * df["spend"] - 0.3 * df["tickets"], 1).to_numpy()
+    t, e = df["tenure"].to_numpy(), df["observed"].to_numpy()
+    out = concordance(t, e, risk, df["segment"])
+    comparable, concordant, tied = _brute_concordance(t, e, risk)
+    assert out.loc["All", ["comparable", "concordant", "tied_risk"]].tolist() == [comparable, concordant, tied]
+    for segment, part in df.groupby("segment"):
+        rows = part.index.to_numpy()
+        assert out.loc[segment, "comparable"] == _brute_concordance(t[rows], e[rows], risk[rows])[0]
+    ref = lifelines.utils.concordance_index(t, -risk, e)
+    assert out.loc["All", "c_index"] == pytest.approx(ref, abs=1e-12)
+
+
+def test_poisson_glm_matches_sklearn():
+    from sklearn.linear_model import PoissonRegressor
+
+    rng = np.random.default_rng(4)
+    X = pd.DataFrame({"one": 1.0, "a": rng.normal(size=400), "b": rng.integers(0, 2, 400).astype(float)})
+    exposure = rng.uniform(0.5, 3.0, 400)
+    y = rng.poisson(exposure * np.exp(0.2 + 0.5 * X["a"] - 0.4 * X["b"]))
+    fit = fit_poisson_glm(X, y, offset=np.log(exposure))
+    # an offset of log(exposure) is the same model as rate y / exposure weighted by exposure
+    ref = PoissonRegressor(alpha=0.0, fit_intercept=False, tol=1e-12, max_iter=1000)
+    ref.fit(X, y / exposure, sample_weight=exposure)
+    assert np.allclose(fit["coef"], ref.coef_, atol=1e-6)
+    mu = exposure * np.exp(X.to_numpy() @ fit["coef"])
+    info = (X.to_numpy() * mu[:, None]).T @ X.to_numpy()
+    assert np.allclose(fit["summary"]["se"], np.sqrt(np.diag(np.linalg.inv(info))))
+
+
+def _person_periods(df, cuts):
+    """One row per customer and interval they were at risk in (the uncollapsed table)."""
+    rows = []
+    for t, e, segment in zip(df["tenure"], df["observed"], df["segment"]):
+        for k, start in enumerate(cuts):
+            end = cuts[k + 1] if k + 1 < len(cuts) else np.inf
+            if t > start or k == 0:
+                rows.append((segment, k, start, min(t, end) - start, float(e and t <= end)))
+    return pd.DataFrame(rows, columns=["segment", "interval", "interval_start", "exposure", "events"])
+
+
+def test_person_period_cells_match_an_expanded_table():
+    df = _churn(300)
+    cuts = np.array([0.0, 30.0, 60.0, 90.0])
+    cells = person_period_cells(df, "tenure", "observed", cuts, categorical=["segment"])
+    ref = _person_periods(df, cuts).groupby(["segment", "interval"])[["exposure", "events"]].sum()
+    ref = ref[ref["exposure"] > 0]
+    mine = cells.set_index(["segment", "interval"])[["exposure", "events"]].sort_index()
+    assert np.allclose(mine.to_numpy(), ref.sort_index().to_numpy())
+    assert mine.index.tolist() == ref.sort_index().index.tolist()
+
+
+def test_piecewise_exponential_equals_the_person_period_fit():
+    df = _churn(500)
+    cuts = np.array([0.0, 20.0, 50.0])
+    fit = piecewise_exponential(person_period_cells(df, "tenure", "observed", cuts, categorical=["segment"]), categorical=["segment"])
+    # events and exposure are sufficient statistics, so collapsing must not move the estimates
+    periods = _person_periods(df, cuts)
+    periods = periods[periods["exposure"] > 0]
+    X = pd.concat([
+        pd.get_dummies(periods["interval_start"], prefix="interval", dtype=float),
+        design_matrix(periods, [], ["segment"]),
+    ], axis=1)
+    ref = fit_poisson_glm(X, periods["events"], offset=np.log(periods["exposure"].to_numpy()))
+    assert np.allclose(fit["summary"]["coef"], ref["summary"].loc[fit["summary"].index, "coef"], atol=1e-8)
+    assert np.allclose(fit["baseline"], ref["summary"].loc[fit["baseline"].index, "rate_ratio"], rtol=1e-8)
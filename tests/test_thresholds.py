@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, confusion_matrix, roc_auc_score
+
+from components.thresholds import at_threshold, curve_auc, pick_threshold, threshold_curves
+
+
+def _scores(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = rng.random(n) < 0.2
+    # rounded scores give many ties
+    scores = np.round(np.clip(0.3 * labels + rng.normal(0.4, 0.2, n), 0, 1), 2)
+    groups = rng.choice(["a", "b", "c"], n)
+    return scores, labels, groups
+
+
+def test_counts_match_sklearn_confusion_matrix():
+    scores, labels, groups = _scores()
+    curve = threshold_curves(scores, labels, groups)
+    for t in (0.2, 0.45, 0.7):
+        rows = at_threshold(curve, t)
+        for name in ("All", "a", "b"):
+            mask = np.ones(len(scores), dtype=bool) if name == "All" else groups == name
+            tn, fp, fn, tp = confusion_matrix(labels[mask], scores[mask] >= t).ravel()
+            assert rows.loc[name, ["tp", "fp", "fn", "tn"]].tolist() == [tp, fp, fn, tn]
+
+
+def test_auc_matches_sklearn():
+    scores, labels, groups = _scores()
+    auc = curve_auc(threshold_curves(scores, labels, groups))
+    assert auc.loc["All", "roc_auc"] == pytest.approx(roc_auc_score(labels, scores))
+    assert auc.loc["All", "average_precision"] == pytest.approx(average_precision_score(labels, scores))
+    mask = groups == "c"
+    assert auc.loc["c", "roc_auc"] == pytest.approx(roc_auc_score(labels[mask], scores[mask]))
+    assert auc.loc["c", "average_precision"] == pytest.approx(average_precision_score(labels[mask], scores[mask]))
+
+
+def test_pick_threshold_matches_brute_force():
+    scores, labels, _ = _scores()
+    curve = threshold_curves(scores, labels)
+    best = pick_threshold(curve, cost_fp=1.0, cost_fn=4.0, max_selected=0.3)
+    candidates = [t for t in np.unique(scores) if (scores >= t).sum() <= 0.3 * len(scores)]
+    costs = [((scores >= t) & ~labels).sum() + 4 * ((scores < t) & labels).sum() for t in candidates]
+    assert best["cost"] == min(costs)
+    assert best["threshold"] == candidates[int(np.argmin(costs))]
+    with pytest.raises(ValueError):
+        pick_threshold(curve, max_selected=1, min_recall=0.99)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from components.lead_model import encode, encoding_spec
+from components.tree_scorer import encode_record, export_forest, load_forest, predict_proba, save_forest
+
+
+def _fit(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(500, 6)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=500) > 0).astype(int)
+    return RandomForestClassifier(n_estimators=25, max_depth=7, random_state=seed).fit(X, y), X
+
+
+def test_flat_forest_matches_sklearn(tmp_path):
+    model, X = _fit()
+    forest = export_forest(model)
+    assert np.allclose(predict_proba(forest, X), model.predict_proba(X)[:, 1])
+    save_forest(forest, tmp_path / "forest")
+    loaded = load_forest(tmp_path / "forest")
+    assert np.allclose(predict_proba(loaded, X[:1]), model.predict_proba(X[:1])[:, 1])
+
+
+def test_record_encoding_matches_frame_encoding():
+    df = pd.DataFrame({
+        "email_opens": [3, 0, 7],
+        "company_size": ["smb", "enterprise", "mid_market"],
+        "industry": ["saas", "retail", "saas"],
+    })
+    spec = encoding_spec(df)
+    records = df.assign(company_size=["smb", "enterprise", "huge"]).to_dict("records")
+    expected = encode(df.assign(company_size=["smb", "enterprise", "huge"]), spec)
+    assert np.array_equal(np.stack([encode_record(r, spec) for r in records]), expected)
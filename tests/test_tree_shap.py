@@ -0,0 +1,61 @@
+from itertools import combinations
+from math import factorial
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from components.tree_shap import build_explainer, shap_values
+
+
+def _forest(n_features, n=400, trees=3, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.7, size=n) > 0).astype(int)
+    return RandomForestClassifier(n_estimators=trees, max_depth=None, random_state=seed).fit(X, y), X
+
+
+def _expected(tree, x, subset, node=0):
+    """Path-dependent E[f(x) | x_S]: follow x on features in S, average children by cover otherwise."""
+    left, right = tree.children_left[node], tree.children_right[node]
+    if left < 0:
+        counts = tree.value[node, 0]
+        return counts[-1] / counts.sum()
+    if tree.feature[node] in subset:
+        return _expected(tree, x, subset, left if x[tree.feature[node]] <= tree.threshold[node] else right)
+    cover = tree.weighted_n_node_samples
+    return (cover[left] * _expected(tree, x, subset, left) + cover[right] * _expected(tree, x, subset, right)) / cover[node]
+
+
+def _brute_shap(model, x):
+    p = len(x)
+    phi = np.zeros(p)
+    for est in model.estimators_:
+        value = {
+            s: _expected(est.tree_, x, set(s)) for r in range(p + 1) for s in combinations(range(p), r)
+        }
+        for i in range(p):
+            others = [j for j in range(p) if j != i]
+            for r in range(p):
+                w = factorial(r) * factorial(p - r - 1) / factorial(p)
+                for s in combinations(others, r):
+                    phi[i] += w * (value[tuple(sorted(s + (i,)))] - value[s])
+    return phi / len(model.estimators_)
+
+
+@pytest.mark.parametrize("table_max_k", [None, 3, 0])
+def test_matches_brute_force_shapley(table_max_k):
+    model, X = _forest(6)
+    explainer = build_explainer(model, 6, table_max_k=table_max_k)
+    values = shap_values(explainer, X[:4])
+    for row, x in zip(values, X[:4]):
+        assert np.allclose(row, _brute_shap(model, x.astype(np.float64)), atol=1e-12)
+
+
+def test_long_paths_stay_additive_without_tables():
+    model, X = _forest(16, n=2000, trees=4)
+    explainer = build_explainer(model, 16)
+    assert max(group["zero"].shape[1] for group in explainer["paths"]) > 8
+    values = shap_values(explainer, X[:300], block_rows=64)
+    assert np.allclose(values.sum(axis=1) + explainer["expected_value"], model.predict_proba(X[:300])[:, 1], atol=1e-12)
+    assert np.allclose(values, shap_values(build_explainer(model, 16, table_max_k=0), X[:300]), atol=1e-12)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression, Ridge
+
+from components.uplift import LEARNERS, fit_logistic, fit_ridge, fit_uplift, predict_uplift, qini_coefficient, qini_curve
+
+
+def _experiment(n=6000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=(n, 2))
+    X = np.column_stack([np.ones(n), x])
+    treat = rng.random(n) < 0.5
+    # only rows with x0 > 0 respond to treatment
+    logit = -1.5 + 0.3 * x[:, 1] + treat * 1.2 * (x[:, 0] > 0)
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(float)
+    return X, treat, y
+
+
+def test_base_learners_match_sklearn():
+    X, _, y = _experiment(2000)
+    l2 = 1e-3
+    beta = fit_logistic(X, y, l2=l2)
+    ref = LogisticRegression(C=1 / (l2 * len(y)), tol=1e-12, max_iter=1000).fit(X[:, 1:], y)
+    assert np.allclose(beta, np.r_[ref.intercept_, ref.coef_.ravel()], atol=1e-6)
+    z = X[:, 1:] @ [0.5, -2.0] + 1.0
+    ref = Ridge(alpha=l2 * len(z)).fit(X[:, 1:], z)
+    assert np.allclose(fit_ridge(X, z, l2=l2), np.r_[ref.intercept_, ref.coef_])
+
+
+@pytest.mark.parametrize("learner", LEARNERS)
+def test_learners_find_the_responders(learner):
+    X, treat, y = _experiment()
+    uplift = predict_uplift(fit_uplift(X, treat, y, learner), X, chunk_rows=1000)
+    assert uplift[X[:, 1] > 0].mean() > uplift[X[:, 1] <= 0].mean() + 0.05
+    assert qini_coefficient(qini_curve(uplift, treat, y)) > 0
+
+
+def test_pooled_arms_match_serial():
+    X, treat, y = _experiment(2000)
+    serial = fit_uplift(X, treat, y, "x_learner")
+    pooled = fit_uplift(X, treat, y, "x_learner", workers=2)
+    assert all(np.allclose(serial[k], pooled[k]) for k in ("mu0", "mu1", "tau0", "tau1"))
+
+
+def test_qini_curve_matches_brute_force():
+    X, treat, y = _experiment(500)
+    uplift = np.random.default_rng(1).random(500)
+    curve = qini_curve(uplift, treat, y, points=None)
+    order = np.argsort(-uplift)
+    for depth in (50, 250, 500):
+        top = order[:depth]
+        t, c = treat[top], ~treat[top]
+        expected = y[top][t].sum() - y[top][c].sum() * t.sum() / c.sum()
+        assert curve["qini"].iloc[depth] == pytest.approx(expected)